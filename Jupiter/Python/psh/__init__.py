@@ -0,0 +1,18 @@
+# PSH: Planetary Spherical Harmonics community code, shared Python code.
+#
+# The jovian_*_internal_rtp.py and jovian_*_internal_xyz.py files in the directory above
+# use the engine in this package for the spherical harmonic recursion.
+#
+# Citation Info:
+#  DOI: 10.5281/zenodo.6814109     This DOI links to all versions of code at the Github.
+#  Github: https://github.com/rjwilson-LASP/PSH
+
+from .engine import internal_rtp, internal_xyz, internal_rtp_scalar, internal_xyz_scalar
+from .engine import internal_rtp_grid, internal_rtp_shell
+from .engine import internal_rtp_normalised, internal_xyz_normalised
+from .engine import internal_xyz_multi, internal_rtp_multi
+from .engine import internal_xyz_ensemble, internal_rtp_ensemble
+from .engine import design_matrix_xyz, design_matrix_rtp, design_coefficients
+from .models import get_model, available_models, Model
+from .parallel import parallel_evaluate, shutdown_pools
+from .engine import set_backend, get_backend, calibrate, set_summation, get_summation, set_chunking, get_chunking, Workspace
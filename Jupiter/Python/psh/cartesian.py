@@ -0,0 +1,436 @@
+import numpy as np
+
+# Cartesian (solid harmonic) version of the spherical harmonic recursion, used by engine.internal_xyz
+# for vector inputs. It works directly from x, y and z, so there is no arccos/arctan2, no sin and cos of
+# the angles, no division by sin(colatitude) and no special case at the poles, and it gives Bx, By and Bz
+# directly.
+#
+# With the Gauss normalised Legendre functions P(n,m) that the modified g and h arrays are made for
+# (see expand_out_g_and_h in Mother_Source/reordergh.py), the irregular solid harmonics
+#   I(n,m) = r^-(n+1) P(n,m)(cos(colat)) exp(i m elong)
+# are found from x, y and z only (in Rj, scaled to the Rj the model expects), with
+#   I(0,0) = 1/r
+#   I(m,m) = (x + iy)/r^2 I(m-1,m-1)
+#   I(n,m) = z/r^2 I(n-1,m) - K(n,m)/r^2 I(n-2,m),   K(n,m) = ((n-1)^2 - m^2)/((2n-1)(2n-3))
+# and the potential is V = sum of Re[(g - ih) I(n,m)] over n and m.
+# Their derivatives are again solid harmonics, one degree higher:
+#   d/dz          I(n,m) = -(2n+1) I(n+1,m)
+#   (d/dx + id/dy) I(n,m) = -(2n+1) I(n+1,m+1)
+#   (d/dx - id/dy) I(n,m) =  (2n+1) I(n+1,m-1)        for m >= 1
+# So B = -grad(V) is a sum of Re[C I(n,m)] for each component, for tables of complex coefficients
+# C that are made once per model (cartesian_tables), up to one degree higher than the model.
+# The same again gives the derivatives of B (the Jacobian), up to two degrees higher than the model.
+#
+# Citation Info:
+#  DOI: 10.5281/zenodo.6814109     This DOI links to all versions of code at the Github.
+#  Github: https://github.com/rjwilson-LASP/PSH
+
+_TABLES = {}  # tables made by cartesian_tables, for each g array used (keyed by id, with g kept too)
+
+
+def cartesian_tables(g, h, k_plus1, jacobian=False):
+    # Returns the tables for the Cartesian recursion, for the modified g and h arrays (k+1 = order + 2).
+    # Tables are made on the first call for each g array, then reused.
+    #  n_max  - highest degree of solid harmonic needed (order + 1, or order + 2 for the Jacobian).
+    #  K      - K(n,m) above, size n_max+1 x n_max+1, index [n,m].
+    #  c_re, c_im - real and imaginary parts of C, size n_comp x n_max+1 x n_max+1, index [component,n,m].
+    #           The components are Bx, By, Bz, then if jacobian is True, dBx/dx, dBx/dy, dBx/dz,
+    #           dBy/dx, ... dBz/dz (i.e. row by row of the Jacobian).
+    #  packed - the same values, packed in order of use for numba_kernels.xyz_recursion, one row for
+    #           each I(n,m) (m, then n from m to n_max), of [K, c_re, c_im of component 0, c_re, c_im of
+    #           component 1, ...].
+    #  matrix - the same C values, as a matrix for xyz_recursion_matrix, with rows c_re, then -c_im, for
+    #           each I(n,m) in the same order as packed, and one column for each component.
+    key = (id(g), jacobian)
+    if key in _TABLES:
+        tables = _TABLES[key]
+        if (tables[0] is g) and (tables[1] is h):
+            return tables[2]
+
+    order = k_plus1 - 2
+    if jacobian:
+        n_max = order + 2
+    else:
+        n_max = order + 1
+    K = _K_table(n_max)
+
+    # The potential. Degree n and order m of the model are at index n*(n+1)/2 + m + 1 of g and h
+    V = np.zeros((n_max+1,n_max+1),dtype='complex128')
+    for n in range(1, order+1):
+        for m in range(0, n+1):
+            mn = int( n*(n+1)/2 + m + 1 )
+            V[n,m] = complex(g[mn], -h[mn])
+
+    c = [-C for C in _gradient(V, order)]  # B = -grad(V)
+    if jacobian:
+        c = c + [D for C in c for D in _gradient(C, order+1)]
+    c = np.array(c)
+
+    tables = _pack(n_max, K, c)
+    _TABLES[key] = (g, h, tables)
+    return tables
+
+
+def multi_tables(models):
+    # Returns the tables (as cartesian_tables) for several models at once, for B of each model as its
+    # own three components, i.e. Bx, By, Bz of the first model, then of the second model, ...
+    # models is a list of (g, h, k_plus1, r_scale), with r_scale = 71492/(1 Rj in km that the model
+    # assumes). Tables are made on the first call for each list of g arrays, then reused.
+    # Models that assume a different Rj have their C scaled instead of the position: I(n,m) at the
+    # scaled position r_scale*x is r_scale^-(n+1) I(n,m) at x, so all the models share one recursion.
+    key = ('multi',) + tuple((id(g), r_scale) for (g, h, k_plus1, r_scale) in models)
+    if key in _TABLES:
+        tables = _TABLES[key]
+        if all((g_kept is model[0]) and (h_kept is model[1]) for (g_kept, h_kept), model in zip(tables[0], models)):
+            return tables[1]
+
+    n_max = max(k_plus1 - 1 for (g, h, k_plus1, r_scale) in models)
+    c = np.zeros((3*len(models), n_max+1, n_max+1),dtype='complex128')
+    for i_model, (g, h, k_plus1, r_scale) in enumerate(models):
+        tables = cartesian_tables(g, h, k_plus1)
+        n_top = tables['n_max']
+        scale = np.float64(r_scale)**(-np.arange(1, n_top+2,dtype='float64'))  # r_scale^-(n+1)
+        c[3*i_model:3*i_model+3, :n_top+1, :n_top+1] = (
+            (tables['c_re'] + 1j*tables['c_im']) * scale[np.newaxis,:,np.newaxis])
+    K = cartesian_tables(*max(models, key=lambda model: model[2])[:3])['K']
+
+    tables = _pack(n_max, K, c)
+    _TABLES[key] = ([(g, h) for (g, h, k_plus1, r_scale) in models], tables)
+    return tables
+
+
+def _pack(n_max, K, c):
+    # Makes the dictionary of tables returned by cartesian_tables, from K and the complex C (size
+    # n_comp x n_max+1 x n_max+1), with the packed and matrix forms used by the recursions.
+    n_comp = c.shape[0]
+    packed = np.zeros(((n_max+1)*(n_max+2)//2, 1 + 2*n_comp),dtype='float64')
+    j = 0
+    for m in range(0, n_max+1):
+        for n in range(m, n_max+1):
+            packed[j,0   ] = K[n,m]
+            packed[j,1::2] = c[:,n,m].real
+            packed[j,2::2] = c[:,n,m].imag
+            j += 1
+
+    matrix = np.zeros((2*packed.shape[0], n_comp),dtype='float64')
+    matrix[0::2,:] =  packed[:,1::2]
+    matrix[1::2,:] = -packed[:,2::2]
+
+    tables = {'n_max': n_max, 'K': K, 'c_re': c.real.copy(), 'c_im': c.imag.copy(), 'packed': packed, 'matrix': matrix}
+    for name in ('K', 'c_re', 'c_im', 'packed', 'matrix'):
+        tables[name].setflags(write=False)
+    return tables
+
+
+def _K_table(n_max):
+    # K(n,m) of the recursion, size n_max+1 x n_max+1, index [n,m].
+    K  = np.zeros((n_max+1,n_max+1),dtype='float64')
+    for m in range(0, n_max+1):
+        for n in range(m+2, n_max+1):
+            K[n,m] = np.float64( (n-1)*(n-1) - m*m )/np.float64( (2*n-1)*(2*n-3) )
+    return K
+
+
+def _gradient(C, n_top):
+    # For F = sum of Re[C I(n,m)] with terms up to degree n_top, returns the tables for dF/dx, dF/dy
+    # and dF/dz (each the same size as C, which must have room for degree n_top+1).
+    Dx = np.zeros(C.shape,dtype='complex128')
+    Dy = np.zeros(C.shape,dtype='complex128')
+    Dz = np.zeros(C.shape,dtype='complex128')
+    for n in range(0, n_top+1):
+        c = np.float64(2*n + 1)
+        for m in range(0, n+1):
+            A = C[n,m]
+            if (A == 0):
+                continue
+            Dz[n+1,m] += -c*A
+            if (m == 0):  # I(n,0) is real, so only Re[A] matters
+                Dx[n+1,1] +=    -c*A.real
+                Dy[n+1,1] +=  1j*c*A.real
+            else:
+                Dx[n+1,m+1] +=    -c/2*A
+                Dx[n+1,m-1] +=     c/2*A
+                Dy[n+1,m+1] +=  1j*c/2*A
+                Dy[n+1,m-1] +=  1j*c/2*A
+    return Dx, Dy, Dz
+
+
+def xyz_recursion(x_in, y_in, z_in, tables, N_input, workspace, outputs):
+    # The Cartesian recursion for a 1D input of size n, with x_in, y_in and z_in already scaled to the
+    # Rj the model expects. Each component (Bx, By and Bz, then the Jacobian if the tables have it) is
+    # written in to the arrays in outputs (e.g. columns of out). All the other arrays are buffers in
+    # workspace, updated in place. The sums are done in the dtype of outputs (e.g. float32, with the
+    # tables rounded to it too).
+    n_max = tables['n_max']
+    K     = tables['K']
+    c_re  = tables['c_re']
+    c_im  = tables['c_im']
+    ws = workspace
+    dtype = outputs[0].dtype
+    if (dtype != np.float64):
+        K    = K.astype(dtype)
+        c_re = c_re.astype(dtype)
+        c_im = c_im.astype(dtype)
+
+    inv_r2 = ws.buffer('inv_r2', N_input, dtype=dtype)
+    np.multiply(x_in, x_in, out=inv_r2)
+    t1 = ws.buffer('t1', N_input, dtype=dtype)
+    t2 = ws.buffer('t2', N_input, dtype=dtype)
+    np.multiply(y_in, y_in, out=t1)
+    inv_r2 += t1
+    np.multiply(z_in, z_in, out=t1)
+    inv_r2 += t1  # = r^2
+    s_re = np.sqrt(inv_r2, out=ws.buffer('s_re', N_input, dtype=dtype))
+    np.divide(1.0, s_re, out=s_re)  # I(0,0) = 1/r
+    np.divide(1.0, inv_r2, out=inv_r2)
+    xr = np.multiply(x_in, inv_r2, out=ws.buffer('xr', N_input, dtype=dtype))
+    yr = np.multiply(y_in, inv_r2, out=ws.buffer('yr', N_input, dtype=dtype))
+    zr = np.multiply(z_in, inv_r2, out=ws.buffer('zr', N_input, dtype=dtype))
+    s_im = ws.buffer('s_im', N_input, dtype=dtype)
+    s_im.fill(0)
+
+    # Current and previous two I(n,m), real and imaginary parts
+    i_re  = ws.buffer('i_re' , N_input, dtype=dtype)
+    i_im  = ws.buffer('i_im' , N_input, dtype=dtype)
+    i1_re = ws.buffer('i1_re', N_input, dtype=dtype)
+    i1_im = ws.buffer('i1_im', N_input, dtype=dtype)
+    i2_re = ws.buffer('i2_re', N_input, dtype=dtype)
+    i2_im = ws.buffer('i2_im', N_input, dtype=dtype)
+
+    for B in outputs:
+        B.fill(0)
+    for m in range(0, n_max+1):
+        if (m != 0):  # I(m,m) = (x + iy)/r^2 I(m-1,m-1)
+            np.multiply(s_re, yr, out=t1)
+            np.multiply(s_im, yr, out=t2)
+            s_re *= xr
+            s_re -= t2
+            s_im *= xr
+            s_im += t1
+        for n in range(m, n_max+1):
+            if (n == m):
+                np.copyto(i_re, s_re)
+                np.copyto(i_im, s_im)
+            else:  # I(n,m) = z/r^2 I(n-1,m) - K(n,m)/r^2 I(n-2,m), with I(n-2,m) = 0 for n = m+1
+                i2_re, i2_im, i1_re, i1_im, i_re, i_im = i1_re, i1_im, i_re, i_im, i2_re, i2_im
+                np.multiply(zr, i1_re, out=i_re)
+                if (m != 0):
+                    np.multiply(zr, i1_im, out=i_im)
+                if (n > m+1):
+                    np.multiply(inv_r2, i2_re, out=t1)
+                    t1 *= K[n,m]
+                    i_re -= t1
+                    if (m != 0):
+                        np.multiply(inv_r2, i2_im, out=t1)
+                        t1 *= K[n,m]
+                        i_im -= t1
+            if (n == 0):
+                continue
+            # B += Re[C I(n,m)] = C_re I_re - C_im I_im, for each component (I_im = 0 for m = 0)
+            for i_comp in range(len(outputs)):
+                if (c_re[i_comp,n,m] != 0):
+                    np.multiply(i_re, c_re[i_comp,n,m], out=t1)
+                    outputs[i_comp] += t1
+                if (m != 0) and (c_im[i_comp,n,m] != 0):
+                    np.multiply(i_im, c_im[i_comp,n,m], out=t1)
+                    outputs[i_comp] -= t1
+
+
+def xyz_recursion_matrix(x_in, y_in, z_in, tables, N_input, workspace, out, chunk_size=2048):
+    # The same as xyz_recursion, but instead of adding each I(n,m) to each component as it is found,
+    # all the I(n,m) for a chunk of positions are kept (2 x number of I(n,m) by chunk_size, in workspace),
+    # and the components are then one matrix product with tables['matrix']. This is much faster when
+    # there are many components (i.e. the Jacobian), but adds the terms in a different order, so can
+    # differ from xyz_recursion by rounding errors. out (n x number of components) is filled in.
+    ws = workspace
+    n_chunk = min(N_input, chunk_size)
+    I_all = ws.buffer('I_all', n_chunk, rows=tables['matrix'].shape[0])  # rows of I_re, I_im for each I(n,m)
+    for i_start in range(0, N_input, n_chunk):
+        i_end = min(i_start + n_chunk, N_input)
+        I = I_all[:,:i_end-i_start]
+        _solid_harmonics(x_in[i_start:i_end], y_in[i_start:i_end], z_in[i_start:i_end],
+                         tables['n_max'], tables['K'], ws, I)
+        np.matmul(I.T, tables['matrix'], out=out[i_start:i_end])
+
+
+def design_tables(degree, r_scale):
+    # Returns the tables for design_recursion, for all the coefficients up to degree, in the order of
+    # the g and h tables in the comments of the model codes (i.e. the original Schmidt semi-normalised
+    # values, index n*(n+1)/2 + m for degree n and order m, starting at index 0 for g(0,0)), g then h.
+    # r_scale = 71492/(1 Rj in km that the coefficients assume). Tables are made once for each degree.
+    #  n_max, K - as cartesian_tables, for the solid harmonics up to degree + 1.
+    #  rows, values - size 3 x n_coeff x n_terms: component [c] of the field for a coefficient [i] of 1
+    #           is the sum over [t] of values[c,i,t] x row rows[c,i,t] of the I(n,m) rows made by
+    #           _solid_harmonics (padded with values of 0).
+    key = ('design', degree, r_scale)
+    if key in _TABLES:
+        return _TABLES[key]
+
+    n_max = degree + 1
+    K = _K_table(n_max)
+
+    # Row of the I(n,m) made by _solid_harmonics (real part, the imaginary part is the next row)
+    row = np.zeros((n_max+1,n_max+1),dtype='int64')
+    j = 0
+    for m in range(0, n_max+1):
+        for n in range(m, n_max+1):
+            row[n,m] = 2*j
+            j += 1
+
+    L = (degree+1)*(degree+2)//2
+    schmidt = _schmidt_to_gauss(degree)
+    scale = np.float64(r_scale)**(-np.arange(1, n_max+2,dtype='float64'))  # r_scale^-(n+1)
+    terms = [[[] for i in range(2*L)] for c in range(3)]
+    for n in range(1, degree+1):
+        for m in range(0, n+1):
+            for i_gh in (0, 1):
+                V = np.zeros((n_max+1,n_max+1),dtype='complex128')
+                V[n,m] = schmidt[n,m] * (1.0 if (i_gh == 0) else -1j)  # V = Re[(g - ih) I(n,m)]
+                i_coeff = i_gh*L + n*(n+1)//2 + m
+                for c, C in enumerate(_gradient(V, degree)):
+                    C = -C * scale[:,np.newaxis]  # B = -grad(V), with r_scale^-(n+1) as multi_tables
+                    for n_c, m_c in zip(*np.nonzero(C)):
+                        if (C[n_c,m_c].real != 0):
+                            terms[c][i_coeff].append((row[n_c,m_c]  ,  C[n_c,m_c].real))
+                        if (C[n_c,m_c].imag != 0):
+                            terms[c][i_coeff].append((row[n_c,m_c]+1, -C[n_c,m_c].imag))
+
+    n_terms = max(1, max(len(t) for terms_c in terms for t in terms_c))
+    rows   = np.zeros((3, 2*L, n_terms),dtype='int64')
+    values = np.zeros((3, 2*L, n_terms),dtype='float64')
+    for c in range(3):
+        for i_coeff in range(2*L):
+            for t, (r, v) in enumerate(terms[c][i_coeff]):
+                rows  [c,i_coeff,t] = r
+                values[c,i_coeff,t] = v
+
+    tables = {'n_max': n_max, 'K': K, 'n_rows': 2*j, 'rows': rows, 'values': values}
+    for name in ('K', 'rows', 'values'):
+        tables[name].setflags(write=False)
+    _TABLES[key] = tables
+    return tables
+
+
+def design_recursion(x_in, y_in, z_in, tables, N_input, workspace, out, chunk_size=2048):
+    # The design matrix for a 1D input of size n, with x_in, y_in and z_in already scaled to the Rj the
+    # coefficients expect, from the tables of design_tables. out (n x 3 x n_coeff) is filled in with
+    # [Bx, By, Bz] (nT) for each coefficient of 1 nT, so B = out @ coefficients. The I(n,m) are made
+    # for a chunk of positions at a time (in workspace), as in xyz_recursion_matrix.
+    ws = workspace
+    rows   = tables['rows']
+    values = tables['values']
+    n_chunk = min(N_input, chunk_size)
+    I_all = ws.buffer('I_all', n_chunk, rows=tables['n_rows'])
+    for i_start in range(0, N_input, n_chunk):
+        i_end = min(i_start + n_chunk, N_input)
+        I = I_all[:,:i_end-i_start]
+        _solid_harmonics(x_in[i_start:i_end], y_in[i_start:i_end], z_in[i_start:i_end],
+                         tables['n_max'], tables['K'], ws, I)
+        for c in range(3):
+            D = I[rows[c,:,0]] * values[c,:,0,np.newaxis]  # size n_coeff x chunk
+            for t in range(1, rows.shape[2]):
+                D += I[rows[c,:,t]] * values[c,:,t,np.newaxis]
+            out[i_start:i_end,c,:] = D.T
+
+
+def ensemble_matrix(coeffs, tables):
+    # The matrix (as in cartesian_tables) for K sets of coefficients at once, from the design_tables
+    # of their degree. coeffs is size K x n_coeff, each row [g, h] in the order of design_tables.
+    # Column 3*k + c of the matrix is component c (Bx, By, Bz) of coefficient set k.
+    rows   = tables['rows']
+    values = tables['values']
+    K_sets = coeffs.shape[0]
+    matrix = np.zeros((tables['n_rows'], 3*K_sets),dtype='float64')
+    for c in range(3):
+        for t in range(rows.shape[2]):
+            np.add.at(matrix[:,c::3], rows[c,:,t], values[c,:,t,np.newaxis] * coeffs.T)
+    return matrix
+
+
+def ensemble_recursion(x_in, y_in, z_in, tables, matrix, N_input, workspace, out, chunk_size=2048):
+    # The field of K sets of coefficients for a 1D input of size n, with x_in, y_in and z_in already
+    # scaled to the Rj the coefficients expect. The I(n,m) are made once for a chunk of positions at a
+    # time (from the design_tables), and the fields of all the sets are then one matrix product with
+    # matrix from ensemble_matrix. out (K x n x 3) is filled in with Bx, By, Bz (nT).
+    ws = workspace
+    K_sets = out.shape[0]
+    n_chunk = min(N_input, chunk_size)
+    I_all = ws.buffer('I_all', n_chunk, rows=tables['n_rows'])
+    for i_start in range(0, N_input, n_chunk):
+        i_end = min(i_start + n_chunk, N_input)
+        I = I_all[:,:i_end-i_start]
+        _solid_harmonics(x_in[i_start:i_end], y_in[i_start:i_end], z_in[i_start:i_end],
+                         tables['n_max'], tables['K'], ws, I)
+        B = np.matmul(I.T, matrix)  # size chunk x 3K
+        out[:,i_start:i_end,:] = np.transpose(np.reshape(B, (i_end-i_start,K_sets,3)), (1,0,2))
+
+
+def _schmidt_to_gauss(degree):
+    # Factors from the Schmidt semi-normalised g and h to the modified (Gauss normalised) g and h used
+    # by the recursions, as in expand_out_g_and_h (Mother_Source/reordergh.py). Index [n,m].
+    # (n and m in the loops are degree + 1 and order + 1, as in expand_out_g_and_h)
+    factor = np.zeros((degree+1,degree+1),dtype='float64')
+    s = np.float64(1)
+    for n in range(2, degree+1 +1):
+        s = s * np.float64( 2*n - 3 )/np.float64( n - 1 )
+        p = s.copy()
+        factor[n-1,0] = s
+        for m in range(2, n +1):
+            if (m == 2):
+                aa = np.float64(2)
+            else:
+                aa = np.float64(1)
+            p = p * np.sqrt( aa*np.float64( n-m+1 )/np.float64( n+m-2 ) )
+            factor[n-1,m-1] = p
+    return factor
+
+
+def _solid_harmonics(x_in, y_in, z_in, n_max, K, workspace, I):
+    # Fills I (2 x number of I(n,m) by n) with the real and imaginary parts of each I(n,m), up to
+    # degree n_max, in the order m, then n from m to n_max (i.e. the same order as packed in
+    # cartesian_tables), for a 1D input of size n already scaled to the Rj the model expects.
+    # Other arrays used are buffers in workspace.
+    ws = workspace
+    N_input = x_in.size
+    t = ws.buffer('t1', N_input)
+    inv_r2 = ws.buffer('inv_r2', N_input)
+    np.multiply(x_in, x_in, out=inv_r2)
+    np.multiply(y_in, y_in, out=t)
+    inv_r2 += t
+    np.multiply(z_in, z_in, out=t)
+    inv_r2 += t  # = r^2
+    np.sqrt(inv_r2, out=I[0])
+    np.divide(1.0, I[0], out=I[0])  # I(0,0) = 1/r
+    I[1].fill(0)
+    np.divide(1.0, inv_r2, out=inv_r2)
+    xr = np.multiply(x_in, inv_r2, out=ws.buffer('xr', N_input))
+    yr = np.multiply(y_in, inv_r2, out=ws.buffer('yr', N_input))
+    zr = np.multiply(z_in, inv_r2, out=ws.buffer('zr', N_input))
+
+    j = 0  # I(n,m) number
+    j_mm = 0  # I(m-1,m-1) number
+    for m in range(0, n_max+1):
+        for n in range(m, n_max+1):
+            i_re = I[2*j]
+            i_im = I[2*j+1]
+            if (n == m) and (m != 0):  # I(m,m) = (x + iy)/r^2 I(m-1,m-1)
+                s_re = I[2*j_mm]
+                s_im = I[2*j_mm+1]
+                np.multiply(s_re, xr, out=i_re)
+                np.multiply(s_im, yr, out=t)
+                i_re -= t
+                np.multiply(s_re, yr, out=i_im)
+                np.multiply(s_im, xr, out=t)
+                i_im += t
+                j_mm = j
+            elif (n != m):  # I(n,m) = z/r^2 I(n-1,m) - K(n,m)/r^2 I(n-2,m)
+                np.multiply(zr, I[2*j-2], out=i_re)
+                np.multiply(zr, I[2*j-1], out=i_im)
+                if (n > m+1):
+                    np.multiply(inv_r2, I[2*j-4], out=t)
+                    t *= K[n,m]
+                    i_re -= t
+                    np.multiply(inv_r2, I[2*j-3], out=t)
+                    t *= K[n,m]
+                    i_im -= t
+            j += 1
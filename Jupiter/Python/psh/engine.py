@@ -0,0 +1,1974 @@
+import os
+import math
+import time
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from . import cartesian
+from . import grid
+from . import normalised
+
+# Shared spherical harmonic engine for the Python codes in this directory.
+#
+# Each jovian_*_internal_rtp.py and jovian_*_internal_xyz.py file holds the g, h and rec
+# arrays for its model, and passes them here. This file holds the Legendre/longitude
+# recursion once, so all the models use the same code.
+#
+# The g, h and rec arrays are the ones made by expand_out_g_and_h in Mother_Source/reordergh.py,
+# i.e. the modified g and h arrays (not the original g and h coefficients) and the rec array.
+#
+# Citation Info:
+#  DOI: 10.5281/zenodo.6814109     This DOI links to all versions of code at the Github.
+#  Github: https://github.com/rjwilson-LASP/PSH
+
+R_RJ_KM = 71492  # 1 Rj in km, as expected for all inputs of these codes
+
+# Code used for the recursion, see set_backend
+_BACKEND = 'auto'
+_BACKENDS = ('auto', 'scalar', 'numba', 'numpy', 'threads')
+_NUMBA_KERNELS = None  # psh/numba_kernels.py, imported on first use (False if Numba is not installed)
+_DISPATCH = None  # backends for each number of positions for the 'auto' backend, see calibrate (read on first use)
+_CHUNK_BAND = threading.local()  # backend chosen by 'auto' for a whole chunked call, used by its chunks
+_DISPATCH_FILE = os.environ.get('PSH_DISPATCH_FILE',
+                                os.path.join(os.path.expanduser('~'), '.config', 'psh', 'dispatch.txt'))
+_SCALAR_LISTS = {}  # g, h and rec as lists for the scalar code, for each g array used (keyed by id, with g kept too)
+_SUMMATION = 'recursion'  # see set_summation
+_MATRIX_TABLES = {}  # tables made by _matrix_tables, for each g array used (keyed by id, with g kept too)
+_MATRIX_CHUNK = 8192  # positions per chunk for _rtp_recursion_matrix
+_CHUNK_SIZE = 16384  # positions per chunk for vector inputs, see set_chunking
+_MAX_BYTES  = None   # memory budget for the arrays of each chunk, see set_chunking
+
+
+def set_backend(backend):
+    # Choose the code used for the recursion by internal_rtp and internal_xyz:
+    #  'auto'    - chosen for each call from the number of positions (default), with the fastest code for
+    #              each number of positions found by calibrate, or if calibrate has not been run, the
+    #              scalar code for 1 position, then the Numba compiled kernels if Numba is installed
+    #              (else the scalar code up to 16 positions, then numpy).
+    #  'scalar'  - the scalar code (internal_rtp_scalar), once for each position.
+    #  'numba'   - the Numba compiled kernels in numba_kernels.py, which loop over the positions in parallel.
+    #  'numpy'   - the numpy code in this file.
+    #  'threads' - the numpy code, with the chunks (see set_chunking) run on a pool of threads.
+    # All give the same results, to within rounding errors (~1e-15 relative). Scalar inputs use the numpy
+    # code, except for 'auto' and 'scalar' (the same results, faster), and so does jacobian=True for 'scalar'.
+    global _BACKEND
+    if backend not in _BACKENDS:
+        raise ValueError("backend must be one of 'auto', 'scalar', 'numba', 'numpy' or 'threads'")
+    _BACKEND = backend
+    if (backend == 'numba') and (_numba_kernels() is None):
+        _BACKEND = 'auto'
+        raise ImportError('backend numba needs Numba installed')
+
+
+def get_backend(n_positions=None, jacobian=False, order=13):
+    # Returns the code that internal_rtp and internal_xyz will use for n_positions positions (1 for a
+    # scalar input), 'scalar', 'numba', 'numpy' or 'threads', or for a large vector input if not given,
+    # for a model of order order (which sets the size of the chunks with set_chunking(max_bytes=...)).
+    if (n_positions is None):
+        n_positions = np.iinfo(np.int64).max
+    return _dispatch(n_positions, jacobian, order)
+
+
+def calibrate(save=True, file_name=None):
+    # Times the scalar, numpy, Numba (if installed) and threads (if more than one core) codes for
+    # JRM33 order 13 over a range of numbers of positions, to find the fastest for each, which the
+    # 'auto' backend then uses (see set_backend). Takes a few seconds.
+    # The results are saved to file_name (default ~/.config/psh/dispatch.txt, or the environment
+    # variable PSH_DISPATCH_FILE if set) if save is True, and read from there in later sessions.
+    # Returns a dictionary of:
+    #  bands   - list of (n_max, backend): backend is used for calls of up to n_max positions (and
+    #            more than the n_max before), with the last backend used for any larger calls too.
+    #  workers - the number of threads for the 'threads' backend.
+    #  times   - the fastest time (s) of each backend for each number of positions timed.
+    global _BACKEND, _DISPATCH
+    from .models import get_model
+    model = get_model('jrm33', order=13)
+    backends = ['numpy', 'scalar']
+    if (_numba_installed()):
+        backends.append('numba')
+    workers = os.cpu_count() or 1
+    if (workers > 1):
+        backends.append('threads')
+
+    rng = np.random.default_rng(0)
+    sizes = [1, 2, 4, 8, 16, 32, 64, 256, 1024, 4096, 16384, 65536, 262144]
+    x_rj, y_rj, z_rj = rng.uniform(-10.0, 10.0, (3,sizes[-1]))
+    times = {}
+    _BACKEND_before = _BACKEND
+    _DISPATCH_before = _DISPATCH
+    _DISPATCH = {'bands': [(1, 'scalar')], 'workers': workers}
+    try:
+        for backend in backends:
+            _BACKEND = backend
+            model.internal_xyz(x_rj[:2], y_rj[:2], z_rj[:2])  # e.g. compiles the Numba code
+            for N_input in sizes:
+                if (backend == 'threads') and (_dispatch(N_input, False, model.order) != 'threads'):
+                    continue  # too few chunks
+                if (N_input == 1):
+                    positions = (x_rj[0], y_rj[0], z_rj[0])
+                else:
+                    positions = (x_rj[:N_input], y_rj[:N_input], z_rj[:N_input])
+                times[backend, N_input] = _best_time(model.internal_xyz, positions)
+                if (backend == 'scalar') and (times[backend, N_input] > 4*times['numpy', N_input]):
+                    break  # only slower from here
+    finally:
+        _BACKEND  = _BACKEND_before
+        _DISPATCH = _DISPATCH_before
+
+    # Fastest for each size, but numpy (then numba) unless another is more than 10% faster, to not
+    # switch back and forth for the noise in the times
+    bands = []
+    for N_input in sizes:
+        timed = [backend for backend in ('numpy', 'numba', 'scalar', 'threads') if (backend, N_input) in times]
+        best = min(times[backend, N_input] for backend in timed)
+        fastest = [backend for backend in timed if (times[backend, N_input] <= 1.1*best)][0]
+        if (len(bands) > 0) and (bands[-1][1] == fastest):
+            bands[-1] = (N_input, fastest)
+        else:
+            bands.append((N_input, fastest))
+    for i in range(len(bands)-1):  # from half way (geometrically) to the next size timed
+        N_next = sizes[sizes.index(bands[i][0]) + 1]
+        bands[i] = (int(math.sqrt(bands[i][0]*N_next)), bands[i][1])
+
+    _DISPATCH = {'bands': bands, 'workers': workers}
+    if save:
+        _write_dispatch_file(_DISPATCH, file_name or _DISPATCH_FILE)
+    return {'bands': list(bands), 'workers': workers, 'times': times}
+
+
+def set_summation(summation):
+    # Choose how the sums over degree are done by the numpy code, for vector inputs of internal_rtp:
+    #  'recursion' - the same loop as the scalar code, updating every n-length array for each term,
+    #                so gives the same results as the scalar code (default).
+    #  'matrix'    - the radial powers are folded in to the Legendre recursion, and the sums over
+    #                degree for each order are done as small matrix products, on chunks of positions
+    #                small enough to stay in cache (see _rtp_recursion_matrix). This is about a third
+    #                of the passes over the arrays per term, and agrees with 'recursion' to within
+    #                rounding errors (~1e-15 relative).
+    # The Numba kernels do one position at a time, so are the same for both.
+    global _SUMMATION
+    if summation not in ('recursion', 'matrix'):
+        raise ValueError("summation must be one of 'recursion' or 'matrix'")
+    _SUMMATION = summation
+
+
+def get_summation():
+    # Returns the summation chosen by set_summation, 'recursion' or 'matrix'.
+    return _SUMMATION
+
+
+def set_chunking(chunk_size=16384, max_bytes=None):
+    # Choose how many positions internal_rtp and internal_xyz do at a time for vector inputs. Larger inputs
+    # are split in to chunks, each written in to its part of the output, so all the arrays used by the
+    # recursion are for one chunk, and stay in the CPU cache (rather than going through memory for every
+    # term), and the memory used does not grow with the number of positions (only the inputs and output).
+    # The results are the same as without chunks (except with the numpy backend and jacobian=True, where
+    # the matrix products can round differently for small chunks, by ~1e-15 relative).
+    #  chunk_size - positions per chunk (default 16384, at least 2), or None for no chunks.
+    #  max_bytes  - if given, chunks are also made small enough for their arrays to fit in max_bytes bytes
+    #               (see _bytes_per_position: 320 bytes per position, or 16 x order + 216 if more, and with
+    #               jacobian=True, 8 x ((order + 3) x (order + 4) + 5), e.g. 3736 for order 18).
+    global _CHUNK_SIZE, _MAX_BYTES
+    for name, value in (('chunk_size', chunk_size), ('max_bytes', max_bytes)):
+        if (value is not None) and ((int(value) != value) or (value < 1)):
+            raise ValueError('%s must be a positive integer, or None'%name)
+    _CHUNK_SIZE = None if (chunk_size is None) else int(chunk_size)
+    _MAX_BYTES  = None if (max_bytes  is None) else int(max_bytes)
+
+
+def get_chunking():
+    # Returns (chunk_size, max_bytes), as chosen by set_chunking.
+    return _CHUNK_SIZE, _MAX_BYTES
+
+
+def internal_rtp(r_rj, colat_rads, elong_rads, g, h, rec, r_ref_km, out=None, workspace=None, jacobian=False,
+                 tol_nT=None, return_degree=False, dtype=None, layout=None):
+    # Code to calculate an internal magnetic field model from its spherical harmonic g and h values.
+    #
+    # Required inputs (System III (1965) Spherical, right handed, and assuming 1 Rj = 71492 km):
+    #  r_rj       - radial distance, in Rj.
+    #  colat_rads - colatitude, in radians.                    Value(s) should be 0 <= colat_rads <=  pi.
+    #  elong_rads - East longitude, right handed, in radians.  Value(s) should be 0 <= elong_rads <= 2pi.
+    #               (Or r_rj may be an n x 3 array of positions [r_rj, colat_rads, elong_rads], or any buffer
+    #               of them, e.g. a memoryview, with colat_rads and elong_rads None. The columns are used in
+    #               place, without a copy when they are already doubles, as are 1D arrays of doubles.)
+    #  g, h, rec  - modified g and h arrays, and rec array, from expand_out_g_and_h (Mother_Source/reordergh.py).
+    #  r_ref_km   - 1 Rj in km that the model g and h values assume (e.g. 71323 for VIP4).
+    #
+    # Optional inputs:
+    #  out        - n x 3 numpy array of doubles to write B in to (and return), instead of making a new array.
+    #               It can have any strides (e.g. C-contiguous), but must not share memory with the inputs.
+    #  workspace  - Workspace to reuse for the arrays used in the recursion, instead of making new arrays.
+    #  jacobian   - if True, also return the gradient of B (see J below).
+    #  tol_nT     - if given, each position only uses the degrees needed for B to within tol_nT (nT) of the
+    #               full model, from a bound on the field of each degree (see _truncation_degree), e.g. far
+    #               from the planet only the lowest degrees are used. Positions needing the same degree are
+    #               run together. (With jacobian, J uses the same degrees, but is not covered by tol_nT.)
+    #  return_degree - if True, also return the degree used, and the bound on the error (nT), at each position.
+    #  dtype      - 'float64' (or None, the default), or 'float32' to take the inputs and give B in single
+    #               precision (and out, if given, float32), with the arrays of the numpy recursion in single
+    #               precision too, which halves the memory used and moved, e.g. for maps of many positions.
+    #               For vector inputs, B is then found with the Cartesian recursion (see cartesian.py). Agrees
+    #               with 'float64' to ~1e-6 relative to |B| (see README.md for each model). Not with jacobian.
+    #  layout     - how B is returned: 'columns' (or None, the default) an n x 3 array with each component
+    #               contiguous, 'rows' an n x 3 C-contiguous array (each position's B together), or 'separate'
+    #               a tuple of 3 contiguous 1D arrays (e.g. Br, Btheta, Bphi = ...). Each is written in to
+    #               directly, not copied. With 'separate', out (if given) is a 3 x n array, whose rows are
+    #               returned.
+    #
+    # Outputs:
+    #  B - Spherical Magnetic field vector, [Br, Btheta, Bphi], units of nT.
+    #      Size 1 x 3 for a scalar input, or n x 3 for a 1D input of size n.
+    #  J - Only if jacobian is True, the gradient of B in the local (r, theta, phi) directions, units of nT/Rj.
+    #      J[i,j,k] = rate of change of component j of B along direction k at position i, i.e. the Cartesian
+    #      Jacobian rotated in to the spherical unit vectors. Size n x 3 x 3 (1 x 3 x 3 for a scalar input).
+    #      B and J are then both found with the Cartesian recursion (see cartesian.py).
+    #  degree, bound - Only if return_degree is True (after J, if jacobian is True), the degree used and the
+    #      bound on the size of the field of the degrees left out (nT), each size n (0 when all are used).
+
+    # Check inputs r_rj, colat_rads and elong_rads are all numbers, and convert to numpy doubles here
+    # (or singles, for dtype float32).
+    dtype = _float_dtype(dtype)
+    if (colat_rads is None) and (elong_rads is None):
+        r_rj, colat_rads, elong_rads = _position_columns(r_rj, dtype)
+    if (layout is not None) and (layout != 'columns'):
+        return _with_layout(internal_rtp, layout, (r_rj, colat_rads, elong_rads), g, h, rec, r_ref_km, out,
+                            workspace=workspace, jacobian=jacobian, tol_nT=tol_nT, return_degree=return_degree,
+                            dtype=dtype)
+    try:
+        r_rj       = _as_float(    r_rj  , dtype)
+        colat_rads = _as_float(colat_rads, dtype)
+        elong_rads = _as_float(elong_rads, dtype)
+    except Exception as e:
+        raise TypeError('Inputs must be numeric.') from e
+
+    # Check inputs are same size.
+    N_input = r_rj.size
+    scalar_input = (N_input == 1)  # scalar or not
+
+    # Check inputs r_rj, colat_rads and elong_rads are all arrays of the same size (scalar or 1D only)
+    if (r_rj.ndim > 1):
+        raise ValueError('First  argument    r_rj    must be a scalar number or 1D array of numbers')
+    if (colat_rads.ndim > 1):
+        raise ValueError('Second argument colat_rads must be a scalar number or 1D array of numbers')
+    if (elong_rads.ndim > 1):
+        raise ValueError('Third  argument elong_rads must be a scalar number or 1D array of numbers')
+    if (N_input != colat_rads.size):
+        raise ValueError('First argument r_rj must be the same size as 2nd argument colat_rads')
+    if (N_input != elong_rads.size):
+        raise ValueError('First argument r_rj must be the same size as 3rd argument elong_rads')
+
+    # Changing inputs to Doubles, and not using input names (so as not to alter inputs, an IDL issue)
+    r_rj_dbl       =              r_rj
+    colat_rads_dbl =          colat_rads
+    elong_rads_dbl =          elong_rads
+
+    if (out is not None):
+        _check_out(out, N_input, dtype)
+    if jacobian and (dtype == np.float32):
+        raise ValueError('jacobian=True needs dtype float64')
+
+    if (tol_nT is not None) or return_degree:
+        return _truncated(internal_rtp, (r_rj_dbl, colat_rads_dbl, elong_rads_dbl), r_rj_dbl, g, h, rec, r_ref_km,
+                          N_input, scalar_input, out, workspace, jacobian, tol_nT, dtype)
+
+    if (not scalar_input) and (N_input > _chunk_size(jacobian, _order_plus1(rec) - 2) + 1):
+        return _chunked(internal_rtp, (r_rj_dbl, colat_rads_dbl, elong_rads_dbl), g, h, rec, r_ref_km, N_input,
+                        out, workspace, jacobian, dtype)
+
+    if (dtype == np.float32):
+        return _field_float32(True, (r_rj_dbl, colat_rads_dbl, elong_rads_dbl), g, h, rec, r_ref_km, N_input,
+                              scalar_input, out, workspace)
+
+    if jacobian:
+        return _rtp_jacobian(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, g, h, rec, r_ref_km, N_input,
+                             workspace, out)
+
+    if (_dispatch(N_input, False, _order_plus1(rec) - 2) == 'scalar'):
+        return _scalar_loop(internal_rtp_scalar, (r_rj_dbl, colat_rads_dbl, elong_rads_dbl), g, h, rec, r_ref_km,
+                            N_input, out)
+
+    # Scaling distances if the model expects 1Rj to be different to the 71492 km that the inputs expect
+    if (r_ref_km != R_RJ_KM):
+        r_rj_dbl = r_rj_dbl * np.float64(R_RJ_KM)/np.float64(r_ref_km)
+    if (not scalar_input) and (workspace is None):
+        workspace = Workspace(N_input, _order_plus1(rec) - 2)
+
+    bbr, bbt, bf, sin_theta, cos_theta, sin_phi, cos_phi = _recursion(
+        r_rj_dbl, colat_rads_dbl, elong_rads_dbl, g, h, rec, N_input, scalar_input, workspace)
+
+    if (out is not None):
+        out[:,0] = bbr
+        out[:,1] = bbt
+        out[:,2] = bf
+        return out
+    if scalar_input:
+        return             np.array([[bbr,bbt,bf]])
+    else:
+        return np.transpose(np.array([bbr,bbt,bf]))
+
+
+def internal_xyz(x_rj, y_rj, z_rj, g, h, rec, r_ref_km, out=None, workspace=None, jacobian=False,
+                 tol_nT=None, return_degree=False, dtype=None, layout=None):
+    # Code to calculate an internal magnetic field model from its spherical harmonic g and h values.
+    #
+    # Required inputs (System III (1965) Cartesian, right handed, and assuming 1 Rj = 71492 km):
+    #  x_rj       - Jupiter SYSIII right-handed position in x, in Rj.
+    #  y_rj       - Jupiter SYSIII right-handed position in y, in Rj.
+    #  z_rj       - Jupiter SYSIII right-handed position in z, in Rj.
+    #               (Or x_rj may be an n x 3 array of positions [x_rj, y_rj, z_rj], with y_rj and z_rj None,
+    #               as internal_rtp.)
+    #  g, h, rec  - modified g and h arrays, and rec array, from expand_out_g_and_h (Mother_Source/reordergh.py).
+    #  r_ref_km   - 1 Rj in km that the model g and h values assume (e.g. 71323 for VIP4).
+    #
+    # Optional inputs:
+    #  out        - n x 3 numpy array of doubles to write B in to (and return), instead of making a new array.
+    #  workspace  - Workspace to reuse for the arrays used in the recursion, instead of making new arrays.
+    #  jacobian   - if True, also return the Jacobian of B (see J below).
+    #  tol_nT, return_degree, dtype, layout - as internal_rtp.
+    #
+    # Outputs:
+    #  B - Cartesian Magnetic field vector, [Bx, By, Bz], units of nT.
+    #      Size 1 x 3 for a scalar input, or n x 3 for a 1D input of size n.
+    #  J - Only if jacobian is True, the Jacobian of B, units of nT/Rj, J[i,j,k] = dB_j/dx_k at position i
+    #      (x_k = x, y, z). Size n x 3 x 3 (1 x 3 x 3 for a scalar input).
+    #  degree, bound - Only if return_degree is True, as internal_rtp.
+
+    # Check inputs x_rj, y_rj and z_rj are all numbers, and convert to numpy doubles here
+    # (or singles, for dtype float32).
+    dtype = _float_dtype(dtype)
+    if (y_rj is None) and (z_rj is None):
+        x_rj, y_rj, z_rj = _position_columns(x_rj, dtype)
+    if (layout is not None) and (layout != 'columns'):
+        return _with_layout(internal_xyz, layout, (x_rj, y_rj, z_rj), g, h, rec, r_ref_km, out,
+                            workspace=workspace, jacobian=jacobian, tol_nT=tol_nT, return_degree=return_degree,
+                            dtype=dtype)
+    try:
+        x_rj = _as_float(x_rj, dtype)
+        y_rj = _as_float(y_rj, dtype)
+        z_rj = _as_float(z_rj, dtype)
+    except Exception as e:
+        raise TypeError('Inputs must be numeric.') from e
+
+    # Check inputs are same size.
+    N_input = x_rj.size
+    scalar_input = (N_input == 1)  # scalar or not
+
+    # Check inputs x_rj, y_rj and z_rj are all arrays of the same size (scalar or 1D only)
+    if (N_input != y_rj.size):
+        raise ValueError('First argument x_rj must be the same size as 2nd argument y_rj')
+    if (N_input != z_rj.size):
+        raise ValueError('First argument x_rj must be the same size as 3rd argument z_rj')
+    if (x_rj.ndim > 1):
+        raise ValueError('First  argument x_rj must be a scalar number or 1D array of numbers')
+    if (y_rj.ndim > 1):
+        raise ValueError('Second argument y_rj must be a scalar number or 1D array of numbers')
+    if (z_rj.ndim > 1):
+        raise ValueError('Third  argument z_rj must be a scalar number or 1D array of numbers')
+
+    # Changing inputs to Doubles, and not using input names (so as not to alter inputs, an IDL issue)
+    x_in =        x_rj   # X in SYSIII, units Rj
+    y_in =        y_rj   # Y in SYSIII, units Rj
+    z_in =        z_rj   # Z in SYSIII, units Rj
+
+    if (out is not None):
+        _check_out(out, N_input, dtype)
+    if jacobian and (dtype == np.float32):
+        raise ValueError('jacobian=True needs dtype float64')
+
+    if (tol_nT is not None) or return_degree:
+        return _truncated(internal_xyz, (x_in, y_in, z_in), np.sqrt(x_in *x_in + y_in *y_in + z_in *z_in),
+                          g, h, rec, r_ref_km, N_input, scalar_input, out, workspace, jacobian, tol_nT, dtype)
+
+    if (not scalar_input) and (N_input > _chunk_size(jacobian, _order_plus1(rec) - 2) + 1):
+        return _chunked(internal_xyz, (x_in, y_in, z_in), g, h, rec, r_ref_km, N_input, out, workspace, jacobian,
+                        dtype)
+
+    if (dtype == np.float32):
+        return _field_float32(False, (x_in, y_in, z_in), g, h, rec, r_ref_km, N_input, scalar_input, out, workspace)
+
+    if jacobian:
+        return _xyz_jacobian(x_in, y_in, z_in, g, h, rec, r_ref_km, N_input, workspace, out)
+
+    if (_dispatch(N_input, False, _order_plus1(rec) - 2) == 'scalar'):
+        return _scalar_loop(internal_xyz_scalar, (x_in, y_in, z_in), g, h, rec, r_ref_km, N_input, out)
+
+    # Scaling distances if the model expects 1Rj to be different to the 71492 km that the inputs expect
+    if (r_ref_km != R_RJ_KM):
+        r_scale = np.float64(R_RJ_KM)/np.float64(r_ref_km)
+        x_in = x_in * r_scale
+        y_in = y_in * r_scale
+        z_in = z_in * r_scale
+
+    if not scalar_input:
+        # Vector inputs use the Cartesian (solid harmonic) recursion in cartesian.py, which works
+        # from x, y and z directly, so needs no angles and has no special case at the poles.
+        if (workspace is None):
+            workspace = Workspace(N_input, _order_plus1(rec) - 2)
+        if (out is None):
+            Bxyz = np.empty((3,N_input),dtype='float64')
+            out  = np.transpose(Bxyz)  # size n x 3, as before
+        _xyz_recursion(x_in, y_in, z_in, g, h, rec, N_input, workspace, out)
+        return out
+
+    rho_rj_sq = x_in *x_in + y_in *y_in
+    r_rj = np.sqrt(rho_rj_sq + z_in *z_in)
+
+    colat_rads = np.arccos(z_in /r_rj)
+    elong_rads = np.arctan2(y_in,x_in)
+
+    bbr, bbt, bf, sin_theta, cos_theta, sin_phi, cos_phi = _recursion(
+        r_rj, colat_rads, elong_rads, g, h, rec, N_input, scalar_input, workspace)
+
+    # Convert to cartesian coordinates
+    # Each line is one component, Bx, By then Bz
+    Bxyz = np.array([ \
+        bbr *sin_theta *cos_phi + bbt *cos_theta *cos_phi - bf *sin_phi , \
+        bbr *sin_theta *sin_phi + bbt *cos_theta *sin_phi + bf *cos_phi , \
+        bbr *cos_theta          - bbt *sin_theta                          \
+        ]) # size 3
+    if (out is not None):
+        out[0,:] = Bxyz
+        return out
+    return    np.array([Bxyz]) # size 1 x 3
+
+
+def internal_rtp_scalar(r_rj, colat_rads, elong_rads, g, h, rec, r_ref_km):
+    # Scalar only version of internal_rtp, for codes that need the field at one position at a time
+    # (e.g. field line tracing or ODE integrators), where the numpy overhead of internal_rtp dominates.
+    # The recursion is the same as internal_rtp, but done on Python floats with the math module.
+    #
+    # Required inputs (System III (1965) Spherical, right handed, and assuming 1 Rj = 71492 km):
+    #  r_rj       - radial distance, in Rj.                    Single number only.
+    #  colat_rads - colatitude, in radians.                    Single number only, 0 <= colat_rads <=  pi.
+    #  elong_rads - East longitude, right handed, in radians.  Single number only, 0 <= elong_rads <= 2pi.
+    #  g, h, rec  - modified g and h arrays, and rec array, as Python lists (e.g. g.tolist()).
+    #  r_ref_km   - 1 Rj in km that the model g and h values assume (e.g. 71323 for VIP4).
+    #
+    # Outputs:
+    #  (Br, Btheta, Bphi) - tuple of Python floats, units of nT.
+
+    # Check inputs r_rj, colat_rads and elong_rads are all single numbers, and convert to Python floats here.
+    try:
+        r_rj       = float(    r_rj  )
+        colat_rads = float(colat_rads)
+        elong_rads = float(elong_rads)
+    except Exception as e:
+        raise TypeError('Inputs must be single numbers.') from e
+
+    # Scaling distances if the model expects 1Rj to be different to the 71492 km that the inputs expect
+    if (r_ref_km != R_RJ_KM):
+        r_rj = r_rj * float(R_RJ_KM)/float(r_ref_km)
+
+    bbr, bbt, bf, sin_theta, cos_theta, sin_phi, cos_phi = _rtp_recursion_scalar(
+        r_rj, colat_rads, elong_rads, g, h, rec)
+
+    return bbr, bbt, bf
+
+
+def internal_xyz_scalar(x_rj, y_rj, z_rj, g, h, rec, r_ref_km):
+    # Scalar only version of internal_xyz, see internal_rtp_scalar.
+    #
+    # Required inputs (System III (1965) Cartesian, right handed, and assuming 1 Rj = 71492 km):
+    #  x_rj       - Jupiter SYSIII right-handed position in x, in Rj.  Single number only.
+    #  y_rj       - Jupiter SYSIII right-handed position in y, in Rj.  Single number only.
+    #  z_rj       - Jupiter SYSIII right-handed position in z, in Rj.  Single number only.
+    #  g, h, rec  - modified g and h arrays, and rec array, as Python lists (e.g. g.tolist()).
+    #  r_ref_km   - 1 Rj in km that the model g and h values assume (e.g. 71323 for VIP4).
+    #
+    # Outputs:
+    #  (Bx, By, Bz) - tuple of Python floats, units of nT.
+
+    # Check inputs x_rj, y_rj and z_rj are all single numbers, and convert to Python floats here.
+    try:
+        x_in = float(x_rj)
+        y_in = float(y_rj)
+        z_in = float(z_rj)
+    except Exception as e:
+        raise TypeError('Inputs must be single numbers.') from e
+
+    # Scaling distances if the model expects 1Rj to be different to the 71492 km that the inputs expect
+    if (r_ref_km != R_RJ_KM):
+        r_scale = float(R_RJ_KM)/float(r_ref_km)
+        x_in = x_in * r_scale
+        y_in = y_in * r_scale
+        z_in = z_in * r_scale
+
+    rho_rj_sq = x_in *x_in + y_in *y_in
+    r_rj = math.sqrt(rho_rj_sq + z_in *z_in)
+
+    colat_rads = math.acos(z_in /r_rj)
+    elong_rads = math.atan2(y_in,x_in)
+
+    bbr, bbt, bf, sin_theta, cos_theta, sin_phi, cos_phi = _rtp_recursion_scalar(
+        r_rj, colat_rads, elong_rads, g, h, rec)
+
+    # Convert to cartesian coordinates
+    return (bbr *sin_theta *cos_phi + bbt *cos_theta *cos_phi - bf *sin_phi ,
+            bbr *sin_theta *sin_phi + bbt *cos_theta *sin_phi + bf *cos_phi ,
+            bbr *cos_theta          - bbt *sin_theta                          )
+
+
+def internal_rtp_grid(r_rj, colat_rads, elong_rads, g, h, rec, r_ref_km):
+    # Grid version of internal_rtp, for B at every combination of the radial distances, colatitudes
+    # and longitudes given (e.g. a map, or a 3D cube). This is the same as calling internal_rtp on the
+    # flattened np.meshgrid(r_rj, colat_rads, elong_rads, indexing='ij'), to within rounding errors,
+    # but the Legendre values are found once per colatitude, the longitude terms once per longitude
+    # and the radial powers once per radius, see grid.py. Mirror image colatitudes about the equator
+    # share their Legendre values.
+    #
+    # Required inputs (System III (1965) Spherical, right handed, and assuming 1 Rj = 71492 km):
+    #  r_rj       - radial distances, in Rj.                    Scalar or 1D array, size N_r.
+    #  colat_rads - colatitudes, in radians.                    Scalar or 1D array, size N_colat.
+    #  elong_rads - East longitudes, right handed, in radians.  Scalar or 1D array, size N_elong.
+    #  g, h, rec  - modified g and h arrays, and rec array, from expand_out_g_and_h (Mother_Source/reordergh.py).
+    #  r_ref_km   - 1 Rj in km that the model g and h values assume (e.g. 71323 for VIP4).
+    #
+    # Outputs:
+    #  B - Spherical Magnetic field vector, [Br, Btheta, Bphi], units of nT.
+    #      Size N_r x N_colat x N_elong x 3.
+
+    # Check inputs r_rj, colat_rads and elong_rads are all numbers, and convert to 1D numpy doubles here.
+    try:
+        r_rj       = np.float64(    r_rj  )
+        colat_rads = np.float64(colat_rads)
+        elong_rads = np.float64(elong_rads)
+    except Exception as e:
+        raise TypeError('Inputs must be numeric.') from e
+    if (r_rj.ndim > 1):
+        raise ValueError('First  argument    r_rj    must be a scalar number or 1D array of numbers')
+    if (colat_rads.ndim > 1):
+        raise ValueError('Second argument colat_rads must be a scalar number or 1D array of numbers')
+    if (elong_rads.ndim > 1):
+        raise ValueError('Third  argument elong_rads must be a scalar number or 1D array of numbers')
+    r_rj_dbl       = np.atleast_1d(    r_rj  )
+    colat_rads_dbl = np.atleast_1d(colat_rads)
+    elong_rads_dbl = np.atleast_1d(elong_rads)
+
+    # Scaling distances if the model expects 1Rj to be different to the 71492 km that the inputs expect
+    if (r_ref_km != R_RJ_KM):
+        r_rj_dbl = r_rj_dbl * np.float64(R_RJ_KM)/np.float64(r_ref_km)
+
+    return grid.rtp_grid(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, g, h, rec, _order_plus1(rec))
+
+
+def internal_rtp_shell(r_rj, colat_rads, N_elong, g, h, rec, r_ref_km):
+    # Shell version of internal_rtp_grid, for B on whole rings of N_elong longitudes evenly spaced
+    # around the planet, elong_rads = 2pi * (0, 1, ... N_elong-1)/N_elong, at each colatitude and
+    # radial distance given (e.g. the surface, or Io's orbit).
+    #
+    # Required inputs (System III (1965) Spherical, right handed, and assuming 1 Rj = 71492 km):
+    #  r_rj       - radial distances, in Rj.                    Scalar or 1D array, size N_r.
+    #  colat_rads - colatitudes, in radians.                    Scalar or 1D array, size N_colat.
+    #  N_elong    - number of East longitudes around each ring. Integer.
+    #  g, h, rec  - modified g and h arrays, and rec array, from expand_out_g_and_h (Mother_Source/reordergh.py).
+    #  r_ref_km   - 1 Rj in km that the model g and h values assume (e.g. 71323 for VIP4).
+    #
+    # Outputs:
+    #  B - Spherical Magnetic field vector, [Br, Btheta, Bphi], units of nT.
+    #      Size N_r x N_colat x N_elong x 3.
+
+    # Check inputs r_rj and colat_rads are all numbers, and convert to 1D numpy doubles here.
+    try:
+        r_rj       = np.float64(    r_rj  )
+        colat_rads = np.float64(colat_rads)
+    except Exception as e:
+        raise TypeError('Inputs must be numeric.') from e
+    if (r_rj.ndim > 1):
+        raise ValueError('First  argument    r_rj    must be a scalar number or 1D array of numbers')
+    if (colat_rads.ndim > 1):
+        raise ValueError('Second argument colat_rads must be a scalar number or 1D array of numbers')
+    if (int(N_elong) != N_elong) or (N_elong < 1):
+        raise ValueError('Third  argument  N_elong   must be a positive integer')
+    r_rj_dbl       = np.atleast_1d(    r_rj  )
+    colat_rads_dbl = np.atleast_1d(colat_rads)
+
+    # Scaling distances if the model expects 1Rj to be different to the 71492 km that the inputs expect
+    if (r_ref_km != R_RJ_KM):
+        r_rj_dbl = r_rj_dbl * np.float64(R_RJ_KM)/np.float64(r_ref_km)
+
+    elong_rads_dbl = 2*np.pi*np.arange(int(N_elong),dtype='float64')/np.float64(N_elong)
+    return grid.rtp_grid(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, g, h, rec, _order_plus1(rec))
+
+
+def internal_xyz_multi(x_rj, y_rj, z_rj, models, out=None):
+    # Several models at the same positions in one pass, e.g. to compare models along a trajectory.
+    # The Cartesian recursion (see cartesian.py) is run once, up to the highest degree of the models,
+    # and each model's coefficients are summed in to its own output. Models that assume a different
+    # 1 Rj (e.g. 71323 km for VIP4 and VIT4, 71372 km for O6) have their coefficients scaled, so they
+    # give the same as their own internal_xyz, to within rounding errors.
+    #
+    # Required inputs (System III (1965) Cartesian, right handed, and assuming 1 Rj = 71492 km):
+    #  x_rj, y_rj, z_rj - Jupiter SYSIII right-handed position, in Rj. Scalars or 1D arrays of size n.
+    #  models     - list of models, each with attributes g, h, rec and r_ref_km (e.g. the modules
+    #               jovian_*_internal_xyz.py or jovian_*_internal_rtp.py themselves).
+    #
+    # Optional inputs:
+    #  out        - N_models x n x 3 numpy array of doubles to write B in to (and return).
+    #
+    # Outputs:
+    #  B - Cartesian Magnetic field vectors, [Bx, By, Bz], units of nT, size N_models x n x 3.
+    x_in, y_in, z_in = _position_inputs(x_rj, y_rj, z_rj, ('x_rj', 'y_rj', 'z_rj'))
+    N_input = x_in.size
+    B = _multi_recursion(x_in, y_in, z_in, models, N_input)  # size n x N_models x 3
+
+    if (out is None):
+        out = np.empty((len(models),N_input,3),dtype='float64')
+    elif (out.shape != (len(models),N_input,3)):
+        raise ValueError('out must be a numpy array of size N_models x n x 3')
+    out[...] = np.transpose(B, (1,0,2))
+    return out
+
+
+def internal_rtp_multi(r_rj, colat_rads, elong_rads, models, out=None):
+    # Spherical version of internal_xyz_multi, with the same inputs as internal_rtp, for
+    # Br, Btheta, Bphi (nT) of each model, size N_models x n x 3. The field is found with the
+    # Cartesian recursion, so agrees with internal_rtp to within rounding errors (or better, very
+    # close to the poles).
+    r_in, colat_in, elong_in = _position_inputs(r_rj, colat_rads, elong_rads, ('r_rj', 'colat_rads', 'elong_rads'))
+    N_input = r_in.size
+    sin_theta = np.sin(colat_in)
+    cos_theta = np.cos(colat_in)
+    sin_phi   = np.sin(elong_in)
+    cos_phi   = np.cos(elong_in)
+    B = _multi_recursion(r_in*sin_theta*cos_phi, r_in*sin_theta*sin_phi, r_in*cos_theta,
+                         models, N_input)  # size n x N_models x 3
+    Bx = B[:,:,0].T
+    By = B[:,:,1].T
+    Bz = B[:,:,2].T
+
+    if (out is None):
+        out = np.empty((len(models),N_input,3),dtype='float64')
+    elif (out.shape != (len(models),N_input,3)):
+        raise ValueError('out must be a numpy array of size N_models x n x 3')
+    out[:,:,0] = Bx *sin_theta *cos_phi + By *sin_theta *sin_phi + Bz *cos_theta
+    out[:,:,1] = Bx *cos_theta *cos_phi + By *cos_theta *sin_phi - Bz *sin_theta
+    out[:,:,2] =                - Bx *sin_phi +            By *cos_phi
+    return out
+
+
+def design_matrix_xyz(x_rj, y_rj, z_rj, degree, r_ref_km=R_RJ_KM, out=None):
+    # The design matrix of the field at each position, i.e. [Bx, By, Bz] for each g(n,m) and h(n,m)
+    # coefficient of 1 nT, up to degree, so that for any coefficient vector c:
+    #   B = design_matrix_xyz(x_rj, y_rj, z_rj, degree) @ c       (size n x 3)
+    # with c = [g, h], each of size (degree+1)*(degree+2)/2 in the order of the g and h tables in the
+    # comments of the model codes (Schmidt semi-normalised, index n*(n+1)/2 + m for degree n and
+    # order m, with g(0,0) and h(n,0) unused), e.g. from design_coefficients.
+    # This reuses the positions for many coefficient sets (e.g. ensembles, or fitting models), with
+    # one matrix multiply for each. For many positions, call this for a chunk of positions at a time
+    # (e.g. x_rj[i:i+10000]), reusing the same out, so the whole matrix is never in memory.
+    #
+    # Required inputs (System III (1965) Cartesian, right handed, and assuming 1 Rj = 71492 km):
+    #  x_rj, y_rj, z_rj - Jupiter SYSIII right-handed position, in Rj. Scalars or 1D arrays of size n.
+    #  degree     - maximum degree of the coefficients.
+    #
+    # Optional inputs:
+    #  r_ref_km   - 1 Rj in km that the coefficients assume (default 71492, e.g. 71323 for VIP4).
+    #  out        - n x 3 x n_coeff numpy array of doubles to write the design matrix in to (and return).
+    #
+    # Outputs:
+    #  D - design matrix, units of nT per nT of coefficient, size n x 3 x n_coeff,
+    #      with n_coeff = (degree+1)*(degree+2).
+    x_in, y_in, z_in = _position_inputs(x_rj, y_rj, z_rj, ('x_rj', 'y_rj', 'z_rj'))
+    N_input = x_in.size
+    tables = _design_tables(degree, r_ref_km)
+    out = _design_out(out, N_input, tables)
+    cartesian.design_recursion(x_in, y_in, z_in, tables, N_input,
+                               Workspace(min(N_input, 2048), tables['n_max'] - 1), out)
+    return out
+
+
+def design_matrix_rtp(r_rj, colat_rads, elong_rads, degree, r_ref_km=R_RJ_KM, out=None):
+    # Spherical version of design_matrix_xyz, with the same inputs as internal_rtp, for
+    # [Br, Btheta, Bphi] for each coefficient of 1 nT, size n x 3 x n_coeff.
+    r_in, colat_in, elong_in = _position_inputs(r_rj, colat_rads, elong_rads, ('r_rj', 'colat_rads', 'elong_rads'))
+    N_input = r_in.size
+    tables = _design_tables(degree, r_ref_km)
+    out = _design_out(out, N_input, tables)
+    sin_theta = np.sin(colat_in)[:,np.newaxis]
+    cos_theta = np.cos(colat_in)[:,np.newaxis]
+    sin_phi   = np.sin(elong_in)[:,np.newaxis]
+    cos_phi   = np.cos(elong_in)[:,np.newaxis]
+    cartesian.design_recursion(r_in*sin_theta[:,0]*cos_phi[:,0], r_in*sin_theta[:,0]*sin_phi[:,0],
+                               r_in*cos_theta[:,0], tables, N_input,
+                               Workspace(min(N_input, 2048), tables['n_max'] - 1), out)
+    Dx = out[:,0,:].copy()
+    Dy = out[:,1,:].copy()
+    Dz = out[:,2,:]
+    out[:,1,:] = Dx *cos_theta *cos_phi + Dy *cos_theta *sin_phi - Dz *sin_theta
+    out[:,0,:] = Dx *sin_theta *cos_phi + Dy *sin_theta *sin_phi + Dz *cos_theta
+    out[:,2,:] =                  - Dx *sin_phi +            Dy *cos_phi
+    return out
+
+
+def design_coefficients(g, h, degree):
+    # The coefficient vector [g, h] for design_matrix_xyz and design_matrix_rtp, from the modified g
+    # and h arrays of a model code (i.e. undoing the normalisation of expand_out_g_and_h), up to degree
+    # (coefficients above the degree of the model are 0).
+    # Returns a 1D numpy array of size (degree+1)*(degree+2).
+    schmidt = cartesian._schmidt_to_gauss(degree)
+    L = (degree+1)*(degree+2)//2
+    c = np.zeros(2*L,dtype='float64')
+    for n in range(1, degree+1):
+        for m in range(0, n+1):
+            mn = n*(n+1)//2 + m
+            if (mn + 1 < g.size):
+                c[  mn] = g[mn+1]/schmidt[n,m]
+                c[L+mn] = h[mn+1]/schmidt[n,m]
+    return c
+
+
+def internal_xyz_ensemble(x_rj, y_rj, z_rj, coeffs, r_ref_km=R_RJ_KM, out=None):
+    # The field of K sets of coefficients at the same positions (e.g. Monte Carlo perturbations of a
+    # model's g and h), from one pass over the positions and a matrix multiply, instead of K
+    # evaluations. The same normalisation as expand_out_g_and_h is applied to all the sets at once.
+    #
+    # Required inputs (System III (1965) Cartesian, right handed, and assuming 1 Rj = 71492 km):
+    #  x_rj, y_rj, z_rj - Jupiter SYSIII right-handed position, in Rj. Scalars or 1D arrays of size n.
+    #  coeffs     - K x n_coeff numpy array of coefficient sets, each [g, h] with the original
+    #               (Schmidt semi-normalised) values in the order of the g and h tables in the comments
+    #               of the model codes, as design_matrix_xyz (e.g. from design_coefficients), with
+    #               n_coeff = (degree+1)*(degree+2) for the degree of the sets.
+    #
+    # Optional inputs:
+    #  r_ref_km   - 1 Rj in km that the coefficients assume (default 71492, e.g. 71323 for VIP4).
+    #  out        - K x n x 3 numpy array of doubles to write B in to (and return).
+    #
+    # Outputs:
+    #  B - Cartesian Magnetic field vectors, [Bx, By, Bz], units of nT, size K x n x 3.
+    x_in, y_in, z_in = _position_inputs(x_rj, y_rj, z_rj, ('x_rj', 'y_rj', 'z_rj'))
+    return _ensemble(x_in, y_in, z_in, coeffs, r_ref_km, out)
+
+
+def internal_rtp_ensemble(r_rj, colat_rads, elong_rads, coeffs, r_ref_km=R_RJ_KM, out=None):
+    # Spherical version of internal_xyz_ensemble, with the same inputs as internal_rtp, for
+    # Br, Btheta, Bphi (nT) of each coefficient set, size K x n x 3.
+    r_in, colat_in, elong_in = _position_inputs(r_rj, colat_rads, elong_rads, ('r_rj', 'colat_rads', 'elong_rads'))
+    sin_theta = np.sin(colat_in)
+    cos_theta = np.cos(colat_in)
+    sin_phi   = np.sin(elong_in)
+    cos_phi   = np.cos(elong_in)
+    out = _ensemble(r_in*sin_theta*cos_phi, r_in*sin_theta*sin_phi, r_in*cos_theta, coeffs, r_ref_km, out)
+    Bx = out[:,:,0].copy()
+    By = out[:,:,1].copy()
+    Bz = out[:,:,2]
+    out[:,:,1] = Bx *cos_theta *cos_phi + By *cos_theta *sin_phi - Bz *sin_theta
+    out[:,:,0] = Bx *sin_theta *cos_phi + By *sin_theta *sin_phi + Bz *cos_theta
+    out[:,:,2] =                  - Bx *sin_phi +            By *cos_phi
+    return out
+
+
+def internal_rtp_normalised(r_rj, colat_rads, elong_rads, g_original, h_original, r_ref_km, out=None):
+    # Version of internal_rtp using fully normalised Legendre functions (see normalised.py), for high
+    # degree models (100 or more), where the modified g and h of expand_out_g_and_h get very large
+    # (~1e29 at degree 100, ~1e119 at degree 400, overflowing at higher degrees). The values in the
+    # recursion all stay of order 1, and there is no special case at the poles (where internal_rtp
+    # approximates Bphi for sin(colat) < 1e-5). Away from there, B agrees with internal_rtp to within
+    # 1e-14 |B| at each position (the difference is ~1e-15 |B|, i.e. ~1e-9 nT where |B| ~ 1e6 nT), and
+    # with an exact sum of the terms to the same 1e-14 |B| up to degree 120 at least.
+    #
+    # Required inputs (System III (1965) Spherical, right handed, and assuming 1 Rj = 71492 km):
+    #  r_rj, colat_rads, elong_rads - as internal_rtp, scalars or 1D arrays of size n.
+    #  g_original, h_original - original (Schmidt semi-normalised) g and h values, index n*(n+1)/2 + m
+    #               for degree n and order m, as in the comments of the model codes (e.g. model.g_original
+    #               of psh.get_model), size (degree+1)*(degree+2)/2.
+    #  r_ref_km   - 1 Rj in km that the model g and h values assume (e.g. 71323 for VIP4).
+    #
+    # Optional inputs:
+    #  out        - n x 3 numpy array of doubles to write B in to (and return), instead of making a new array.
+    #
+    # Outputs:
+    #  B - Spherical Magnetic field vector, [Br, Btheta, Bphi], units of nT, size n x 3 (1 x 3 for a scalar input).
+    r_in, colat_in, elong_in = _position_inputs(r_rj, colat_rads, elong_rads, ('r_rj', 'colat_rads', 'elong_rads'))
+    N_input = r_in.size
+    if (out is None):
+        out = np.empty((N_input,3),dtype='float64')
+    else:
+        _check_out(out, N_input)
+    _normalised(r_in, colat_in, elong_in, g_original, h_original, r_ref_km, out)
+    return out
+
+
+def internal_xyz_normalised(x_rj, y_rj, z_rj, g_original, h_original, r_ref_km, out=None):
+    # Cartesian version of internal_rtp_normalised, with the same inputs as internal_xyz (and
+    # g_original, h_original as internal_rtp_normalised), for Bx, By, Bz (nT), size n x 3.
+    x_in, y_in, z_in = _position_inputs(x_rj, y_rj, z_rj, ('x_rj', 'y_rj', 'z_rj'))
+    N_input = x_in.size
+    if (out is None):
+        out = np.empty((N_input,3),dtype='float64')
+    else:
+        _check_out(out, N_input)
+
+    rho_rj_sq = x_in *x_in + y_in *y_in
+    r_rj = np.sqrt(rho_rj_sq + z_in *z_in)
+    colat_rads = np.arctan2(np.sqrt(rho_rj_sq), z_in)
+    elong_rads = np.arctan2(y_in,x_in)
+    _normalised(r_rj, colat_rads, elong_rads, g_original, h_original, r_ref_km, out)
+
+    sin_theta = np.sin(colat_rads)
+    cos_theta = np.cos(colat_rads)
+    sin_phi   = np.sin(elong_rads)
+    cos_phi   = np.cos(elong_rads)
+    bbr = out[:,0].copy()
+    bbt = out[:,1].copy()
+    bf  = out[:,2].copy()
+    out[:,0] = bbr *sin_theta *cos_phi + bbt *cos_theta *cos_phi - bf *sin_phi
+    out[:,1] = bbr *sin_theta *sin_phi + bbt *cos_theta *sin_phi + bf *cos_phi
+    out[:,2] = bbr *cos_theta          - bbt *sin_theta
+    return out
+
+
+class Workspace:
+    # Arrays used by the recursion for vector inputs, to reuse between calls instead of making new ones.
+    # e.g. for repeated calls of up to 10000 positions of JRM33 order 13:
+    #   ws = psh.Workspace(10000, 13)
+    #   B  = jovian_jrm33_order13_internal_rtp(r_rj, colat_rads, elong_rads, workspace=ws)
+    # Each array is made the first time it is needed, at the full size, and calls with fewer positions
+    # use the start of it. Only use a Workspace for one call at a time (e.g. one for each thread).
+    # The output B is not in the workspace, unless you pass one of its arrays as out.
+
+    def __init__(self, n, order):
+        # n     - maximum number of positions in each call.
+        # order - maximum order of the models used.
+        self.n = int(n)
+        self.order = int(order)
+        self._buffers = {}
+
+    def buffer(self, name, N_input, rows=None, dtype='float64'):
+        # Returns the array called name, for N_input positions (and rows x N_input if rows is given).
+        # Arrays of other dtypes (e.g. float32) are kept separately from doubles of the same name.
+        if (np.dtype(dtype) != np.float64):
+            name = (name, np.dtype(dtype).name)
+        arr = self._buffers.get(name)
+        if (arr is None) or ((rows is not None) and (arr.shape[0] < rows)):
+            if rows is None:
+                arr = np.empty(self.n,dtype=dtype)
+            else:
+                arr = np.empty((rows,self.n),dtype=dtype)
+            self._buffers[name] = arr
+        if rows is None:
+            return arr[:N_input]
+        return arr[:rows,:N_input]
+
+
+_DINDGEN_k = {} # 0:k arrays, made once for each k+1 used
+
+
+def _dindgen(k_plus1):
+    # Returns a read-only array of 0:k (as doubles), made on the first call for each k+1
+    DINDGEN_k = _DINDGEN_k.get(k_plus1)
+    if DINDGEN_k is None:
+        DINDGEN_k = np.arange(k_plus1,dtype='float64')
+        DINDGEN_k.setflags(write=False)
+        _DINDGEN_k[k_plus1] = DINDGEN_k
+    return DINDGEN_k
+
+
+def _order_plus1(rec):
+    # rec (and g and h) have size k*(k+1)/2 + 1, where k = order + 1.
+    # Returns k+1, used in for loops when I want to go up to k.
+    k = int( (math.sqrt(8*(len(rec) - 1) + 1) - 1)/2 + 0.5 )
+    return k + 1
+
+
+def _numba_kernels(N_input=None):
+    # Returns the numba_kernels module, or None if the numpy code should be used (for N_input positions,
+    # if given, see _dispatch)
+    if (_BACKEND in ('numpy', 'scalar', 'threads')):
+        return None
+    if not _numba_installed():
+        return None
+    if (_BACKEND == 'auto') and (N_input is not None) and (_dispatch_band(N_input) != 'numba'):
+        return None
+    return _NUMBA_KERNELS
+
+
+def _numba_installed():
+    # True if the numba_kernels module can be imported (Numba is installed), which is done the first time.
+    global _NUMBA_KERNELS
+    if _NUMBA_KERNELS is None:
+        try:
+            from . import numba_kernels
+            _NUMBA_KERNELS = numba_kernels
+        except ImportError:  # Numba not installed, so use numpy
+            _NUMBA_KERNELS = False
+    return (_NUMBA_KERNELS is not False)
+
+
+def _dispatch(N_input, jacobian, order):
+    # The code used for N_input positions (see set_backend) of a model of order order, 'scalar', 'numba',
+    # 'numpy' or 'threads'.
+    if (_BACKEND == 'scalar') and not jacobian:
+        return 'scalar'
+    if (_BACKEND == 'auto') and not jacobian and (_dispatch_band(N_input) == 'scalar'):
+        return 'scalar'
+    if (N_input == 1):
+        return 'numpy'
+    if (N_input > _chunk_size(jacobian, order) + 1):  # done in chunks (which threads can run)
+        if (_BACKEND == 'threads') or \
+           ((_BACKEND == 'auto') and (_dispatch_band(N_input) == 'threads') and (_dispatch_bands()['workers'] > 1)):
+            return 'threads'
+    if (_numba_kernels(N_input) is not None):
+        return 'numba'
+    return 'numpy'
+
+
+def _dispatch_band(N_input):
+    # The backend of the band of N_input positions, for the 'auto' backend, or within a chunked call (see
+    # _chunked), the backend chosen for the whole call.
+    backend = getattr(_CHUNK_BAND, 'backend', None)
+    if (backend is not None):
+        return backend
+    bands = _dispatch_bands()['bands']
+    for n_max, backend in bands:
+        if (N_input <= n_max):
+            return backend
+    return bands[-1][1]
+
+
+def _dispatch_bands():
+    # The bands for the 'auto' backend, from calibrate, read from the dispatch file on first use,
+    # or the defaults (see set_backend) if there is no file.
+    global _DISPATCH
+    if (_DISPATCH is None):
+        if _numba_installed():
+            dispatch = {'bands': [(1, 'scalar'), (2, 'numba')], 'workers': os.cpu_count() or 1}
+        else:
+            dispatch = {'bands': [(16, 'scalar'), (17, 'numpy')], 'workers': os.cpu_count() or 1}
+        if os.path.exists(_DISPATCH_FILE):
+            dispatch = _read_dispatch_file(_DISPATCH_FILE, dispatch)
+        _DISPATCH = dispatch
+    return _DISPATCH
+
+
+def _read_dispatch_file(file_name, dispatch):
+    # Reads the bands written by _write_dispatch_file, in the same key: value format as the model data
+    # files, with a key of n_max for each band. Bands for Numba are used for numpy if it is not installed.
+    bands = []
+    file = open(file_name, 'r')
+    for line in file:
+        line = line.strip()
+        if (len(line) == 0) or line.startswith('#') or (':' not in line):
+            continue
+        key, value = [part.strip() for part in line.split(':', 1)]
+        if (key == 'workers'):
+            dispatch['workers'] = int(value)
+        elif key.isdigit() and (value in _BACKENDS[1:]):
+            if (value == 'numba') and not _numba_installed():
+                value = 'numpy'
+            bands.append((int(key), value))
+    file.close()
+    if (len(bands) > 0):
+        dispatch['bands'] = sorted(bands)
+    return dispatch
+
+
+def _write_dispatch_file(dispatch, file_name):
+    # Writes the bands from calibrate, see _read_dispatch_file.
+    directory = os.path.dirname(file_name)
+    if (len(directory) > 0):
+        os.makedirs(directory, exist_ok=True)
+    file = open(file_name, 'w')
+    file.write('# Backends for the psh auto backend, from psh.calibrate() on %s\n'%time.strftime('%Y-%m-%d'))
+    file.write('# n_max: backend, for calls of up to n_max positions (the last for larger calls too)\n')
+    for n_max, backend in dispatch['bands']:
+        file.write('%d: %s\n'%(n_max,backend))
+    file.write('workers: %d\n'%dispatch['workers'])
+    file.close()
+
+
+def _best_time(function, positions):
+    # The fastest time of function(*positions), from calls over about 0.05 s, for calibrate.
+    best  = np.inf
+    total = 0.0
+    calls = 0
+    while (total < 0.05) or (calls < 3):
+        start = time.perf_counter()
+        function(*positions)
+        elapsed = time.perf_counter() - start
+        best   = min(best, elapsed)
+        total += elapsed
+        calls += 1
+    return best
+
+
+def _scalar_lists(g, h, rec):
+    # g, h and rec as Python lists, for internal_rtp_scalar and internal_xyz_scalar (made once for each g).
+    key = id(g)
+    if key in _SCALAR_LISTS:
+        lists = _SCALAR_LISTS[key]
+        if (lists[0] is g) and (lists[1] is h) and (lists[2] is rec):
+            return lists[3:]
+    lists = (g, h, rec, np.asarray(g).tolist(), np.asarray(h).tolist(), np.asarray(rec).tolist())
+    _SCALAR_LISTS[key] = lists
+    return lists[3:]
+
+
+def _scalar_loop(function_scalar, positions, g, h, rec, r_ref_km, N_input, out):
+    # internal_rtp_scalar or internal_xyz_scalar (function_scalar) for each position, for the 'scalar'
+    # backend. Returns B (n x 3), written in to out if given.
+    g_list, h_list, rec_list = _scalar_lists(g, h, rec)
+    if (out is None):
+        out = np.empty((N_input,3),dtype='float64')
+    positions = [np.reshape(position, N_input).tolist() for position in positions]
+    for i in range(N_input):
+        out[i,:] = function_scalar(positions[0][i], positions[1][i], positions[2][i], g_list, h_list, rec_list,
+                                   r_ref_km)
+    return out
+
+
+def _recursion(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, g, h, rec, N_input, scalar_input, workspace):
+    # Runs the recursion with the backend chosen by set_backend.
+    # Returns Br, Btheta and Bphi (nT), and the sin and cos of the colatitude and longitude
+    # (which the Cartesian code needs to rotate the field back to x, y and z).
+    # For vector inputs, the returned arrays are in workspace, so are overwritten by the next call using it.
+    if scalar_input:
+        if np.ndim(r_rj_dbl):
+            # Size 1 arrays (or one row of positions) run as the scalar they hold
+            r_rj_dbl, colat_rads_dbl, elong_rads_dbl = r_rj_dbl[0], colat_rads_dbl[0], elong_rads_dbl[0]
+        return _rtp_recursion(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, g, h, rec)
+
+    k_plus1 = _order_plus1(rec)
+    _check_workspace(workspace, N_input, k_plus1)
+
+    kernels = _numba_kernels(N_input)
+    if kernels is not None:
+        out = workspace.buffer('kernel_out', N_input, rows=7)
+        kernels.rtp_recursion(np.ascontiguousarray(r_rj_dbl), np.ascontiguousarray(colat_rads_dbl),
+                              np.ascontiguousarray(elong_rads_dbl), g, h, rec, k_plus1, out)
+        return out[0], out[1], out[2], out[3], out[4], out[5], out[6]
+    if (_SUMMATION == 'matrix'):
+        return _rtp_recursion_matrix(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, g, h, rec, N_input, workspace)
+    return _rtp_recursion_vector(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, g, h, rec, N_input, workspace)
+
+
+def _xyz_recursion(x_in, y_in, z_in, g, h, rec, N_input, workspace, out, jacobian=False):
+    # Runs the Cartesian recursion (cartesian.py) with the backend chosen by set_backend, for a vector
+    # input. Bx, By and Bz are written in to the columns of out (n x 3), or if jacobian is True,
+    # Bx, By, Bz then the 9 values of the Jacobian, row by row (n x 12). For float32 out (and inputs),
+    # the numpy code works in float32 throughout, and the numba code in doubles, reading and writing float32.
+    k_plus1 = _order_plus1(rec)
+    _check_workspace(workspace, N_input, k_plus1)
+    tables = cartesian.cartesian_tables(g, h, k_plus1, jacobian)
+
+    kernels = _numba_kernels(N_input)
+    if (kernels is not None) and (out.dtype == np.float32):
+        kernels.xyz_recursion_float32(np.ascontiguousarray(x_in), np.ascontiguousarray(y_in),
+                                      np.ascontiguousarray(z_in), tables['n_max'], tables['packed'], out)
+    elif kernels is not None:
+        kernels.xyz_recursion(np.ascontiguousarray(x_in), np.ascontiguousarray(y_in),
+                              np.ascontiguousarray(z_in), tables['n_max'], tables['packed'], out)
+    elif jacobian:  # 12 components, so much faster as a matrix product
+        cartesian.xyz_recursion_matrix(x_in, y_in, z_in, tables, N_input, workspace, out)
+    else:
+        cartesian.xyz_recursion(x_in, y_in, z_in, tables, N_input, workspace,
+                                [out[:,i] for i in range(out.shape[1])])
+
+
+def _xyz_jacobian(x_in, y_in, z_in, g, h, rec, r_ref_km, N_input, workspace, out):
+    # B (n x 3, nT) and its Jacobian J (n x 3 x 3, nT/Rj) from the Cartesian recursion, for numpy double
+    # inputs x_in, y_in and z_in in Rj (of 71492 km), scalar or 1D. B is written in to out if given.
+    x_in = np.reshape(x_in, N_input)
+    y_in = np.reshape(y_in, N_input)
+    z_in = np.reshape(z_in, N_input)
+    r_scale = np.float64(1)
+    if (r_ref_km != R_RJ_KM):
+        r_scale = np.float64(R_RJ_KM)/np.float64(r_ref_km)
+        x_in = x_in * r_scale
+        y_in = y_in * r_scale
+        z_in = z_in * r_scale
+    if (workspace is None):
+        workspace = Workspace(N_input, _order_plus1(rec) - 2)
+
+    B_and_J = np.empty((N_input,12),dtype='float64')
+    _xyz_recursion(x_in, y_in, z_in, g, h, rec, N_input, workspace, B_and_J, jacobian=True)
+    if (out is None):
+        out = np.empty((N_input,3),dtype='float64')
+    out[:,:] = B_and_J[:,0:3]
+    J = np.reshape(B_and_J[:,3:12], (N_input,3,3))
+    if (r_scale != 1):  # d/dx in the inputs' Rj = r_scale d/dx in the model's Rj
+        J *= r_scale
+    return out, J
+
+
+def _rtp_jacobian(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, g, h, rec, r_ref_km, N_input, workspace, out):
+    # B (n x 3, nT) and the gradient of B (n x 3 x 3, nT/Rj) in the local (r, theta, phi) directions,
+    # from the Cartesian recursion at the same position. B is written in to out if given.
+    sin_theta = np.reshape(np.sin(colat_rads_dbl), N_input)
+    cos_theta = np.reshape(np.cos(colat_rads_dbl), N_input)
+    sin_phi   = np.reshape(np.sin(elong_rads_dbl), N_input)
+    cos_phi   = np.reshape(np.cos(elong_rads_dbl), N_input)
+    r_rj_dbl  = np.reshape(r_rj_dbl, N_input)
+
+    # Rows are the unit vectors r, theta and phi, in x, y and z
+    zero_array = np.zeros(N_input,dtype='float64')
+    R = np.transpose(np.array([
+        [sin_theta*cos_phi, sin_theta*sin_phi,  cos_theta],
+        [cos_theta*cos_phi, cos_theta*sin_phi, -sin_theta],
+        [         -sin_phi,           cos_phi, zero_array]]), (2,0,1))  # size n x 3 x 3
+
+    Bxyz, Jxyz = _xyz_jacobian(r_rj_dbl*R[:,0,0], r_rj_dbl*R[:,0,1], r_rj_dbl*R[:,0,2],
+                               g, h, rec, r_ref_km, N_input, workspace, None)
+    if (out is None):
+        out = np.empty((N_input,3),dtype='float64')
+    out[:,:] = np.matmul(R, Bxyz[:,:,np.newaxis])[:,:,0]
+    J = np.matmul(R, np.matmul(Jxyz, np.transpose(R, (0,2,1))))
+    return out, J
+
+
+def _position_inputs(a, b, c, names):
+    # Checks the three position inputs of internal_xyz_multi, internal_rtp_multi, design_matrix_xyz or
+    # design_matrix_rtp, and returns them as 1D numpy doubles.
+    try:
+        a = np.float64(a)
+        b = np.float64(b)
+        c = np.float64(c)
+    except Exception as e:
+        raise TypeError('Inputs must be numeric.') from e
+    for i, value in enumerate((a, b, c)):
+        if (value.ndim > 1):
+            raise ValueError('Argument %s must be a scalar number or 1D array of numbers'%names[i])
+        if (value.size != a.size):
+            raise ValueError('First argument %s must be the same size as argument %s'%(names[0],names[i]))
+    return np.atleast_1d(a), np.atleast_1d(b), np.atleast_1d(c)
+
+
+def _multi_recursion(x_in, y_in, z_in, models, N_input):
+    # B (n x N_models x 3, nT) of each model from one Cartesian recursion, for 1D inputs.
+    tables = cartesian.multi_tables([
+        (model.g, model.h, _order_plus1(model.rec), np.float64(R_RJ_KM)/np.float64(model.r_ref_km))
+        for model in models])
+    B = np.empty((N_input,3*len(models)),dtype='float64')
+    kernels = _numba_kernels(N_input)
+    if kernels is not None:
+        kernels.xyz_recursion(np.ascontiguousarray(x_in), np.ascontiguousarray(y_in),
+                              np.ascontiguousarray(z_in), tables['n_max'], tables['packed'], B)
+    else:
+        cartesian.xyz_recursion_matrix(x_in, y_in, z_in, tables, N_input,
+                                       Workspace(min(N_input, 2048), tables['n_max'] - 1), B)
+    return np.reshape(B, (N_input,len(models),3))
+
+
+def _design_tables(degree, r_ref_km):
+    # Checks the degree for design_matrix_xyz and design_matrix_rtp, and returns the tables.
+    if (int(degree) != degree) or (degree < 1):
+        raise ValueError('degree must be a positive integer')
+    return cartesian.design_tables(int(degree), np.float64(R_RJ_KM)/np.float64(r_ref_km))
+
+
+def _design_out(out, N_input, tables):
+    # Checks (or makes) the output array of design_matrix_xyz and design_matrix_rtp.
+    n_coeff = tables['rows'].shape[1]
+    if (out is None):
+        return np.empty((N_input,3,n_coeff),dtype='float64')
+    if (out.shape != (N_input,3,n_coeff)):
+        raise ValueError('out must be a numpy array of size n x 3 x n_coeff, n_coeff = (degree+1)*(degree+2)')
+    return out
+
+
+def _ensemble(x_in, y_in, z_in, coeffs, r_ref_km, out):
+    # Bx, By, Bz (K x n x 3, nT) of each coefficient set, for 1D inputs, see internal_xyz_ensemble.
+    try:
+        coeffs = np.float64(coeffs)
+    except Exception as e:
+        raise TypeError('coeffs must be numeric.') from e
+    if (coeffs.ndim == 1):
+        coeffs = coeffs[np.newaxis,:]
+    degree = int(round((math.sqrt(4*coeffs.shape[-1] + 1) - 3)/2))  # n_coeff = (degree+1)*(degree+2)
+    if (coeffs.ndim != 2) or ((degree+1)*(degree+2) != coeffs.shape[1]) or (degree < 1):
+        raise ValueError('coeffs must be K x n_coeff, with n_coeff = (degree+1)*(degree+2)')
+    N_input = x_in.size
+    K_sets  = coeffs.shape[0]
+    if (out is None):
+        out = np.empty((K_sets,N_input,3),dtype='float64')
+    elif (out.shape != (K_sets,N_input,3)):
+        raise ValueError('out must be a numpy array of size K x n x 3')
+
+    tables = _design_tables(degree, r_ref_km)
+    matrix = cartesian.ensemble_matrix(coeffs, tables)
+    cartesian.ensemble_recursion(x_in, y_in, z_in, tables, matrix, N_input,
+                                 Workspace(min(N_input, 2048), tables['n_max'] - 1), out)
+    return out
+
+
+def _normalised(r_in, colat_in, elong_in, g_original, h_original, r_ref_km, out):
+    # Br, Btheta, Bphi (nT) from the fully normalised recursion (normalised.py) with the backend chosen
+    # by set_backend, for 1D inputs, written in to out (n x 3).
+    g_original = np.asarray(g_original,dtype='float64')
+    h_original = np.asarray(h_original,dtype='float64')
+    degree = int(round((math.sqrt(8*g_original.size + 1) - 3)/2))  # size (degree+1)*(degree+2)/2
+    if ((degree+1)*(degree+2)//2 != g_original.size) or (h_original.size != g_original.size) or (degree < 1):
+        raise ValueError('g_original and h_original must both be size (degree+1)*(degree+2)/2')
+    if (r_ref_km != R_RJ_KM):
+        r_in = r_in * np.float64(R_RJ_KM)/np.float64(r_ref_km)
+    tables = normalised.normalised_tables(g_original, h_original, degree)
+
+    kernels = _numba_kernels(r_in.size)
+    if kernels is not None:
+        kernels.rtp_normalised(np.ascontiguousarray(r_in), np.ascontiguousarray(colat_in),
+                               np.ascontiguousarray(elong_in), degree, tables['G'], tables['H'],
+                               tables['A'], tables['B'], tables['F'], tables['C'], tables['D0'], out)
+    else:
+        out[:,0], out[:,1], out[:,2] = normalised.rtp_normalised(r_in, colat_in, elong_in, tables)
+
+
+def _truncated(function, positions, r_rj, g, h, rec, r_ref_km, N_input, scalar_input, out, workspace, jacobian,
+               tol_nT, dtype):
+    # internal_rtp or internal_xyz (function) with tol_nT, see internal_rtp. The positions are split in to
+    # groups needing the same degree, and function is run on each group with g, h and rec cut down to
+    # that degree (the first k*(k+1)/2 + 1 values, k = degree + 1, are the same as for the lower order).
+    # Returns B (and J if jacobian is True), degree and bound.
+    if (tol_nT is None):
+        tol_nT = 0.0
+    if (r_ref_km != R_RJ_KM):
+        r_rj = r_rj * np.float64(R_RJ_KM)/np.float64(r_ref_km)
+    degree, bound = _truncation_degree(np.reshape(r_rj, N_input), g, h, rec, np.float64(tol_nT))
+
+    if scalar_input:
+        g_L, h_L, rec_L = _truncated_model(g, h, rec, degree[0])
+        result = function(*positions, g_L, h_L, rec_L, r_ref_km, out=out, workspace=workspace,
+                          jacobian=jacobian, dtype=dtype)
+        if jacobian:
+            return result[0], result[1], degree, bound
+        return result, degree, bound
+
+    if (out is None):
+        out = np.empty((N_input,3),dtype=dtype)
+    if jacobian:
+        J = np.empty((N_input,3,3),dtype='float64')
+    for degree_used in np.unique(degree):
+        ind = np.nonzero(degree == degree_used)[0]
+        g_L, h_L, rec_L = _truncated_model(g, h, rec, degree_used)
+        if (ind.size == 1):  # as a scalar, as the codes take scalars or 1D arrays of size 2 or more
+            ind = ind[0]
+        result = function(*[position[ind] for position in positions], g_L, h_L, rec_L, r_ref_km,
+                          workspace=workspace, jacobian=jacobian, dtype=dtype)
+        if jacobian:
+            out[ind] = result[0]
+            J[ind] = result[1]
+        else:
+            out[ind] = result
+    if jacobian:
+        return out, J, degree, bound
+    return out, degree, bound
+
+
+def _chunk_size(jacobian, order):
+    # Positions per chunk for vector inputs of a model of order order, from set_chunking (or very large,
+    # for no chunks).
+    chunk = _CHUNK_SIZE
+    if (_MAX_BYTES is not None):
+        # (one position less, as a last chunk of 1 position is joined to the one before, see _chunk_starts)
+        chunk_bytes = _MAX_BYTES//_bytes_per_position(jacobian, order) - 1
+        if (chunk is None) or (chunk_bytes < chunk):
+            chunk = chunk_bytes
+    if (chunk is None):
+        return np.iinfo(np.int64).max
+    return max(2, chunk)  # the codes take 1D arrays of size 2 or more
+
+
+def _bytes_per_position(jacobian, order):
+    # The most bytes the arrays of the recursion (in the Workspace) use for each position, for a model of
+    # order order. With jacobian=True, this is the solid harmonics up to degree order + 2 of
+    # cartesian.py (and 5 other arrays). Otherwise it is the 'matrix' summation for orders above 6
+    # (_rtp_recursion_matrix, 2 x (order + 1) + 18 arrays, with the 7 of _rtp_recursion_vector), and
+    # the 'recursion' summation (36 arrays) below that.
+    if jacobian:
+        return 8*((order + 3)*(order + 4) + 5)
+    return 8*max(40, 2*order + 27)
+
+
+def _chunk_starts(N_input, chunk):
+    # The first position of each chunk used by _chunked, then N_input.
+    starts = list(range(0, N_input, chunk)) + [N_input]
+    if (N_input - starts[-2] == 1) and (len(starts) > 2):  # a last chunk of 1 position is joined to the one before
+        del starts[-2]
+    return starts
+
+
+def _chunked(function, positions, g, h, rec, r_ref_km, N_input, out, workspace, jacobian, dtype):
+    # internal_rtp or internal_xyz (function) for a vector input, one chunk of positions at a time (see
+    # set_chunking), each writing in to its part of out, and reusing the same Workspace. For the 'threads'
+    # backend, the chunks are split in to one block for each thread, each with its own Workspace.
+    # Returns B (and J if jacobian is True), as function.
+    chunk = _chunk_size(jacobian, _order_plus1(rec) - 2)
+    if (out is None):
+        out = np.transpose(np.empty((3,N_input),dtype=dtype))  # size n x 3, as without chunks
+    if jacobian:
+        J = np.empty((N_input,3,3),dtype='float64')
+    starts = _chunk_starts(N_input, chunk)
+    # For 'auto', each chunk uses the backend of the band of the whole call (numpy for 'threads')
+    backend = _dispatch(N_input, jacobian, _order_plus1(rec) - 2)
+    chunk_band = _dispatch_band(N_input)
+    if (chunk_band == 'threads'):
+        chunk_band = 'numpy'
+
+    def evaluate_chunks(chunk_starts, workspace):
+        if (workspace is None):
+            workspace = Workspace(min(chunk + 1, N_input), _order_plus1(rec) - 2)
+        band_before = getattr(_CHUNK_BAND, 'backend', None)
+        _CHUNK_BAND.backend = chunk_band
+        try:
+            for i0, i1 in zip(chunk_starts[:-1], chunk_starts[1:]):
+                result = function(*[position[i0:i1] for position in positions], g, h, rec, r_ref_km,
+                                  out=out[i0:i1], workspace=workspace, jacobian=jacobian, dtype=dtype)
+                if jacobian:
+                    J[i0:i1] = result[1]
+        finally:
+            _CHUNK_BAND.backend = band_before
+
+    if (backend == 'threads'):
+        N_chunks = len(starts) - 1
+        workers  = min(_dispatch_bands()['workers'], N_chunks)
+        blocks   = [(i*N_chunks)//workers for i in range(workers+1)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            threads = [pool.submit(evaluate_chunks, starts[i0:i1+1], None) for i0, i1 in zip(blocks[:-1], blocks[1:])]
+            for thread in threads:
+                thread.result()  # raises any error from the thread
+    else:
+        evaluate_chunks(starts, workspace)
+    if jacobian:
+        return out, J
+    return out
+
+
+_TRUNCATION_BOUNDS = {}  # bounds made by _truncation_degree, and the g, h and rec of each lower degree used,
+                         # for each g array used (keyed by id, with g kept too)
+
+
+def _truncation_tables(g, h, rec):
+    # K of _truncation_degree, and a dictionary of (g, h, rec) cut down to each degree used so far, for the
+    # model g, h and rec (made once for each g array).
+    key = id(g)
+    if key in _TRUNCATION_BOUNDS:
+        tables = _TRUNCATION_BOUNDS[key]
+        if (tables[0] is g) and (tables[1] is h):
+            return tables[2], tables[3]
+    order = _order_plus1(rec) - 2
+    c = design_coefficients(g, h, order)
+    L = (order+1)*(order+2)//2
+    K = np.zeros(order+1,dtype='float64')
+    for n in range(1, order+1):
+        power = np.sum(c[n*(n+1)//2:(n+1)*(n+2)//2]**2) + np.sum(c[L+n*(n+1)//2:L+(n+1)*(n+2)//2]**2)
+        K[n] = np.sqrt(np.float64((n+1)*(2*n+1))*power)
+    K.setflags(write=False)
+    _TRUNCATION_BOUNDS[key] = (g, h, K, {})
+    return K, _TRUNCATION_BOUNDS[key][3]
+
+
+def _truncated_model(g, h, rec, degree):
+    # g, h and rec cut down to degree (the first k*(k+1)/2 + 1 values, k = degree + 1), as the same arrays
+    # each time, so the tables kept for each g array (e.g. cartesian_tables) are made once, not every call.
+    truncated = _truncation_tables(g, h, rec)[1]
+    degree = int(degree)
+    if degree not in truncated:
+        L = (degree+1)*(degree+2)//2 + 1
+        if (L >= len(g)):
+            truncated[degree] = (g, h, rec)
+        else:
+            truncated[degree] = (g[:L], h[:L], rec[:L])
+    return truncated[degree]
+
+
+def _truncation_degree(r_rj, g, h, rec, tol_nT):
+    # The lowest degree needed at each position (r_rj in the model's Rj, 1D) for B to within tol_nT of the
+    # full model, and the bound on the field of the degrees left out (nT).
+    # The field of degree n is no more than
+    #   K[n] (1/r)^(n+2),   K[n] = sqrt( (n+1)(2n+1) x sum over m of (g(n,m)^2 + h(n,m)^2) )
+    # for the original (Schmidt semi-normalised) g and h, anywhere at radial distance r, from the
+    # Cauchy-Schwarz inequality, as the Schmidt functions have sum over m of P^2 = 1 and of
+    # (dP/dcolat)^2 + (m P/sin(colat))^2 = n(n+1). The bound for a degree is the sum of this over the
+    # degrees above it.
+    # Returns degree (1D int array) and bound (1D double array).
+    K = _truncation_tables(g, h, rec)[0]
+    order = _order_plus1(rec) - 2
+
+    ir = 1.0/r_rj
+    degree = np.full(r_rj.size, order, dtype='int64')
+    bound  = np.zeros(r_rj.size,dtype='float64')
+    E      = np.zeros(r_rj.size,dtype='float64')
+    for n in range(order, 1, -1):  # bound when using up to degree n-1
+        E += K[n] * ir**(n+2)
+        ok = (E <= tol_nT)
+        if not ok.any():
+            break
+        degree[ok] = n - 1
+        bound[ok]  = E[ok]
+    return degree, bound
+
+
+def _check_workspace(workspace, N_input, k_plus1):
+    # Check a Workspace is big enough for N_input positions of a model with k+1 = order + 2
+    if (N_input > workspace.n) or (k_plus1 > workspace.order + 2):
+        raise ValueError('workspace is too small, it is for %d positions up to order %d' %(workspace.n,workspace.order))
+
+
+def _check_out(out, N_input, dtype=np.float64):
+    # Check a caller supplied output array is a writeable n x 3 array of doubles (or of dtype)
+    if (not isinstance(out, np.ndarray)) or (out.shape != (N_input,3)) or (out.dtype != dtype) \
+            or (not out.flags.writeable):
+        if (dtype == np.float32):
+            raise ValueError('out must be a writeable n x 3 numpy array of float32, for n input positions')
+        raise ValueError('out must be a writeable n x 3 numpy array of doubles, for n input positions')
+
+
+def _float_dtype(dtype):
+    # The numpy dtype for the dtype input of internal_rtp and internal_xyz, float64 (for None) or float32.
+    if (dtype is None):
+        return np.dtype('float64')
+    try:
+        dtype = np.dtype(dtype)
+    except TypeError as e:
+        raise ValueError("dtype must be 'float64' or 'float32'") from e
+    if (dtype != np.float64) and (dtype != np.float32):
+        raise ValueError("dtype must be 'float64' or 'float32'")
+    return dtype
+
+
+def _as_float(value, dtype):
+    # value as a numpy array of dtype (doubles, or float32), without a copy if it already is one (or is a
+    # buffer of them), or a numpy double for a scalar double input, as before.
+    value = np.asarray(value, dtype=dtype)
+    if (value.ndim == 0) and (dtype == np.float64):
+        return np.float64(value)
+    return value
+
+
+def _position_columns(positions, dtype):
+    # The 3 columns of an n x 3 array (or buffer) of positions, as views of it (so not copied if it is
+    # already of dtype), or the 3 values of a single position of size 3.
+    try:
+        positions = np.asarray(positions, dtype=dtype)
+    except Exception as e:
+        raise TypeError('Inputs must be numeric.') from e
+    if (positions.shape == (3,)):
+        return positions[0], positions[1], positions[2]
+    if (positions.ndim != 2) or (positions.shape[1] != 3):
+        raise ValueError('A single input of positions must be an n x 3 array')
+    return positions[:,0], positions[:,1], positions[:,2]
+
+
+def _with_layout(function, layout, positions, g, h, rec, r_ref_km, out, **options):
+    # function (internal_rtp or internal_xyz) with B returned as layout 'rows' (n x 3, C-contiguous) or
+    # 'separate' (a tuple of 3 1D arrays, the rows of a 3 x n array), by passing the array of that layout
+    # (or out) as out.
+    if (layout != 'rows') and (layout != 'separate'):
+        raise ValueError("layout must be 'columns', 'rows' or 'separate'")
+    N_input = np.size(positions[0])  # the inputs are checked by function
+    dtype = options['dtype']
+    if (layout == 'rows'):
+        if (out is None):
+            out = np.empty((N_input,3),dtype=dtype)
+        return function(*positions, g, h, rec, r_ref_km, out=out, **options)
+
+    if (out is None):
+        out = np.empty((3,N_input),dtype=dtype)
+    elif (not isinstance(out, np.ndarray)) or (out.shape != (3,N_input)):
+        raise ValueError("out must be a 3 x n numpy array for layout 'separate', for n input positions")
+    result = function(*positions, g, h, rec, r_ref_km, out=np.transpose(out), **options)
+    if isinstance(result, tuple):
+        return (tuple(out),) + result[1:]
+    return tuple(out)
+
+
+def _field_float32(rtp, positions, g, h, rec, r_ref_km, N_input, scalar_input, out, workspace):
+    # B (n x 3, float32) for internal_rtp (rtp True) or internal_xyz, for positions (1D float32 inputs) in
+    # single precision, from the Cartesian recursion. (For a scalar input, or a few positions, the scalar
+    # code is used instead, in double precision, then B is rounded to single precision.)
+    if (out is None):
+        out = np.transpose(np.empty((3,N_input),dtype='float32'))  # size n x 3, as for doubles
+    if scalar_input or (_dispatch(N_input, False, _order_plus1(rec) - 2) == 'scalar'):
+        if rtp:
+            return _scalar_loop(internal_rtp_scalar, positions, g, h, rec, r_ref_km, N_input, out)
+        return _scalar_loop(internal_xyz_scalar, positions, g, h, rec, r_ref_km, N_input, out)
+    if (workspace is None):
+        workspace = Workspace(N_input, _order_plus1(rec) - 2)
+    ws = workspace
+
+    r_scale = np.float32(np.float64(R_RJ_KM)/np.float64(r_ref_km))
+    if rtp:
+        r_rj, colat_rads, elong_rads = positions
+        sin_theta = np.sin(colat_rads, out=ws.buffer('sin_theta', N_input, dtype='float32'))
+        cos_theta = np.cos(colat_rads, out=ws.buffer('cos_theta', N_input, dtype='float32'))
+        sin_phi   = np.sin(elong_rads, out=ws.buffer('sin_phi'  , N_input, dtype='float32'))
+        cos_phi   = np.cos(elong_rads, out=ws.buffer('cos_phi'  , N_input, dtype='float32'))
+        rho = np.multiply(r_rj, sin_theta, out=ws.buffer('rho', N_input, dtype='float32'))
+        x_in = np.multiply(rho, cos_phi, out=ws.buffer('x_in', N_input, dtype='float32'))
+        y_in = np.multiply(rho, sin_phi, out=ws.buffer('y_in', N_input, dtype='float32'))
+        z_in = np.multiply(r_rj, cos_theta, out=ws.buffer('z_in', N_input, dtype='float32'))
+        if (r_scale != 1):
+            x_in *= r_scale
+            y_in *= r_scale
+            z_in *= r_scale
+        Bxyz = np.transpose(ws.buffer('Bxyz', N_input, rows=3, dtype='float32'))
+    else:
+        x_in, y_in, z_in = positions
+        if (r_scale != 1):
+            x_in = np.multiply(x_in, r_scale, out=ws.buffer('x_in', N_input, dtype='float32'))
+            y_in = np.multiply(y_in, r_scale, out=ws.buffer('y_in', N_input, dtype='float32'))
+            z_in = np.multiply(z_in, r_scale, out=ws.buffer('z_in', N_input, dtype='float32'))
+        Bxyz = out
+    _xyz_recursion(x_in, y_in, z_in, g, h, rec, N_input, ws, Bxyz)
+    if not rtp:
+        return out
+
+    # Rotate to r, theta, phi
+    bx, by, bz = Bxyz[:,0], Bxyz[:,1], Bxyz[:,2]
+    t1 = ws.buffer('t1', N_input, dtype='float32')
+    t2 = ws.buffer('t2', N_input, dtype='float32')
+    np.multiply(bx, cos_phi, out=t1)
+    np.multiply(by, sin_phi, out=t2)
+    t1 += t2  # horizontal component away from the z axis
+    np.multiply(t1, sin_theta, out=out[:,0])
+    np.multiply(bz, cos_theta, out=t2)
+    out[:,0] += t2
+    np.multiply(t1, cos_theta, out=out[:,1])
+    np.multiply(bz, sin_theta, out=t2)
+    out[:,1] -= t2
+    np.multiply(by, cos_phi, out=out[:,2])
+    np.multiply(bx, sin_phi, out=t2)
+    out[:,2] -= t2
+    return out
+
+
+def _rtp_recursion(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, g, h, rec):
+    # The Legendre/longitude recursion for all the models, for a scalar input.
+    # Inputs are already numpy doubles, with r_rj_dbl scaled to the Rj the model expects.
+
+    k_plus1 = _order_plus1(rec)  # k+1, used in for loops when I want to go up to k
+    DINDGEN_k = _dindgen(k_plus1) # = 0:k, read-only and shared by all calls
+
+    a         = np.zeros(k_plus1,dtype='float64')
+
+    da = np.float64(1)/r_rj_dbl
+    a[0] = da
+    for i in range(1,k_plus1):
+        a[i] = a[i-1]*da
+
+    b = a  * DINDGEN_k
+
+    cos_phi   = np.cos(elong_rads_dbl,dtype='float64')
+    sin_phi   = np.sin(elong_rads_dbl,dtype='float64')
+    cos_theta = np.cos(colat_rads_dbl,dtype='float64')
+    sin_theta = np.sin(colat_rads_dbl,dtype='float64')
+    not_bk = (sin_theta >= 0.00001 )  # = 1d-5 - also see bk in _rtp_recursion_vector
+    zero_array = np.float64(0)
+    p   = np.float64(1)
+    d   = zero_array.copy()
+    bbr = zero_array.copy()
+    bbt = zero_array.copy()
+    bbf = zero_array.copy()
+    x = zero_array.copy()
+    y = p.copy()
+
+    for m in range(1, k_plus1):
+        bm  = (m != 1)
+        if bm:
+            m_minus_1 = np.float64(m - 1)
+            w = x.copy()
+            x = w *cos_phi + y *sin_phi
+            y = y *cos_phi - w *sin_phi
+        q = p.copy()
+        z = d.copy()
+        bi = zero_array.copy()
+        p2 = zero_array.copy()
+        d2 = zero_array.copy()
+        for n in range(m, k_plus1):
+            mn = int( n*(n-1)/2 + m )
+            w  = g[mn]*y + h[mn]*x
+            bbr += b[  n]*w*q
+            bbt -= a[  n]*w*z
+            if bm:
+                if not_bk:
+                    bi += a[n] * (g[mn]*x-h[mn]*y) * q
+                else:
+                    bi += a[n] * (g[mn]*x-h[mn]*y) * z
+            xk = rec[mn] # faster to write this to xk, to use below twice
+            dp = cos_theta *z - sin_theta *q - d2*xk
+            pm = cos_theta *q                - p2*xk
+            d2 = z.copy()
+            p2 = q.copy()
+            z = dp.copy()
+            q = pm.copy()
+        d = sin_theta *d + cos_theta *p
+        p = sin_theta *p
+        if bm:
+            bi  *= m_minus_1
+            bbf += bi
+
+    # br = bbr  # This doesn't change again
+    # bt = bbt  # This doesn't change again
+    if not_bk:
+        bf = bbf/sin_theta
+    else:
+        if (cos_theta >= 0):
+            bf =  bbf.copy()
+        else:
+            bf = np.float64(-1)*bbf
+
+    return bbr, bbt, bf, sin_theta, cos_theta, sin_phi, cos_phi
+
+
+def _rtp_recursion_vector(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, g, h, rec, N_input, workspace):
+    # The same recursion as _rtp_recursion for a 1D input of size n.
+    # The positions are split once into those near the poles (sin_theta < 1d-5, where Bphi is
+    # found differently) and the rest, and _rtp_recursion_part runs on each set without any
+    # checks for the poles. If no positions are near the poles, the inputs are used as they are.
+    ws = workspace
+    sin_theta = np.sin(colat_rads_dbl, out=ws.buffer('sin_theta', N_input))
+    bk = np.less(sin_theta, 0.00001, out=ws.buffer('bk', N_input, dtype='bool'))  # = 1d-5
+    if not bk.any():
+        return _rtp_recursion_part(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, sin_theta,
+                                   g, h, rec, N_input, ws, False)
+
+    # Some positions are near the poles, so run the two sets separately, and put the results back
+    # in to arrays in the same order as the inputs.
+    # Each set is gathered in to the start of the workspace's part_* arrays, and runs in the start of the
+    # same buffers (its results are put back before the next set is run).
+    ind_pole = np.nonzero( bk)[0]
+    ind_rest = np.nonzero(~bk)[0]
+    results_all = [ws.buffer(name, N_input) for name in
+                   ('bbr_all', 'bbt_all', 'bf_all', 'sin_theta_all', 'cos_theta_all', 'sin_phi_all', 'cos_phi_all')]
+    for ind, polar in ((ind_rest, False), (ind_pole, True)):
+        N_part = len(ind)
+        if (N_part == 0):
+            continue
+        parts = [np.take(position, ind, out=ws.buffer(name, N_part)) for position, name in
+                 ((r_rj_dbl, 'part_r'), (colat_rads_dbl, 'part_colat'), (elong_rads_dbl, 'part_elong'),
+                  (sin_theta, 'part_sin_theta'))]
+        results = _rtp_recursion_part(*parts, g, h, rec, N_part, ws, polar)
+        for result_all, result in zip(results_all, results):
+            result_all[ind] = result
+    return tuple(results_all)
+
+
+def _rtp_recursion_part(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, sin_theta, g, h, rec, N_input, workspace, polar):
+    # The recursion for a 1D input of size n, where either all (polar = True) or none (polar = False)
+    # of the positions are near the poles (sin_theta < 1d-5). sin_theta is given, as it was already
+    # made to check this.
+    # All the arrays are buffers in workspace, updated in place with ufunc out= arguments, so no
+    # new arrays are made in the loops. The order of each sum and product is kept the same as the
+    # scalar code, so the results are the same.
+    # Instead of copying (e.g. d2 = z.copy(), z = dp.copy()), the names of the buffers are swapped.
+
+    k_plus1 = _order_plus1(rec)  # k+1, used in for loops when I want to go up to k
+    ws = workspace
+
+    # The radial powers a[n] = (1/r)^(n+1) (and b[n] = a[n] * n) are not stored as n x k+1 arrays.
+    # a[n] = a[n-1]*da is made as it is needed in the n loop below, starting from a_m = a[m],
+    # which is itself multiplied by da for each m. This is the same chain of products as
+    # making the whole a array first, so gives the same values.
+    da  = np.divide(1.0, r_rj_dbl, out=ws.buffer('da', N_input))
+    a_m = ws.buffer('a_m', N_input)
+    a_n = ws.buffer('a_n', N_input)
+    np.copyto(a_m, da)  # = a[0]
+
+    cos_phi   = np.cos(elong_rads_dbl, out=ws.buffer('cos_phi'  , N_input))
+    sin_phi   = np.sin(elong_rads_dbl, out=ws.buffer('sin_phi'  , N_input))
+    cos_theta = np.cos(colat_rads_dbl, out=ws.buffer('cos_theta', N_input))
+
+    p   = ws.buffer('p'  , N_input)
+    d   = ws.buffer('d'  , N_input)
+    bbr = ws.buffer('bbr', N_input)
+    bbt = ws.buffer('bbt', N_input)
+    bbf = ws.buffer('bbf', N_input)
+    x   = ws.buffer('x'  , N_input)
+    y   = ws.buffer('y'  , N_input)
+    w   = ws.buffer('w'  , N_input)
+    q   = ws.buffer('q'  , N_input)
+    z   = ws.buffer('z'  , N_input)
+    bi  = ws.buffer('bi' , N_input)
+    p2  = ws.buffer('p2' , N_input)
+    d2  = ws.buffer('d2' , N_input)
+    dp  = ws.buffer('dp' , N_input)
+    pm  = ws.buffer('pm' , N_input)
+    t1  = ws.buffer('t1' , N_input)
+    t2  = ws.buffer('t2' , N_input)
+    p.fill(1)
+    d.fill(0)
+    bbr.fill(0)
+    bbt.fill(0)
+    bbf.fill(0)
+    x.fill(0)
+    y.fill(1)
+
+    for m in range(1, k_plus1):
+        a_m *= da  # = a[m]
+        np.copyto(a_n, a_m)
+        bm  = (m != 1)
+        if bm:
+            m_minus_1 = np.float64(m - 1)
+            w, x = x, w  # w = old x
+            np.multiply(w, cos_phi, out=t1)  # x = w *cos_phi + y *sin_phi
+            np.multiply(y, sin_phi, out=t2)
+            np.add(t1, t2, out=x)
+            np.multiply(y, cos_phi, out=t1)  # y = y *cos_phi - w *sin_phi
+            np.multiply(w, sin_phi, out=t2)
+            np.subtract(t1, t2, out=y)
+        np.copyto(q, p)
+        np.copyto(z, d)
+        bi.fill(0)
+        p2.fill(0)
+        d2.fill(0)
+        for n in range(m, k_plus1):
+            if (n != m):
+                a_n *= da  # = a[n]
+            mn = int( n*(n-1)/2 + m )
+            np.multiply(y, g[mn], out=t1)  # w = g[mn]*y + h[mn]*x
+            np.multiply(x, h[mn], out=t2)
+            np.add(t1, t2, out=w)
+            np.multiply(a_n, np.float64(n), out=t1)  # bbr += b[n]*w*q
+            t1 *= w
+            t1 *= q
+            bbr += t1
+            np.multiply(a_n, w, out=t1)    # bbt -= a[n]*w*z
+            t1 *= z
+            bbt -= t1
+            if bm:
+                if polar:  # qq = z at the poles, else q
+                    q_or_z = z
+                else:
+                    q_or_z = q
+                np.multiply(x, g[mn], out=t2)  # bi += a[n] * (g[mn]*x-h[mn]*y) * qq
+                np.multiply(y, h[mn], out=t1)
+                t2 -= t1
+                np.multiply(a_n, t2, out=t1)
+                t1 *= q_or_z
+                bi += t1
+            xk = rec[mn] # faster to write this to xk, to use below twice
+            np.multiply(z, cos_theta, out=dp)  # dp = cos_theta *z - sin_theta *q - d2*xk
+            np.multiply(q, sin_theta, out=t1)
+            dp -= t1
+            np.multiply(d2, xk, out=t1)
+            dp -= t1
+            np.multiply(q, cos_theta, out=pm)  # pm = cos_theta *q - p2*xk
+            np.multiply(p2, xk, out=t1)
+            pm -= t1
+            d2, p2, z, q, dp, pm = z, q, dp, pm, d2, p2
+        np.multiply(d, sin_theta, out=t1)  # d = sin_theta *d + cos_theta *p
+        np.multiply(p, cos_theta, out=t2)
+        np.add(t1, t2, out=d)
+        p *= sin_theta                     # p = sin_theta *p
+        if bm:
+            bi  *= m_minus_1
+            bbf += bi
+
+    bf = ws.buffer('bf', N_input)
+    if polar:
+        np.copyto(bf, bbf)
+        np.negative(bbf, out=bf, where=(cos_theta < 0))
+    else:
+        np.divide(bbf, sin_theta, out=bf)
+
+    return bbr, bbt, bf, sin_theta, cos_theta, sin_phi, cos_phi
+
+
+def _rtp_recursion_matrix(r_rj_dbl, colat_rads_dbl, elong_rads_dbl, g, h, rec, N_input, workspace):
+    # The same sums as _rtp_recursion_vector (see set_summation), for a 1D input of size n.
+    # The positions are done in chunks of _MATRIX_CHUNK, so all the arrays stay in cache. For each
+    # chunk and order m, the Legendre values times the radial powers,
+    #   R[n] = a[n] q    and    Z[n] = a[n] z    (a[n] = (1/r)^(n+1))
+    # are found for all n with one recursion, since with da = 1/r the recursion of q and z becomes
+    #   R[n+1] = (da cos_theta) R[n]                      - rec[mn] da^2 R[n-1]
+    #   Z[n+1] = (da cos_theta) Z[n] - (da sin_theta) R[n] - rec[mn] da^2 Z[n-1]
+    # (and p and d, the starting values for each m, likewise), so there are no a[n] products or
+    # g/h terms in the loop over n. The sums over n of n g R, n h R, g R, h R, g Z and h Z for the
+    # order are then two matrix products, and the longitude terms are applied once per order.
+    k_plus1 = _order_plus1(rec)
+    tables = _matrix_tables(g, h, rec, k_plus1)
+    ws = workspace
+    bbr       = ws.buffer('bbr'      , N_input)
+    bbt       = ws.buffer('bbt'      , N_input)
+    bf        = ws.buffer('bf'       , N_input)
+    sin_theta = np.sin(colat_rads_dbl, out=ws.buffer('sin_theta', N_input))
+    cos_theta = np.cos(colat_rads_dbl, out=ws.buffer('cos_theta', N_input))
+    sin_phi   = np.sin(elong_rads_dbl, out=ws.buffer('sin_phi'  , N_input))
+    cos_phi   = np.cos(elong_rads_dbl, out=ws.buffer('cos_phi'  , N_input))
+
+    cws = Workspace(min(N_input, _MATRIX_CHUNK), k_plus1 - 2)  # arrays for one chunk
+    for i0 in range(0, N_input, _MATRIX_CHUNK):
+        i1 = min(i0 + _MATRIX_CHUNK, N_input)
+        nc = i1 - i0
+        R  = cws.buffer('R' , nc, rows=k_plus1-1)
+        Z  = cws.buffer('Z' , nc, rows=k_plus1-1)
+        S  = cws.buffer('S' , nc, rows=4)
+        SZ = cws.buffer('SZ', nc, rows=2)
+        da    = np.divide(1.0, r_rj_dbl[i0:i1], out=cws.buffer('da', nc))
+        alpha = np.multiply(da, cos_theta[i0:i1], out=cws.buffer('alpha', nc))  # da cos_theta
+        sigma = np.multiply(da, sin_theta[i0:i1], out=cws.buffer('sigma', nc))  # da sin_theta
+        beta  = np.multiply(da, da, out=cws.buffer('beta', nc))                 # da^2
+        beta_rec = cws.buffer('beta_rec', nc)
+        t1 = cws.buffer('t1', nc)
+        t2 = cws.buffer('t2', nc)
+        w  = cws.buffer('w' , nc)
+        x  = cws.buffer('x' , nc)
+        y  = cws.buffer('y' , nc)
+        P  = cws.buffer('P', nc)  # = a[m] p, starting from a[1] p, with p = 1
+        D  = cws.buffer('D', nc)  # = a[m] d, starting from a[1] d, with d = 0
+        np.copyto(P, beta)
+        D.fill(0)
+        x.fill(0)
+        y.fill(1)
+        cr = bbr[i0:i1]
+        ct = bbt[i0:i1]
+        cf = bf [i0:i1]
+        cr.fill(0)
+        ct.fill(0)
+        cf.fill(0)
+        polar = (sin_theta[i0:i1] < 0.00001)  # = 1d-5, Bphi uses +/- z instead of q/sin_theta
+        any_polar = polar.any()
+        cos_phi_c = cos_phi[i0:i1]
+        sin_phi_c = sin_phi[i0:i1]
+
+        for m in range(1, k_plus1):
+            C_R, C_Z, rec_m = tables[m]
+            rows = k_plus1 - m
+            if (m != 1):
+                w, x = x, w  # w = old x
+                np.multiply(w, cos_phi_c, out=t1)  # x = w *cos_phi + y *sin_phi
+                np.multiply(y, sin_phi_c, out=t2)
+                np.add(t1, t2, out=x)
+                np.multiply(y, cos_phi_c, out=t1)  # y = y *cos_phi - w *sin_phi
+                np.multiply(w, sin_phi_c, out=t2)
+                np.subtract(t1, t2, out=y)
+            np.copyto(R[0], P)
+            np.copyto(Z[0], D)
+            for j in range(1, rows):
+                np.multiply(alpha, R[j-1], out=R[j])
+                np.multiply(alpha, Z[j-1], out=Z[j])
+                np.multiply(sigma, R[j-1], out=t1)
+                Z[j] -= t1
+                if (j >= 2):  # (R and Z are 0 for n = m - 1)
+                    np.multiply(beta, rec_m[j-1], out=beta_rec)
+                    np.multiply(beta_rec, R[j-2], out=t1)
+                    R[j] -= t1
+                    np.multiply(beta_rec, Z[j-2], out=t1)
+                    Z[j] -= t1
+            np.matmul(C_R, R[:rows], out=S)   # sums of n g R, n h R, g R, h R
+            np.matmul(C_Z, Z[:rows], out=SZ)  # sums of g Z, h Z
+
+            np.multiply(y, S[0], out=t1)  # bbr += y sum(n g R) + x sum(n h R)
+            cr += t1
+            np.multiply(x, S[1], out=t1)
+            cr += t1
+            np.multiply(y, SZ[0], out=t1)  # bbt -= y sum(g Z) + x sum(h Z)
+            ct -= t1
+            np.multiply(x, SZ[1], out=t1)
+            ct -= t1
+            if (m != 1):  # bbf += (m-1) (x sum(g R) - y sum(h R))
+                np.multiply(x, S[2], out=t1)
+                np.multiply(y, S[3], out=t2)
+                t1 -= t2
+                if any_polar:
+                    t1[polar] = x[polar]*SZ[0,polar] - y[polar]*SZ[1,polar]
+                t1 *= np.float64(m - 1)
+                cf += t1
+
+            np.multiply(sigma, D, out=t1)  # D = sigma D + alpha P
+            np.multiply(alpha, P, out=t2)
+            np.add(t1, t2, out=D)
+            P *= sigma                     # P = sigma P
+
+        if any_polar:
+            np.negative(cf, out=cf, where=(polar & (cos_theta[i0:i1] < 0)))
+            np.divide(cf, sin_theta[i0:i1], out=cf, where=~polar)
+        else:
+            cf /= sin_theta[i0:i1]
+
+    return bbr, bbt, bf, sin_theta, cos_theta, sin_phi, cos_phi
+
+
+def _matrix_tables(g, h, rec, k_plus1):
+    # Returns the tables for _rtp_recursion_matrix, for each order m (index m, from 1), of
+    #  C_R   - [n g, n h, g, h] for n from m to k, size 4 x (k+1-m).
+    #  C_Z   - [g, h] for n from m to k, size 2 x (k+1-m).
+    #  rec_m - rec for n from m to k.
+    # Tables are made on the first call for each g array, then reused.
+    key = id(g)
+    if key in _MATRIX_TABLES:
+        tables = _MATRIX_TABLES[key]
+        if (tables[0] is g) and (tables[1] is h):
+            return tables[2]
+    tables = [None]
+    for m in range(1, k_plus1):
+        n_list = np.arange(m, k_plus1)
+        mn = n_list*(n_list-1)//2 + m
+        C_R = np.array([n_list*g[mn], n_list*h[mn], g[mn], h[mn]],dtype='float64')
+        C_Z = np.array([g[mn], h[mn]],dtype='float64')
+        tables.append((C_R, C_Z, rec[mn].tolist()))
+    _MATRIX_TABLES[key] = (g, h, tables)
+    return tables
+
+
+def _rtp_recursion_scalar(r_rj, colat_rads, elong_rads, g, h, rec):
+    # The same recursion as _rtp_recursion for a single position, on Python floats.
+    # g, h and rec are Python lists. Returns Python floats, in the same order as _rtp_recursion.
+
+    k_plus1 = _order_plus1(rec)  # k+1, used in for loops when I want to go up to k
+
+    # a[n] = (1/r)^(n+1), done by repeated multiplication as in _rtp_recursion
+    da = 1.0/r_rj
+    a = [da]*k_plus1
+    for i in range(1,k_plus1):
+        a[i] = a[i-1]*da
+
+    cos_phi   = math.cos(elong_rads)
+    sin_phi   = math.sin(elong_rads)
+    cos_theta = math.cos(colat_rads)
+    sin_theta = math.sin(colat_rads)
+    not_bk = (sin_theta >= 0.00001 )  # = 1d-5 - also see bk in _rtp_recursion
+
+    p   = 1.0
+    d   = 0.0
+    bbr = 0.0
+    bbt = 0.0
+    bbf = 0.0
+    x = 0.0
+    y = 1.0
+
+    for m in range(1, k_plus1):
+        bm  = (m != 1)
+        if bm:
+            w = x
+            x = w *cos_phi + y *sin_phi
+            y = y *cos_phi - w *sin_phi
+        q = p
+        z = d
+        bi = 0.0
+        p2 = 0.0
+        d2 = 0.0
+        for n in range(m, k_plus1):
+            mn = n*(n-1)//2 + m
+            gg = g[mn]
+            hh = h[mn]
+            an = a[n]
+            w  = gg*y + hh*x
+            bbr += an*n*w*q  # = b[n]*w*q, with b = a * DINDGEN_k
+            bbt -= an*w*z
+            if bm:
+                if not_bk:
+                    bi += an * (gg*x-hh*y) * q
+                else:
+                    bi += an * (gg*x-hh*y) * z
+            xk = rec[mn]
+            dp = cos_theta *z - sin_theta *q - d2*xk
+            pm = cos_theta *q                - p2*xk
+            d2 = z
+            p2 = q
+            z = dp
+            q = pm
+        d = sin_theta *d + cos_theta *p
+        p = sin_theta *p
+        if bm:
+            bi  *= (m - 1)
+            bbf += bi
+
+    if not_bk:
+        bf = bbf/sin_theta
+    else:
+        if (cos_theta >= 0):
+            bf =  bbf
+        else:
+            bf = -bbf
+
+    return bbr, bbt, bf, sin_theta, cos_theta, sin_phi, cos_phi
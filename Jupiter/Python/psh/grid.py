@@ -0,0 +1,167 @@
+import numpy as np
+
+# Separable version of the spherical harmonic sum, used by engine.internal_rtp_grid for positions on
+# a grid of radial distance x colatitude x longitude (e.g. maps, or 3D cubes).
+#
+# Each term of the recursion in engine._rtp_recursion is a product of a radial part (a[n]), a
+# colatitude part (the Legendre values q, and their derivative z) and a longitude part (the cos and
+# sin of (m-1) x longitude), so on a grid each part only needs to be found once for each of its own
+# values:
+#   Br     =  sum over n, m of a[n] n q (g cos + h sin)
+#   Btheta = -sum over n, m of a[n]   z (g cos + h sin)
+#   Bphi   =  sum over n, m of a[n]   q (g sin - h cos) (m-1) / sin(colat)
+# (with q replaced by +/- z at the poles, as in the recursion). The sum over n is done first, for
+# each m, radius and colatitude, and then the sum over m for all the longitudes at once, each as a
+# matrix product.
+#
+# Colatitudes in the grid that are mirror images about the equator (colat and pi - colat) share
+# their Legendre values, as q(pi - colat) = (-1)^(n-m) q(colat) and z(pi - colat) = -(-1)^(n-m) z(colat),
+# so the sums over n are split in to even and odd n-m, and found only once for each pair.
+#
+# Citation Info:
+#  DOI: 10.5281/zenodo.6814109     This DOI links to all versions of code at the Github.
+#  Github: https://github.com/rjwilson-LASP/PSH
+
+
+def rtp_grid(r_rj, colat_rads, elong_rads, g, h, rec, k_plus1):
+    # Inputs r_rj, colat_rads and elong_rads are 1D double arrays (r_rj already scaled to the Rj the
+    # model expects), for the grid of all their combinations.
+    # Returns B, size N_r x N_colat x N_elong x 3, of Br, Btheta, Bphi (nT).
+    N_r     = r_rj.size
+    N_colat = colat_rads.size
+    N_elong = elong_rads.size
+    sums_grid = _fourier_coefficients(r_rj, colat_rads, g, h, rec, k_plus1)
+
+    # Longitude parts, cos and sin of (m-1) x longitude, size (k x 2) x N_elong
+    m_minus_1 = np.arange(0, k_plus1-1,dtype='float64')
+    phase = m_minus_1[:,np.newaxis] * elong_rads[np.newaxis,:]
+    trig  = np.empty((k_plus1-1, 2, N_elong),dtype='float64')
+    np.cos(phase, out=trig[:,0,:])
+    np.sin(phase, out=trig[:,1,:])
+    trig = trig.reshape((2*(k_plus1-1), N_elong))
+
+    # Sum over m for all longitudes at once
+    B = np.empty((N_r, N_colat, N_elong, 3),dtype='float64')
+    for i_comp in range(3):
+        s = sums_grid[i_comp].reshape((2*(k_plus1-1), N_r*N_colat))
+        B[...,i_comp] = (s.T @ trig).reshape((N_r, N_colat, N_elong))
+    return B
+
+
+def _fourier_coefficients(r_rj, colat_rads, g, h, rec, k_plus1):
+    # The sums over n, for each component, m, radius and colatitude, i.e. the coefficients of
+    # cos((m-1) x longitude) and sin((m-1) x longitude) of Br, Btheta and Bphi.
+    # Returns sums_grid[component, m-1, cos or sin part], each size N_r x N_colat.
+    N_r     = r_rj.size
+    N_colat = colat_rads.size
+
+    # Colatitudes to find the Legendre values for, and where each colatitude of the grid gets them from
+    i_base, source, mirrored = _mirror_colatitudes(colat_rads)
+    q_all, z_all, qq_all = _legendre(colat_rads[i_base], rec, k_plus1)
+
+    # Radial powers a[n] = (1/r)^(n+1), size k+1 x N_r, made with the same chain of products as
+    # engine._rtp_recursion
+    da = 1.0/r_rj
+    a  = np.empty((k_plus1, N_r),dtype='float64')
+    a[0] = da
+    for n in range(1, k_plus1):
+        a[n] = a[n-1] * da
+
+    # Sum over n, for each m, radius and (base) colatitude, split in to even and odd n-m.
+    # sums[component, m-1, cos or sin part, parity] is size N_r x N_base.
+    N_base = i_base.size
+    sums = np.zeros((3, k_plus1-1, 2, 2, N_r, N_base),dtype='float64')
+    for m in range(1, k_plus1):
+        for parity in (0, 1):
+            n_list = np.arange(m + parity, k_plus1, 2)
+            if (n_list.size == 0):
+                continue
+            mn = n_list*(n_list-1)//2 + m
+            a_n  = a[n_list]                   # size n_n x N_r
+            b_n  = a_n * n_list[:,np.newaxis]  # = a[n]*n
+            q  = q_all [mn]                    # size n_n x N_base
+            z  = z_all [mn]
+            qq = qq_all[mn]
+            # Br:     g (cos part) and h (sin part)
+            sums[0,m-1,0,parity] =  (b_n * g[mn,np.newaxis]).T @ q
+            sums[0,m-1,1,parity] =  (b_n * h[mn,np.newaxis]).T @ q
+            # Btheta: g (cos part) and h (sin part)
+            sums[1,m-1,0,parity] = -(a_n * g[mn,np.newaxis]).T @ z
+            sums[1,m-1,1,parity] = -(a_n * h[mn,np.newaxis]).T @ z
+            # Bphi:   -h (cos part) and g (sin part)
+            if (m != 1):
+                sums[2,m-1,0,parity] = -(a_n * h[mn,np.newaxis]).T @ qq * np.float64(m-1)
+                sums[2,m-1,1,parity] =  (a_n * g[mn,np.newaxis]).T @ qq * np.float64(m-1)
+
+    # Combine the parities for each colatitude of the grid. q and qq (= q/sin(colat)) have the sign
+    # (-1)^(n-m) across the equator, z the opposite.
+    sign_odd = np.where(mirrored, -1.0, 1.0)  # for odd n-m
+    sign_all = np.ones((3, 1, 1, 1, N_colat),dtype='float64')
+    sign_all[1,...] = sign_odd  # Btheta (z) has an extra -1 when mirrored
+    return (sums[...,0,:,:][...,source] + sign_odd * sums[...,1,:,:][...,source]) * sign_all
+
+
+def _mirror_colatitudes(colat_rads):
+    # Finds the colatitudes in the southern hemisphere whose mirror image (pi - colat) is also in the
+    # grid, in the northern hemisphere or on the equator.
+    # Returns:
+    #  i_base   - index of the colatitudes to find the Legendre values for (all the others).
+    #  source   - for each colatitude, its index in i_base, or its mirror image's index in i_base.
+    #  mirrored - for each colatitude, True if it uses its mirror image's values.
+    N_colat = colat_rads.size
+    north = np.nonzero(colat_rads <= np.pi/2)[0]
+    north_sorted = north[np.argsort(colat_rads[north])]
+    mirror_of = np.full(N_colat, -1)
+    if (north_sorted.size > 0):
+        south = np.nonzero(colat_rads > np.pi/2)[0]
+        target = np.pi - colat_rads[south]
+        j = np.searchsorted(colat_rads[north_sorted], target)
+        for j_near in (j - 1, np.minimum(j, north_sorted.size - 1)):
+            j_near = np.maximum(j_near, 0)
+            match = np.abs(colat_rads[north_sorted[j_near]] - target) <= 1e-14
+            mirror_of[south[match]] = north_sorted[j_near[match]]
+    mirrored = (mirror_of >= 0)
+    i_base = np.nonzero(~mirrored)[0]
+    base_number = np.full(N_colat, -1)
+    base_number[i_base] = np.arange(i_base.size)
+    source = np.where(mirrored, base_number[mirror_of], base_number)
+    return i_base, source, mirrored
+
+
+def _legendre(colat_rads, rec, k_plus1):
+    # The Legendre values q, and z (d/dcolat of q), for each mn and colatitude, with the same recursion
+    # as engine._rtp_recursion, and qq = q/sin(colat) (or +/- z at the poles, for Bphi).
+    # Returns q, z and qq, each size (number of mn) x N_colat, index [mn, colatitude].
+    N_colat = colat_rads.size
+    sin_theta = np.sin(colat_rads)
+    cos_theta = np.cos(colat_rads)
+    q_all = np.zeros((rec.size, N_colat),dtype='float64')
+    z_all = np.zeros((rec.size, N_colat),dtype='float64')
+
+    p = np.ones(N_colat,dtype='float64')
+    d = np.zeros(N_colat,dtype='float64')
+    for m in range(1, k_plus1):
+        q  = p.copy()
+        z  = d.copy()
+        p2 = np.zeros(N_colat,dtype='float64')
+        d2 = np.zeros(N_colat,dtype='float64')
+        for n in range(m, k_plus1):
+            mn = int( n*(n-1)/2 + m )
+            q_all[mn] = q
+            z_all[mn] = z
+            xk = rec[mn]
+            dp = cos_theta *z - sin_theta *q - d2*xk
+            pm = cos_theta *q                - p2*xk
+            d2 = z
+            p2 = q
+            z = dp
+            q = pm
+        d = sin_theta *d + cos_theta *p
+        p = sin_theta *p
+
+    # Near the poles (sin_theta < 1d-5) Bphi uses +/- z instead of q/sin_theta, as in the recursion
+    bk = (sin_theta < 0.00001)
+    qq_all = np.empty((rec.size, N_colat),dtype='float64')
+    np.divide(q_all, sin_theta, out=qq_all, where=~bk)
+    qq_all[:,bk] = z_all[:,bk] * np.where(cos_theta[bk] >= 0, 1.0, -1.0)
+    return q_all, z_all, qq_all
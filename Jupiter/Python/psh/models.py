@@ -0,0 +1,194 @@
+import os
+import numpy as np
+from . import engine
+from .reordergh import expand_out_g_and_h
+
+# Registry of the internal field models, loaded from the data files in psh/data (one for each model,
+# with the original g and h values, written by Mother_Source/MOP_spherical.py) instead of the
+# hard-coded arrays of the jovian_*_internal_*.py codes. e.g.
+#   model = psh.get_model('jrm33', order=13)
+#   B = model.internal_rtp(r_rj, colat_rads, elong_rads)
+# gives the same as jovian_jrm33_order13_internal_rtp(r_rj, colat_rads, elong_rads).
+# Any order up to the highest degree in the data file can be used (e.g. JRM33 up to degree 30), and
+# can also be chosen for each call, e.g. model.internal_rtp(r_rj, colat_rads, elong_rads, degree=5),
+# to trade accuracy for speed (e.g. far from the planet, where the higher degrees are small).
+#
+# Nothing is read when psh is imported. Each data file is read the first time its model is asked for,
+# and each model and order is only expanded out (expand_out_g_and_h) once, then kept for the rest of
+# the session.
+#
+# Citation Info:
+#  DOI: 10.5281/zenodo.6814109     This DOI links to all versions of code at the Github.
+#  Github: https://github.com/rjwilson-LASP/PSH
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+_DATA   = {}  # contents of each data file read so far, keyed by model name
+_MODELS = {}  # Model made so far, keyed by (model name, order)
+
+
+def available_models():
+    # Returns the names of the models in psh/data, e.g. ['isaac', 'jrm09', 'jrm33', ...].
+    return sorted(name[:-4] for name in os.listdir(_DATA_DIR) if name.endswith('.txt'))
+
+
+def get_model(name, order=None):
+    # Returns the Model for a model name, e.g. 'jrm33', up to order (= degree) order.
+    # The name may also include the order, as in the names of the codes, e.g. 'jrm33_order13'.
+    # If order is not given, the model is used up to the highest degree in its data file.
+    name = name.lower()
+    if ('_order' in name):
+        name, name_order = name.split('_order')
+        if (order is not None) and (int(name_order) != order):
+            raise ValueError('order %d does not match model name %s_order%s'%(order,name,name_order))
+        order = int(name_order)
+    if (name not in _DATA):
+        _DATA[name] = _read_data_file(name)
+    data = _DATA[name]
+    if (order is None):
+        order = data['degree']
+    if (int(order) != order) or (order < 1) or (order > data['degree']):
+        raise ValueError('order for model %s must be an integer from 1 to %d'%(name,data['degree']))
+    order = int(order)
+
+    key = (name, order)
+    if (key not in _MODELS):
+        _MODELS[key] = Model(name, order, data)
+    return _MODELS[key]
+
+
+class Model:
+    # An internal field model, up to order (= degree) order, with the same functions as the
+    # jovian_*_internal_rtp.py and jovian_*_internal_xyz.py codes (see engine.py for their inputs and
+    # outputs), so model.internal_rtp(...) is the same as jovian_<name>_order<order>_internal_rtp(...).
+    # Attributes:
+    #  name, order, degree   - model name (e.g. 'jrm33'), and order = degree of the model used.
+    #  planet, reference, notes - from the data file.
+    #  r_ref_km              - 1 Rj in km that the model g and h values assume (e.g. 71323 for VIP4).
+    #  g_original, h_original - original g and h values (index n*(n+1)/2 + m for degree n, order m).
+    #  g, h, rec             - modified g and h arrays, and rec array, from expand_out_g_and_h.
+    # Models can be given to engine.internal_xyz_multi and engine.internal_rtp_multi.
+    # Each function also takes degree, to use the same model truncated to a lower degree for that call
+    # (see truncate), e.g. model.internal_xyz(x_rj, y_rj, z_rj, degree=5), and internal_rtp and internal_xyz
+    # take tol_nT, to choose the degree at each position instead (see engine.internal_rtp), dtype,
+    # for single precision (dtype='float32'), and layout, for the layout of B. Their positions can also be
+    # one n x 3 array, e.g. model.internal_xyz(positions) for positions = [[x, y, z], ...].
+
+    def __init__(self, name, order, data):
+        self.name      = name
+        self.order     = order
+        self.degree    = order
+        self.planet    = data['planet']
+        self.reference = data['reference']
+        self.notes     = data['notes']
+        self.r_ref_km  = data['r_ref_km']
+
+        L = (order+1)*(order+2)//2
+        self.g_original = data['g'][:L].copy()
+        self.h_original = data['h'][:L].copy()
+        # expand_out_g_and_h wants the arrays with an extra 0 at the start, as in MOP_spherical.py
+        g, h, rec = expand_out_g_and_h(order, order, np.append(0.0, self.g_original),
+                                       np.append(0.0, self.h_original))
+        for array in (self.g_original, self.h_original, g, h, rec):
+            array.setflags(write=False)
+        self.g   = g
+        self.h   = h
+        self.rec = rec
+        self._g_list   = g.tolist()
+        self._h_list   = h.tolist()
+        self._rec_list = rec.tolist()
+
+    def __repr__(self):
+        return "psh.get_model('%s', order=%d)"%(self.name,self.order)
+
+    def __reduce__(self):
+        # Pickled (e.g. to send to another process) as its name and order, so is loaded from its data file
+        # there (once, see get_model), rather than copying its arrays.
+        return (get_model, (self.name, self.order))
+
+    def truncate(self, degree):
+        # Returns the same model up to a lower degree (made once, then kept), or this model if degree
+        # is None or its own order.
+        if (degree is None) or (degree == self.order):
+            return self
+        if (degree > self.order):
+            raise ValueError('degree must be no more than the order of the model, %d'%self.order)
+        return get_model(self.name, degree)
+
+    def internal_rtp(self, r_rj, colat_rads=None, elong_rads=None, out=None, workspace=None, jacobian=False,
+                     degree=None, tol_nT=None, return_degree=False, dtype=None, layout=None):
+        model = self.truncate(degree)
+        return engine.internal_rtp(r_rj, colat_rads, elong_rads, model.g, model.h, model.rec, model.r_ref_km,
+                                   out=out, workspace=workspace, jacobian=jacobian,
+                                   tol_nT=tol_nT, return_degree=return_degree, dtype=dtype, layout=layout)
+
+    def internal_xyz(self, x_rj, y_rj=None, z_rj=None, out=None, workspace=None, jacobian=False,
+                     degree=None, tol_nT=None, return_degree=False, dtype=None, layout=None):
+        model = self.truncate(degree)
+        return engine.internal_xyz(x_rj, y_rj, z_rj, model.g, model.h, model.rec, model.r_ref_km,
+                                   out=out, workspace=workspace, jacobian=jacobian,
+                                   tol_nT=tol_nT, return_degree=return_degree, dtype=dtype, layout=layout)
+
+    def internal_rtp_scalar(self, r_rj, colat_rads, elong_rads, degree=None):
+        model = self.truncate(degree)
+        return engine.internal_rtp_scalar(r_rj, colat_rads, elong_rads,
+                                          model._g_list, model._h_list, model._rec_list, model.r_ref_km)
+
+    def internal_xyz_scalar(self, x_rj, y_rj, z_rj, degree=None):
+        model = self.truncate(degree)
+        return engine.internal_xyz_scalar(x_rj, y_rj, z_rj,
+                                          model._g_list, model._h_list, model._rec_list, model.r_ref_km)
+
+    def internal_rtp_grid(self, r_rj, colat_rads, elong_rads, degree=None):
+        model = self.truncate(degree)
+        return engine.internal_rtp_grid(r_rj, colat_rads, elong_rads, model.g, model.h, model.rec, model.r_ref_km)
+
+    def internal_rtp_shell(self, r_rj, colat_rads, N_elong, degree=None):
+        model = self.truncate(degree)
+        return engine.internal_rtp_shell(r_rj, colat_rads, N_elong, model.g, model.h, model.rec, model.r_ref_km)
+
+    def internal_rtp_normalised(self, r_rj, colat_rads, elong_rads, out=None, degree=None):
+        model = self.truncate(degree)
+        return engine.internal_rtp_normalised(r_rj, colat_rads, elong_rads, model.g_original, model.h_original,
+                                              model.r_ref_km, out=out)
+
+    def internal_xyz_normalised(self, x_rj, y_rj, z_rj, out=None, degree=None):
+        model = self.truncate(degree)
+        return engine.internal_xyz_normalised(x_rj, y_rj, z_rj, model.g_original, model.h_original,
+                                              model.r_ref_km, out=out)
+
+    def coefficients(self):
+        # The original [g, h] as one vector, in the order used by engine.design_matrix_xyz and
+        # engine.internal_xyz_ensemble.
+        return np.concatenate((self.g_original, self.h_original))
+
+
+def _read_data_file(name):
+    # Reads psh/data/<name>.txt, returns a dictionary of its values, with g and h the original values
+    # at index n*(n+1)/2 + m for degree n and order m (the same as the comments of the model codes).
+    file_name = os.path.join(_DATA_DIR, '%s.txt'%name)
+    if not os.path.exists(file_name):
+        raise ValueError('Did not recognize model %s, models are: %s'%(name,', '.join(available_models())))
+    data = {}
+    rows = []
+    file = open(file_name, 'r')
+    for line in file:
+        line = line.strip()
+        if (len(line) == 0) or line.startswith('#'):
+            continue
+        if (':' in line):
+            key, value = line.split(':', 1)
+            data[key.strip()] = value.strip()
+        else:
+            rows.append([float(value) for value in line.split()])
+    file.close()
+
+    data['r_ref_km'] = int(data['r_ref_km'])
+    data['degree']   = int(data['degree'])
+    L = (data['degree']+1)*(data['degree']+2)//2
+    data['g'] = np.zeros(L,dtype='float64')
+    data['h'] = np.zeros(L,dtype='float64')
+    for n, m, g, h in rows:
+        mn = int( n*(n+1)/2 + m )
+        data['g'][mn] = g
+        data['h'][mn] = h
+    return data
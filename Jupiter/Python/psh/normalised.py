@@ -0,0 +1,130 @@
+import numpy as np
+
+# Alternative spherical harmonic recursion for high degrees (e.g. the 30+ degrees of the Juno models),
+# using fully normalised associated Legendre functions, used by engine.internal_rtp_normalised.
+#
+# The recursion in engine.py uses the rec ratios of unnormalised Legendre functions, with the
+# normalisation folded in to g and h (expand_out_g_and_h). These grow and shrink quickly with degree,
+# so lose precision (and eventually overflow) at high degree. Here, the fully normalised functions
+#   Pbar(n,m) = sqrt(2n+1) P(n,m)     (P the Schmidt semi-normalised functions of the g and h values)
+# are used, which all stay of order 1, with the recursions
+#   Pbar(n,m) = a(n,m) cos(colat) Pbar(n-1,m) - b(n,m) Pbar(n-2,m)
+#   dPbar(n,m)/dcolat = (n cos(colat) Pbar(n,m) - f(n,m) Pbar(n-1,m))/sin(colat)
+#   dPbar(n,0)/dcolat = -sqrt(n(n+1)/2) Pbar(n,1)
+# To keep the factor sin(colat)^m of Pbar(n,m) from underflowing near the poles at high order, the
+# recursion is done on Qbar(n,m) = Pbar(n,m)/sin(colat)^m (which starts from a constant, Qbar(m,m)),
+# and the sums for each m are multiplied by sin(colat)^m with Horner's scheme, i.e.
+#   sum over m of sin(colat)^m A(m) = (...(A(M) sin(colat) + A(M-1)) sin(colat) + ...) + A(0)
+# working down from the highest order. There is then no division by sin(colat) at all (Bphi and
+# Btheta have sin(colat)^(m-1)), so the poles need no special case.
+#
+# The coefficients are the original (Schmidt semi-normalised) g and h values, as in the comments of
+# the model codes and the data files of psh/models.py, divided by sqrt(2n+1) for Pbar.
+#
+# Citation Info:
+#  DOI: 10.5281/zenodo.6814109     This DOI links to all versions of code at the Github.
+#  Github: https://github.com/rjwilson-LASP/PSH
+
+_TABLES = {}  # tables made by normalised_tables, for each g array used (keyed by id, with g kept too)
+
+
+def normalised_tables(g_original, h_original, degree):
+    # Returns the tables for the recursion, for the original g and h values (index n*(n+1)/2 + m for
+    # degree n and order m) up to degree. Tables are made on the first call for each g array, then reused.
+    #  G, H   - g and h / sqrt(2n+1), size degree+1 x degree+1, index [m,n] (so loops over n are contiguous).
+    #  A, B   - a(n,m) and b(n,m) above, same size.
+    #  F      - f(n,m) above, same size.
+    #  C      - Qbar(m,m), size degree+1.
+    #  D0     - sqrt(n(n+1)/2), size degree+1.
+    key = (id(g_original), degree)
+    if key in _TABLES:
+        tables = _TABLES[key]
+        if (tables[0] is g_original) and (tables[1] is h_original):
+            return tables[2]
+
+    M = degree
+    G = np.zeros((M+1,M+1),dtype='float64')
+    H = np.zeros((M+1,M+1),dtype='float64')
+    A = np.zeros((M+1,M+1),dtype='float64')
+    B = np.zeros((M+1,M+1),dtype='float64')
+    F = np.zeros((M+1,M+1),dtype='float64')
+    for n in range(1, M+1):
+        for m in range(0, n+1):
+            mn = n*(n+1)//2 + m
+            if (mn < g_original.size):
+                G[m,n] = g_original[mn]/np.sqrt(np.float64(2*n+1))
+                H[m,n] = h_original[mn]/np.sqrt(np.float64(2*n+1))
+    for m in range(0, M+1):
+        for n in range(m+1, M+1):
+            A[m,n] = np.sqrt(np.float64((2*n-1)*(2*n+1))/np.float64((n-m)*(n+m)))
+            B[m,n] = np.sqrt(np.float64((2*n+1)*(n+m-1)*(n-m-1))/np.float64((n-m)*(n+m)*(2*n-3)))
+        for n in range(max(m,1), M+1):
+            F[m,n] = np.sqrt(np.float64((n*n-m*m)*(2*n+1))/np.float64(2*n-1))
+    C = np.zeros(M+1,dtype='float64')
+    C[0] = 1.0
+    if (M >= 1):
+        C[1] = np.sqrt(3.0)
+    for m in range(2, M+1):
+        C[m] = C[m-1]*np.sqrt(np.float64(2*m+1)/np.float64(2*m))
+    D0 = np.sqrt(np.arange(M+1,dtype='float64')*np.arange(1, M+2,dtype='float64')/2.0)
+
+    tables = {'degree': M, 'G': G, 'H': H, 'A': A, 'B': B, 'F': F, 'C': C, 'D0': D0}
+    for name in ('G', 'H', 'A', 'B', 'F', 'C', 'D0'):
+        tables[name].setflags(write=False)
+    _TABLES[key] = (g_original, h_original, tables)
+    return tables
+
+
+def rtp_normalised(r_rj, colat_rads, elong_rads, tables):
+    # The recursion for 1D inputs of size n (r_rj already scaled to the Rj the model expects).
+    # Returns Br, Btheta, Bphi (nT), each size n.
+    M  = tables['degree']
+    G  = tables['G']
+    H  = tables['H']
+    A  = tables['A']
+    B  = tables['B']
+    F  = tables['F']
+    C  = tables['C']
+    D0 = tables['D0']
+
+    t  = np.cos(colat_rads)
+    u  = np.sin(colat_rads)
+    ir = 1.0/r_rj
+    Br = np.zeros(r_rj.shape,dtype='float64')  # Horner sums over m, from m = M down
+    Bt = np.zeros(r_rj.shape,dtype='float64')
+    Bp = np.zeros(r_rj.shape,dtype='float64')
+    Bt0 = np.zeros(r_rj.shape,dtype='float64')  # m = 0 part of Btheta, / sin(colat)
+    for m in range(M, -1, -1):
+        cos_m = np.cos(m*elong_rads)
+        sin_m = np.sin(m*elong_rads)
+        rho = ir**(m+2)  # = (1/r)^(n+2), for n = m
+        q      = np.full(r_rj.shape, C[m])  # Qbar(n,m)
+        q_prev = np.zeros(r_rj.shape,dtype='float64')  # Qbar(n-1,m)
+        rG = np.zeros(r_rj.shape,dtype='float64')  # sums over n for Br, Btheta and Bphi, of g and of h
+        rH = np.zeros(r_rj.shape,dtype='float64')
+        tG = np.zeros(r_rj.shape,dtype='float64')
+        tH = np.zeros(r_rj.shape,dtype='float64')
+        pG = np.zeros(r_rj.shape,dtype='float64')
+        pH = np.zeros(r_rj.shape,dtype='float64')
+        for n in range(m, M+1):
+            if (n != m):
+                q, q_prev = A[m,n]*t*q - B[m,n]*q_prev, q
+                rho = rho*ir
+            if (n == 0):  # no degree 0
+                continue
+            w  = rho*q
+            wd = rho*(n*t*q - F[m,n]*q_prev)
+            rG += w*(n+1)*G[m,n]
+            rH += w*(n+1)*H[m,n]
+            tG += wd*G[m,n]
+            tH += wd*H[m,n]
+            pG += w*G[m,n]
+            pH += w*H[m,n]
+            if (m == 1):  # dPbar(n,0)/dcolat = -sqrt(n(n+1)/2) sin(colat) Qbar(n,1)
+                Bt0 += w*D0[n]*G[0,n]
+        Br = Br*u + (cos_m*rG + sin_m*rH)
+        if (m >= 1):
+            Bt = Bt*u - (cos_m*tG + sin_m*tH)
+            Bp = Bp*u + m*(sin_m*pG - cos_m*pH)
+    Bt = Bt + u*Bt0
+    return Br, Bt, Bp
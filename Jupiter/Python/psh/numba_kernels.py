@@ -0,0 +1,269 @@
+import math
+import numpy as np
+from numba import njit, prange
+
+# Numba compiled version of the recursion in engine.py, used by engine.py for vector inputs
+# when Numba is installed (see engine.set_backend).
+#
+# The loop over positions is inside the compiled code, and is split across cores with prange.
+# Each position does the same recursion as engine._rtp_recursion_scalar.
+# Compiled code is cached on disk (cache=True, in __pycache__ next to this file), so only the
+# first run pays the compile time.
+#
+# Citation Info:
+#  DOI: 10.5281/zenodo.6814109     This DOI links to all versions of code at the Github.
+#  Github: https://github.com/rjwilson-LASP/PSH
+
+
+@njit(parallel=True, cache=True)
+def rtp_recursion(r_rj, colat_rads, elong_rads, g, h, rec, k_plus1, out):
+    # Inputs r_rj, colat_rads and elong_rads are 1D contiguous double arrays, with r_rj already
+    # scaled to the Rj the model expects.
+    # Output out is size 7 x n, and is filled with Br, Btheta, Bphi (nT), and the sin and cos of
+    # the colatitude and longitude, i.e. the same order as engine._rtp_recursion returns.
+    for i in prange(r_rj.shape[0]):
+        # a[n] = (1/r)^(n+1) is made as it is needed, as in engine._rtp_recursion_vector
+        da = 1.0/r_rj[i]
+        a_m = da  # = a[0]
+
+        cos_phi   = math.cos(elong_rads[i])
+        sin_phi   = math.sin(elong_rads[i])
+        cos_theta = math.cos(colat_rads[i])
+        sin_theta = math.sin(colat_rads[i])
+        not_bk = (sin_theta >= 0.00001 )  # = 1d-5 - also see bk in engine._rtp_recursion
+
+        p   = 1.0
+        d   = 0.0
+        bbr = 0.0
+        bbt = 0.0
+        bbf = 0.0
+        x = 0.0
+        y = 1.0
+
+        for m in range(1, k_plus1):
+            a_m *= da  # = a[m]
+            an = a_m
+            bm  = (m != 1)
+            if bm:
+                w = x
+                x = w *cos_phi + y *sin_phi
+                y = y *cos_phi - w *sin_phi
+            q = p
+            z = d
+            bi = 0.0
+            p2 = 0.0
+            d2 = 0.0
+            for n in range(m, k_plus1):
+                if (n != m):
+                    an *= da  # = a[n]
+                mn = n*(n-1)//2 + m
+                w  = g[mn]*y + h[mn]*x
+                bbr += an*n*w*q  # = b[n]*w*q, with b = a * DINDGEN_k
+                bbt -= an*w*z
+                if bm:
+                    if not_bk:
+                        bi += an * (g[mn]*x-h[mn]*y) * q
+                    else:
+                        bi += an * (g[mn]*x-h[mn]*y) * z
+                xk = rec[mn]
+                dp = cos_theta *z - sin_theta *q - d2*xk
+                pm = cos_theta *q                - p2*xk
+                d2 = z
+                p2 = q
+                z = dp
+                q = pm
+            d = sin_theta *d + cos_theta *p
+            p = sin_theta *p
+            if bm:
+                bi  *= (m - 1)
+                bbf += bi
+
+        if not_bk:
+            bf = bbf/sin_theta
+        else:
+            if (cos_theta >= 0):
+                bf =  bbf
+            else:
+                bf = -bbf
+
+        out[0,i] = bbr
+        out[1,i] = bbt
+        out[2,i] = bf
+        out[3,i] = sin_theta
+        out[4,i] = cos_theta
+        out[5,i] = sin_phi
+        out[6,i] = cos_phi
+
+
+@njit(parallel=True, cache=True)
+def xyz_recursion(x_in, y_in, z_in, n_max, packed, out):
+    # The Cartesian recursion of cartesian.xyz_recursion, for each position.
+    # Inputs x_in, y_in and z_in are 1D contiguous double arrays, already scaled to the Rj the model
+    # expects, and n_max and packed are from cartesian.cartesian_tables.
+    # Output out is size n x (number of components), and is filled with Bx, By, Bz (nT), then the
+    # Jacobian if the tables have it.
+    n_comp = out.shape[1]
+    for i in prange(x_in.shape[0]):
+        r2 = x_in[i]*x_in[i] + y_in[i]*y_in[i] + z_in[i]*z_in[i]
+        s_re = 1.0/math.sqrt(r2)  # I(0,0) = 1/r
+        inv_r2 = 1.0/r2
+        xr = x_in[i]*inv_r2
+        yr = y_in[i]*inv_r2
+        zr = z_in[i]*inv_r2
+        s_im = 0.0
+        for i_comp in range(n_comp):
+            out[i,i_comp] = 0.0
+        j = 0  # row of packed
+        for m in range(0, n_max+1):
+            if (m != 0):  # I(m,m) = (x + iy)/r^2 I(m-1,m-1)
+                t = s_re*xr - s_im*yr
+                s_im = s_re*yr + s_im*xr
+                s_re = t
+            i_re  = s_re
+            i_im  = s_im
+            i1_re = 0.0
+            i1_im = 0.0
+            for n in range(m, n_max+1):
+                if (n != m):  # I(n,m) = z/r^2 I(n-1,m) - K(n,m)/r^2 I(n-2,m)
+                    i2_re = i1_re
+                    i2_im = i1_im
+                    i1_re = i_re
+                    i1_im = i_im
+                    i_re = zr*i1_re - (inv_r2*i2_re)*packed[j,0]
+                    i_im = zr*i1_im - (inv_r2*i2_im)*packed[j,0]
+                # Same sums, in the same order, as cartesian.xyz_recursion (which skips the zero terms)
+                for i_comp in range(n_comp):
+                    out[i,i_comp] += i_re*packed[j,1+2*i_comp]
+                    out[i,i_comp] -= i_im*packed[j,2+2*i_comp]
+                j += 1
+
+
+@njit(parallel=True, cache=True)
+def xyz_recursion_float32(x_in, y_in, z_in, n_max, packed, out):
+    # As xyz_recursion for B only (out n x 3), for float32 x_in, y_in, z_in and out: each position is
+    # read and B written in single precision, but the recursion and sums are done in doubles (in
+    # registers, so no slower), which is more accurate than the float32 numpy code.
+    for i in prange(x_in.shape[0]):
+        x = np.float64(x_in[i])
+        y = np.float64(y_in[i])
+        z = np.float64(z_in[i])
+        r2 = x*x + y*y + z*z
+        s_re = 1.0/math.sqrt(r2)  # I(0,0) = 1/r
+        inv_r2 = 1.0/r2
+        xr = x*inv_r2
+        yr = y*inv_r2
+        zr = z*inv_r2
+        s_im = 0.0
+        bx = 0.0
+        by = 0.0
+        bz = 0.0
+        j = 0  # row of packed
+        for m in range(0, n_max+1):
+            if (m != 0):  # I(m,m) = (x + iy)/r^2 I(m-1,m-1)
+                t = s_re*xr - s_im*yr
+                s_im = s_re*yr + s_im*xr
+                s_re = t
+            i_re  = s_re
+            i_im  = s_im
+            i1_re = 0.0
+            i1_im = 0.0
+            for n in range(m, n_max+1):
+                if (n != m):  # I(n,m) = z/r^2 I(n-1,m) - K(n,m)/r^2 I(n-2,m)
+                    i2_re = i1_re
+                    i2_im = i1_im
+                    i1_re = i_re
+                    i1_im = i_im
+                    i_re = zr*i1_re - (inv_r2*i2_re)*packed[j,0]
+                    i_im = zr*i1_im - (inv_r2*i2_im)*packed[j,0]
+                bx += i_re*packed[j,1] - i_im*packed[j,2]
+                by += i_re*packed[j,3] - i_im*packed[j,4]
+                bz += i_re*packed[j,5] - i_im*packed[j,6]
+                j += 1
+        out[i,0] = bx
+        out[i,1] = by
+        out[i,2] = bz
+
+
+@njit(parallel=True, cache=True)
+def rtp_normalised(r_rj, colat_rads, elong_rads, degree, G, H, A, B, F, C, D0, out):
+    # Compiled version of normalised.rtp_normalised, for the tables of normalised.normalised_tables.
+    # Inputs r_rj, colat_rads and elong_rads are 1D contiguous double arrays, with r_rj already
+    # scaled to the Rj the model expects.
+    # Output out is size n x 3, and is filled with Br, Btheta, Bphi (nT).
+    # The positions are done in blocks of 16, with the loop over the block innermost, so the
+    # recursion for the block is vectorised (each position on its own is one long chain of
+    # dependent operations).
+    N_input = r_rj.shape[0]
+    N_block = 16
+    for i_block in prange((N_input + N_block - 1)//N_block):
+        i0 = i_block*N_block
+        nb = min(N_block, N_input - i0)
+        t   = np.empty(N_block)
+        u   = np.empty(N_block)
+        ir  = np.empty(N_block)
+        phi = np.empty(N_block)
+        for k in range(nb):
+            t[k]   = math.cos(colat_rads[i0+k])
+            u[k]   = math.sin(colat_rads[i0+k])
+            ir[k]  = 1.0/r_rj[i0+k]
+            phi[k] = elong_rads[i0+k]
+        br  = np.zeros(N_block)  # Horner sums over m, from m = degree down
+        bt  = np.zeros(N_block)
+        bp  = np.zeros(N_block)
+        bt0 = np.zeros(N_block)  # m = 0 part of Btheta, / sin(colat)
+        q      = np.empty(N_block)
+        q_prev = np.empty(N_block)
+        rho    = np.empty(N_block)
+        rG = np.empty(N_block)
+        rH = np.empty(N_block)
+        tG = np.empty(N_block)
+        tH = np.empty(N_block)
+        pG = np.empty(N_block)
+        pH = np.empty(N_block)
+        for m in range(degree, -1, -1):
+            for k in range(nb):
+                rho[k]    = ir[k]**(m+2)
+                q[k]      = C[m]
+                q_prev[k] = 0.0
+                rG[k] = 0.0
+                rH[k] = 0.0
+                tG[k] = 0.0
+                tH[k] = 0.0
+                pG[k] = 0.0
+                pH[k] = 0.0
+            for n in range(m, degree+1):
+                a_mn = A[m,n]
+                b_mn = B[m,n]
+                f_mn = F[m,n]
+                g_mn = G[m,n]
+                h_mn = H[m,n]
+                d0_n = D0[n]*G[0,n]
+                if (n != m):
+                    for k in range(nb):
+                        q_new     = a_mn*t[k]*q[k] - b_mn*q_prev[k]
+                        q_prev[k] = q[k]
+                        q[k]      = q_new
+                        rho[k]   *= ir[k]
+                for k in range(nb):
+                    w  = rho[k]*q[k]
+                    wd = rho[k]*(n*t[k]*q[k] - f_mn*q_prev[k])
+                    rG[k] += w*(n+1)*g_mn
+                    rH[k] += w*(n+1)*h_mn
+                    tG[k] += wd*g_mn
+                    tH[k] += wd*h_mn
+                    pG[k] += w*g_mn
+                    pH[k] += w*h_mn
+                if (m == 1):
+                    for k in range(nb):
+                        bt0[k] += rho[k]*q[k]*d0_n
+            for k in range(nb):  # degree 0 (n = m = 0) has g = h = 0, so adds nothing
+                cos_m = math.cos(m*phi[k])
+                sin_m = math.sin(m*phi[k])
+                br[k] = br[k]*u[k] + (cos_m*rG[k] + sin_m*rH[k])
+                if (m >= 1):
+                    bt[k] = bt[k]*u[k] - (cos_m*tG[k] + sin_m*tH[k])
+                    bp[k] = bp[k]*u[k] + m*(sin_m*pG[k] - cos_m*pH[k])
+        for k in range(nb):
+            out[i0+k,0] = br[k]
+            out[i0+k,1] = bt[k] + u[k]*bt0[k]
+            out[i0+k,2] = bp[k]
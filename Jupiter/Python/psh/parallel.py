@@ -0,0 +1,268 @@
+import os
+import sys
+import atexit
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
+from . import engine
+from .models import Model
+
+# Parallel evaluation of a model for large vector inputs, splitting the positions in to contiguous
+# blocks, one for each worker, each written in to its part of one output array. e.g.
+#   B = psh.parallel_evaluate(psh.get_model('jrm33', order=13), x_rj, y_rj, z_rj, workers=16)
+# gives the same B as jovian_jrm33_order13_internal_xyz(x_rj, y_rj, z_rj), to the last bit.
+#
+# The numpy code spends nearly all of its time in numpy operations on whole arrays, which release the
+# GIL, so threads can run the blocks at the same time. The blocks are made of the same chunks of
+# positions as a serial call (see engine.set_chunking), and with the 'auto' backend each block uses the
+# code the serial call would use for all the positions (not the one for the size of the block, see
+# engine.set_backend), so the sums are done the same way.
+# The numba code already loops over positions in parallel across all cores (as does the 'threads'
+# backend, see engine.set_backend), so with that backend the call is just made as normal, unless
+# processes=True.
+#
+# With processes=True, the blocks are run in a pool of worker processes instead, kept for later calls,
+# for any backend (with numba, each worker runs its block on its share of the cores).
+# The positions and the output are put in shared memory (multiprocessing.shared_memory), so each worker
+# is only sent the model (by name, see Model.__reduce__, and kept loaded in each worker), the names of the
+# shared memory blocks and the positions of its block. Any error in a worker is raised in the caller.
+# The positions are copied in to shared memory, and B (and J) back out of it in to out, which is about 2%
+# of the time of a serial call for JRM33 order 13 (so ~2% x workers of the time of the parallel call). To
+# save copying B, out can be a shared memory block that the workers write B in to, e.g.
+#   block = multiprocessing.shared_memory.SharedMemory(create=True, size=24*n)
+#   B = psh.parallel_evaluate(model, x_rj, y_rj, z_rj, out=block, processes=True)  # uses block
+#   ...
+#   del B
+#   block.close()
+#   block.unlink()
+# The pools are shut down when Python exits, when more than _MAX_POOLS are made (the one used least
+# recently is shut down), or with shutdown_pools().
+#
+# Citation Info:
+#  DOI: 10.5281/zenodo.6814109     This DOI links to all versions of code at the Github.
+#  Github: https://github.com/rjwilson-LASP/PSH
+
+
+_PROCESS_POOLS = {}  # ProcessPoolExecutor made so far, keyed by number of workers, the last used last
+_MAX_POOLS = 2       # most pools kept at a time
+
+
+def parallel_evaluate(model, x_rj, y_rj=None, z_rj=None, workers=None, out=None, jacobian=False, processes=False):
+    # Inputs:
+    #  model      - a psh.Model (whose internal_xyz is used), or any function with the inputs of the
+    #               jovian_*_internal_xyz.py or jovian_*_internal_rtp.py codes (e.g. model.internal_rtp,
+    #               then with r_rj, colat_rads and elong_rads in place of x_rj, y_rj and z_rj). With
+    #               set_chunking(max_bytes=...), other functions are called as normal, as the chunks depend
+    #               on the order of their model.
+    #  x_rj, y_rj, z_rj - 1D arrays of positions, as for the model codes (or one n x 3 array, x_rj).
+    #  workers    - number of threads (default: the number of cores).
+    #  out        - n x 3 numpy array of doubles to write B in to (and return), instead of making a new array,
+    #               or a multiprocessing.shared_memory.SharedMemory block of at least 24 n bytes, which B is
+    #               written to the start of, as an n x 3 array of doubles (with processes, without a copy).
+    #  jacobian   - if True, also return the Jacobian of B, as the model codes.
+    #  processes  - if True, use worker processes rather than threads (model must then be a psh.Model,
+    #               a method of one, or a jovian_* function, so it can be sent to the workers by name).
+    #               This is also used with the numba backend, which otherwise makes one call as normal.
+    # Outputs:
+    #  B (and J if jacobian is True), as the model codes.
+    if isinstance(model, Model):
+        function = model.internal_xyz
+    else:
+        function = model
+    if (workers is None):
+        workers = os.cpu_count() or 1
+    if (int(workers) != workers) or (workers < 1):
+        raise ValueError('workers must be a positive integer')
+    workers = int(workers)
+
+    # Inputs the model codes would not take as a vector are left for them to report
+    if (y_rj is None) and (z_rj is None):
+        x_rj, y_rj, z_rj = engine._position_columns(x_rj, np.float64)  # views of its columns
+    x_rj = np.asarray(x_rj, dtype='float64')
+    y_rj = np.asarray(y_rj, dtype='float64')
+    z_rj = np.asarray(z_rj, dtype='float64')
+    N_input = x_rj.size
+    order = _model_order(function)
+    if isinstance(out, shared_memory.SharedMemory):
+        if (out.size < 24*N_input):
+            raise ValueError('out must be a shared memory block of at least 24 n bytes')
+        out_shared = out
+        out = np.ndarray((N_input,3), dtype='float64', buffer=out_shared.buf)
+    else:
+        out_shared = None
+    if (order is None) and (engine._MAX_BYTES is not None):  # the chunks depend on the order of the model
+        return function(x_rj, y_rj, z_rj, out=out, jacobian=jacobian)
+    backend = engine.get_backend(N_input, jacobian, order)
+    if (workers == 1) or (N_input < 4) or (backend in ('numba', 'threads') and not processes) or \
+       (x_rj.ndim != 1) or (y_rj.shape != x_rj.shape) or (z_rj.shape != x_rj.shape):
+        return function(x_rj, y_rj, z_rj, out=out, jacobian=jacobian)
+
+    starts = _block_starts(N_input, workers, jacobian, order)
+    if (len(starts) <= 2):
+        return function(x_rj, y_rj, z_rj, out=out, jacobian=jacobian)
+    if (out is None):
+        out = np.empty((N_input,3),dtype='float64')
+    else:
+        engine._check_out(out, N_input)
+    if jacobian:
+        J = np.empty((N_input,3,3),dtype='float64')
+    else:
+        J = None
+    # The backend 'auto' would choose for the serial call, used by every block (as the chunks of engine._chunked)
+    band = engine._dispatch_band(N_input)
+    if (band == 'threads'):
+        band = 'numpy'
+    if processes:
+        _evaluate_processes(function, x_rj, y_rj, z_rj, starts, out, J, band, out_shared)
+        if jacobian:
+            return out, J
+        return out
+
+    def evaluate_block(i0, i1):  # each call makes its own Workspace
+        engine._CHUNK_BAND.backend = band
+        try:
+            result = function(x_rj[i0:i1], y_rj[i0:i1], z_rj[i0:i1], out=out[i0:i1], jacobian=jacobian)
+        finally:
+            engine._CHUNK_BAND.backend = None
+        if jacobian:
+            J[i0:i1] = result[1]
+
+    with ThreadPoolExecutor(max_workers=len(starts)-1) as pool:
+        blocks = [pool.submit(evaluate_block, i0, i1) for i0, i1 in zip(starts[:-1], starts[1:])]
+        for block in blocks:
+            block.result()  # raises any error from the block
+    if jacobian:
+        return out, J
+    return out
+
+
+def _model_order(function):
+    # The order of the model of function (a method of a psh.Model, or a jovian_* function), or None if not
+    # known, for the size of the chunks (see engine._chunk_size).
+    model = getattr(function, '__self__', None)
+    if isinstance(model, Model):
+        return model.order
+    rec = getattr(sys.modules.get(getattr(function, '__module__', None)), 'rec', None)
+    if (rec is not None) and function.__name__.startswith('jovian_'):
+        return engine._order_plus1(rec) - 2
+    return None
+
+
+def _block_starts(N_input, workers, jacobian, order):
+    # The first position of each block (up to workers blocks, each of whole chunks, as engine._chunked),
+    # then N_input. If there is only one chunk (or none, engine.set_chunking(None)), the positions are
+    # split evenly (each block still using the backend of the whole call, see parallel_evaluate), but not
+    # for the Jacobian or set_summation('matrix'), whose matrix products can round differently for other
+    # blocks.
+    chunk = engine._chunk_size(jacobian, order)
+    if (chunk + 1 >= N_input):
+        if jacobian or (engine.get_summation() == 'matrix'):
+            return [0, N_input]
+        workers = min(workers, N_input//2)  # the codes take 1D arrays of size 2 or more
+        return [(i*N_input)//workers for i in range(workers+1)]
+    chunk_starts = engine._chunk_starts(N_input, chunk)
+    N_chunks = len(chunk_starts) - 1
+    workers = min(workers, N_chunks)
+    return [chunk_starts[(i*N_chunks)//workers] for i in range(workers+1)]
+
+
+def shutdown_pools():
+    # Shuts down the worker processes of parallel_evaluate(..., processes=True) (done when Python exits).
+    # Later calls start new ones.
+    while (len(_PROCESS_POOLS) > 0):
+        _PROCESS_POOLS.pop(next(iter(_PROCESS_POOLS))).shutdown()
+
+
+atexit.register(shutdown_pools)
+
+
+def _process_pool(workers):
+    # Returns the pool of worker processes, made on the first call for each number of workers. Only the
+    # _MAX_POOLS used most recently are kept.
+    pool = _PROCESS_POOLS.pop(workers, None)
+    if (pool is None):
+        while (len(_PROCESS_POOLS) >= _MAX_POOLS):
+            _PROCESS_POOLS.pop(next(iter(_PROCESS_POOLS))).shutdown()
+        # Numba's threads (e.g. TBB) do not survive a fork, so if it is installed, the workers are started
+        # as new processes instead (which then import psh themselves)
+        if engine._numba_installed():
+            context = multiprocessing.get_context('spawn')
+        else:
+            context = None
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    _PROCESS_POOLS[workers] = pool  # (last, as the one used most recently)
+    return pool
+
+
+def _evaluate_processes(function, x_rj, y_rj, z_rj, starts, out, J, band, out_shared):
+    # Runs each block (from starts) of function in the process pool, each with the 'auto' backend's band
+    # for the whole call (band), with the positions, B (out) and the Jacobian (J, or None) in shared
+    # memory, then copies B and J in to out and J. If out_shared is given (the shared memory block of
+    # out), B is written straight in to it instead.
+    workers = len(starts) - 1
+    pool = _process_pool(workers)
+    N_input = x_rj.size
+    settings = (engine._BACKEND, engine._SUMMATION, engine._CHUNK_SIZE, engine._MAX_BYTES,
+                max(1, (os.cpu_count() or 1)//workers), band)
+
+    shared = []  # blocks made here (unlinked at the end)
+    try:
+        for size in (3*N_input, 0 if (out_shared is not None) else 3*N_input, 0 if (J is None) else 9*N_input):
+            if (size > 0):
+                shared.append(shared_memory.SharedMemory(create=True, size=8*size))
+        positions = np.ndarray((3,N_input), dtype='float64', buffer=shared[0].buf)
+        positions[0,:] = x_rj
+        positions[1,:] = y_rj
+        positions[2,:] = z_rj
+        del positions
+        if (out_shared is not None):
+            names = [shared[0].name, out_shared.name] + [block.name for block in shared[1:]]
+        else:
+            names = [block.name for block in shared]
+        blocks = [pool.submit(_evaluate_shared_block, function, settings, names, N_input, i0, i1, J is not None)
+                  for i0, i1 in zip(starts[:-1], starts[1:])]
+        for block in blocks:
+            block.result()  # raises any error from the block
+        if (out_shared is None):
+            out[:,:] = np.ndarray((N_input,3), dtype='float64', buffer=shared[1].buf)
+        if (J is not None):
+            J[:,:,:] = np.ndarray((N_input,3,3), dtype='float64', buffer=shared[-1].buf)
+    finally:
+        for block in shared:
+            block.close()
+            block.unlink()
+
+
+def _evaluate_shared_block(function, settings, names, N_input, i0, i1, jacobian):
+    # Runs in a worker process: function for positions i0 to i1 of the shared memory blocks names
+    # (positions, B, and the Jacobian if jacobian), with the parent's backend, summation, chunks and band
+    # (for 'auto'), and with numba using numba_threads threads (this worker's share of the cores).
+    backend, summation, chunk_size, max_bytes, numba_threads, band = settings
+    if engine._numba_installed():
+        import numba
+        numba.set_num_threads(min(numba_threads, numba.config.NUMBA_NUM_THREADS))
+    engine.set_backend(backend)
+    engine.set_summation(summation)
+    engine.set_chunking(chunk_size, max_bytes)
+    shared = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        positions = np.ndarray((3,N_input), dtype='float64', buffer=shared[0].buf)
+        out = np.ndarray((N_input,3), dtype='float64', buffer=shared[1].buf)
+        engine._CHUNK_BAND.backend = band
+        try:
+            result = function(positions[0,i0:i1], positions[1,i0:i1], positions[2,i0:i1], out=out[i0:i1],
+                              jacobian=jacobian)
+        finally:
+            engine._CHUNK_BAND.backend = None
+        if jacobian:
+            J = np.ndarray((N_input,3,3), dtype='float64', buffer=shared[2].buf)
+            J[i0:i1] = result[1]
+            del J
+        del positions, out, result
+    finally:
+        for block in shared:
+            try:
+                block.close()
+            except BufferError:  # still used by the traceback of an error, so closed when that goes
+                pass
@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# The tests use psh and the jovian_*.py codes from Jupiter/Python, as the codes themselves do
+# (no install needed), e.g. run with: cd Jupiter/Python; python -m pytest tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The 'auto' backend reads no calibration (see psh.calibrate), so the tests never use or change your own
+# ~/.config/psh/dispatch.txt (the worker processes of psh.parallel_evaluate get this too)
+os.environ['PSH_DISPATCH_FILE'] = os.path.join(tempfile.gettempdir(), 'psh-tests-%d'%os.getpid(), 'dispatch.txt')
+
+import psh
+
+
+@pytest.fixture(params=['numpy', 'numba'])
+def backend(request):
+    # Runs a test with each backend (numba only if it is installed), then goes back to 'auto'.
+    if (request.param == 'numba'):
+        pytest.importorskip('numba')
+    psh.set_backend(request.param)
+    yield request.param
+    psh.set_backend('auto')
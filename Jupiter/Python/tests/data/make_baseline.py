@@ -0,0 +1,24 @@
+# Writes tests/data/baseline.npz from the original stand alone model codes (the first commit of this
+# series), e.g. python make_baseline.py <their Jupiter/Python directory> baseline.npz
+import sys
+import os
+import glob
+import importlib
+import numpy as np
+sys.path.insert(0, sys.argv[1])
+rng = np.random.default_rng(0)
+r     = np.concatenate([rng.uniform(1.0, 30.0, 40), [1.0, 2.0, 5.9, 10.0, 1.5, 3.0, 1.2, 20.0]])
+colat = np.concatenate([np.arccos(rng.uniform(-1.0, 1.0, 40)), [1e-8, 1e-5, 1e-3, 0.01, np.pi-1e-8, np.pi-1e-5, np.pi-1e-3, np.pi-0.01]])
+elong = np.concatenate([rng.uniform(0.0, 2*np.pi, 40), [0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 2*np.pi]])
+x = r*np.sin(colat)*np.cos(elong)
+y = r*np.sin(colat)*np.sin(elong)
+z = r*np.cos(colat)
+data = {'r': r, 'colat': colat, 'elong': elong, 'x': x, 'y': y, 'z': z}
+for f in sorted(glob.glob(os.path.join(sys.argv[1], 'jovian_*_internal_*.py'))):
+    name = os.path.basename(f)[:-3]
+    function = getattr(importlib.import_module(name), name)
+    p = (r, colat, elong) if name.endswith('rtp') else (x, y, z)
+    data[name + '_array']  = function(*p)
+    data[name + '_list']   = function(*[q[:6].tolist() for q in p])
+    data[name + '_scalar'] = np.array([function(*[float(q[i]) for q in p]) for i in range(len(r))])
+np.savez_compressed(sys.argv[2], **data)
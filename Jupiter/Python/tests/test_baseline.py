@@ -0,0 +1,64 @@
+import glob
+import importlib
+import os
+import numpy as np
+import pytest
+import psh
+
+# Compares every jovian_* code with the outputs of the original (stand alone) codes, stored in
+# data/baseline.npz (written by data/make_baseline.py), at random positions from 1 to 30 Rj and at
+# positions near the poles, for array, list and scalar inputs. The rtp codes, and the xyz codes for
+# scalar inputs, give the same results to the last bit. The xyz codes for vector inputs use the
+# Cartesian recursion (psh/cartesian.py), so agree to within rounding errors, apart from close to the
+# z axis, where the original code loses accuracy (~1e-16/colatitude, from arccos(z/r)).
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = np.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'baseline.npz'))
+CODES = sorted(os.path.basename(name)[:-3] for name in glob.glob(os.path.join(CODE_DIR, 'jovian_*_internal_*.py')))
+N_LIST = 6  # number of positions given as lists
+
+
+@pytest.fixture(params=['numpy', 'numba', 'auto'])
+def any_backend(request):
+    if (request.param == 'numba'):
+        pytest.importorskip('numba')
+    psh.set_backend(request.param)
+    yield request.param
+    psh.set_backend('auto')
+
+
+def _outputs(name):
+    # B from the code name for the baseline positions, as an array, as lists, and one position at a time
+    function = getattr(importlib.import_module(name), name)
+    if name.endswith('rtp'):
+        positions = [BASELINE[key] for key in ('r', 'colat', 'elong')]
+    else:
+        positions = [BASELINE[key] for key in ('x', 'y', 'z')]
+    return {'array':  function(*positions),
+            'list':   function(*[position[:N_LIST].tolist() for position in positions]),
+            'scalar': np.array([function(*[float(position[i]) for position in positions])
+                                for i in range(positions[0].size)])}
+
+
+def test_every_code_has_a_baseline():
+    assert len(CODES) == 16
+    for name in CODES:
+        assert name + '_array' in BASELINE.files
+
+
+@pytest.mark.parametrize('name', CODES)
+def test_baseline(any_backend, name):
+    outputs = _outputs(name)
+    for kind in ('array', 'list', 'scalar'):
+        B, B_baseline = outputs[kind], BASELINE[name + '_' + kind]
+        assert B.shape == B_baseline.shape
+        if name.endswith('rtp') or ((kind == 'scalar') and (any_backend != 'auto')):
+            np.testing.assert_array_equal(B, B_baseline)
+            continue
+        # xyz: the Cartesian recursion for vectors, and the scalar code (internal_xyz_scalar) for a
+        # scalar with the 'auto' backend, both to within rounding errors
+        rho = np.hypot(BASELINE['x'], BASELINE['y'])/np.hypot(np.hypot(BASELINE['x'], BASELINE['y']), BASELINE['z'])
+        if (kind == 'list'):
+            rho = rho[:N_LIST]
+        error = np.max(np.abs(np.reshape(B - B_baseline, (-1,3))), axis=1) \
+              / np.linalg.norm(np.reshape(B_baseline, (-1,3)), axis=1)
+        assert np.all(error < 1e-14 + 1e-15/rho)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+import psh
+from psh import engine
+from jovian_jrm33_order18_internal_rtp import jovian_jrm33_order18_internal_rtp
+from jovian_jrm33_order18_internal_xyz import jovian_jrm33_order18_internal_xyz
+from jovian_vip4_order04_internal_rtp import jovian_vip4_order04_internal_rtp
+from jovian_vip4_order04_internal_xyz import jovian_vip4_order04_internal_xyz
+
+CHUNK = 1000
+
+
+@pytest.fixture
+def chunking():
+    # Goes back to the default chunks and summation after a test
+    yield
+    psh.set_chunking()
+    psh.set_summation('recursion')
+
+
+def _positions(N):
+    # Positions with some on and near the poles
+    rng = np.random.default_rng(20)
+    r = rng.uniform(1.0, 10.0, N)
+    colat = np.arccos(rng.uniform(-1.0, 1.0, N))
+    elong = rng.uniform(0.0, 2*np.pi, N)
+    colat[:4] = [0.0, np.pi, 1e-7, np.pi - 1e-7]
+    return (r, colat, elong), (r*np.sin(colat)*np.cos(elong), r*np.sin(colat)*np.sin(elong), r*np.cos(colat))
+
+
+@pytest.mark.parametrize('N', [CHUNK-1, CHUNK, CHUNK+1, CHUNK+2, 5*CHUNK+3])
+def test_chunks_match(backend, chunking, N):
+    # The same B as one call without chunks (and with jacobian=True, B and J to within rounding errors,
+    # see set_chunking)
+    rtp, xyz = _positions(N)
+    for function, positions in ((jovian_jrm33_order18_internal_rtp, rtp), (jovian_jrm33_order18_internal_xyz, xyz)):
+        results = []
+        for chunk_size in (None, CHUNK):
+            psh.set_chunking(chunk_size)
+            results.append((function(*positions), function(*positions, jacobian=True)))
+        (B, (B_J, J)), (B_chunks, (B_J_chunks, J_chunks)) = results
+        np.testing.assert_array_equal(B_chunks, B)
+        for A_chunks, A in ((B_J_chunks, B_J), (J_chunks, J)):
+            error = np.linalg.norm((A_chunks - A).reshape((N,-1)), axis=1)
+            assert np.all(error <= 1e-14*np.linalg.norm(A.reshape((N,-1)), axis=1))
+
+
+def test_max_bytes(chunking, monkeypatch):
+    # The arrays in use for each chunk (the Workspace of the chunks, and any other made while one is run)
+    # fit in max_bytes, for each summation, with and without the Jacobian, for a low and a high order model
+    made = []
+
+    class CountedWorkspace(psh.Workspace):
+        def __init__(self, n, order):
+            made.append(self)
+            psh.Workspace.__init__(self, n, order)
+    monkeypatch.setattr(engine, 'Workspace', CountedWorkspace)
+    psh.set_backend('numpy')
+    try:
+        rtp, xyz = _positions(5000)
+        for max_bytes in (64*1024, 256*1024):
+            psh.set_chunking(None, max_bytes)
+            for summation in ('recursion', 'matrix'):
+                psh.set_summation(summation)
+                for function, positions in ((jovian_jrm33_order18_internal_rtp, rtp), (jovian_jrm33_order18_internal_xyz, xyz),
+                                            (jovian_vip4_order04_internal_rtp, rtp), (jovian_vip4_order04_internal_xyz, xyz)):
+                    for jacobian in (False, True):
+                        made.clear()
+                        function(*positions, jacobian=jacobian)
+                        sizes = [sum(array.nbytes for array in workspace._buffers.values()) for workspace in made]
+                        assert (len(sizes) > 0) and (sizes[0] + max(sizes[1:], default=0) <= max_bytes)
+    finally:
+        psh.set_backend('auto')
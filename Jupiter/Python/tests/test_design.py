@@ -0,0 +1,26 @@
+import numpy as np
+import psh
+
+
+def _positions(N):
+    rng = np.random.default_rng(13)
+    r = rng.uniform(1.0, 10.0, N)
+    colat = rng.uniform(0.0, np.pi, N)
+    elong = rng.uniform(0.0, 2*np.pi, N)
+    return r, colat, elong
+
+
+def test_design_matrix_times_coefficients():
+    # The design matrix times a model's coefficients is the model's B, including a model with another 1 Rj
+    r, colat, elong = _positions(300)
+    x, y, z = r*np.sin(colat)*np.cos(elong), r*np.sin(colat)*np.sin(elong), r*np.cos(colat)
+    for name, order in (('jrm33', 13), ('vip4', 4)):
+        model = psh.get_model(name, order=order)
+        c = model.coefficients()
+        np.testing.assert_allclose(psh.design_coefficients(model.g, model.h, order), c, rtol=1e-15, atol=0)
+        for design_matrix, internal, positions in ((psh.design_matrix_xyz, model.internal_xyz, (x, y, z)),
+                                                   (psh.design_matrix_rtp, model.internal_rtp, (r, colat, elong))):
+            B = internal(*positions)
+            B_design = design_matrix(*positions, order, r_ref_km=model.r_ref_km) @ c
+            error = np.linalg.norm(B_design - B, axis=1)
+            assert np.all(error <= 1e-13*np.linalg.norm(B, axis=1)), name
@@ -0,0 +1,42 @@
+import os
+import numpy as np
+import psh
+from psh import engine
+
+
+def test_calibrate_round_trip(tmp_path, monkeypatch):
+    # calibrate writes its bands to file_name, which reads back the same, and the 'auto' backend uses them
+    monkeypatch.setattr(engine, '_DISPATCH_FILE', str(tmp_path / 'default.txt'))
+    monkeypatch.setattr(engine, '_DISPATCH', None)
+    file_name = str(tmp_path / 'psh' / 'dispatch.txt')
+    result = psh.calibrate(file_name=file_name)
+    dispatch = {'bands': result['bands'], 'workers': result['workers']}
+    assert os.path.exists(file_name) and not os.path.exists(engine._DISPATCH_FILE)
+    assert (engine._read_dispatch_file(file_name, {'bands': [], 'workers': 0}) == dispatch)
+    assert (engine._DISPATCH == dispatch)
+    n_before = 0
+    for n_max, backend in result['bands']:
+        if (n_max > engine._chunk_size(False, 13) + 1):
+            break
+        for n_positions in (n_before + 1, n_max):
+            assert (psh.get_backend(n_positions) == backend)
+        n_before = n_max
+
+    # and a later session (with no bands read yet) reads them from the file
+    engine._write_dispatch_file({'bands': [(4, 'scalar'), (1000, 'numpy')], 'workers': 3}, engine._DISPATCH_FILE)
+    monkeypatch.setattr(engine, '_DISPATCH', None)
+    assert (engine._dispatch_bands() == {'bands': [(4, 'scalar'), (1000, 'numpy')], 'workers': 3})
+    assert (psh.get_backend(4) == 'scalar') and (psh.get_backend(5) == 'numpy')
+
+
+def test_numba_band_without_numba(tmp_path, monkeypatch):
+    # Bands for Numba (e.g. from calibrate on a machine with Numba) use numpy if Numba is not installed
+    file_name = str(tmp_path / 'dispatch.txt')
+    engine._write_dispatch_file({'bands': [(1, 'scalar'), (64, 'numba'), (4096, 'numpy')], 'workers': 2}, file_name)
+    monkeypatch.setattr(engine, '_NUMBA_KERNELS', False)  # as if the import of Numba failed
+    monkeypatch.setattr(engine, '_DISPATCH_FILE', file_name)
+    monkeypatch.setattr(engine, '_DISPATCH', None)
+    assert (engine._dispatch_bands()['bands'] == [(1, 'scalar'), (64, 'numpy'), (4096, 'numpy')])
+    assert (psh.get_backend(32) == 'numpy')
+    B = psh.get_model('jrm33', order=13).internal_xyz(np.full(32, 5.0), np.zeros(32), np.ones(32))
+    assert (B.shape == (32, 3))
@@ -0,0 +1,37 @@
+import os
+import importlib.util
+import numpy as np
+import psh
+import jovian_jrm33_order13_internal_xyz as jrm33
+import jovian_vip4_order04_internal_xyz as vip4
+
+# expand_out_g_and_h of the generator, to make each coefficient set in to the g, h and rec of a model code
+_spec = importlib.util.spec_from_file_location('reordergh', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                               '..', '..', '..', 'Mother_Source', 'reordergh.py'))
+reordergh = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(reordergh)
+
+
+def test_ensemble_matches_each_set():
+    # K perturbed coefficient sets in one call give each set's own B, including a model with another 1 Rj
+    rng = np.random.default_rng(14)
+    N = 300
+    r = rng.uniform(1.0, 10.0, N)
+    colat = rng.uniform(0.0, np.pi, N)
+    elong = rng.uniform(0.0, 2*np.pi, N)
+    x, y, z = r*np.sin(colat)*np.cos(elong), r*np.sin(colat)*np.sin(elong), r*np.cos(colat)
+    for code, order in ((jrm33, 13), (vip4, 4)):
+        c = psh.design_coefficients(code.g, code.h, order)
+        coeffs = c*(1.0 + 0.01*rng.standard_normal((4, c.size)))  # K = 4 sets
+        B_xyz = psh.internal_xyz_ensemble(x, y, z, coeffs, r_ref_km=code.r_ref_km)
+        B_rtp = psh.internal_rtp_ensemble(r, colat, elong, coeffs, r_ref_km=code.r_ref_km)
+        assert (B_xyz.shape == (4, N, 3)) and (B_rtp.shape == (4, N, 3))
+        L = c.size//2
+        for k in range(4):
+            g, h, rec = reordergh.expand_out_g_and_h(order, order, np.append(0.0, coeffs[k,:L]),
+                                                     np.append(0.0, coeffs[k,L:]))
+            for B_ensemble, internal, positions in ((B_xyz[k], psh.internal_xyz, (x, y, z)),
+                                                    (B_rtp[k], psh.internal_rtp, (r, colat, elong))):
+                B = internal(*positions, g, h, rec, code.r_ref_km)
+                error = np.linalg.norm(B_ensemble - B, axis=1)
+                assert np.all(error <= 1e-13*np.linalg.norm(B, axis=1)), order
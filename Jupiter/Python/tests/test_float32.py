@@ -0,0 +1,64 @@
+import glob
+import importlib
+import os
+import numpy as np
+import pytest
+import psh
+
+# Bound on the difference of dtype='float32' from float64, relative to |B|, at 1 to 1.5 Rj, as in the
+# table in README.md (keep the two the same)
+ERROR_BOUNDS = {'isaac_order10': 2.0e-6,
+                'jrm09_order10': 2.0e-6,
+                'jrm33_order13': 2.5e-6,
+                'jrm33_order18': 3.0e-6,
+                'jrm33_order30': 4.0e-6,
+                'o6_order03':    1.2e-6,
+                'vip4_order04':  1.5e-6,
+                'vipal_order05': 1.5e-6,
+                'vit4_order04':  1.5e-6}
+CODE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODES = sorted(os.path.basename(name)[7:-16] for name in glob.glob(os.path.join(CODE_DIR, 'jovian_*_internal_xyz.py')))
+
+
+def _positions():
+    # The README positions: 20000 random positions at 1 to 1.5 Rj
+    rng = np.random.default_rng(2)
+    N = 20000
+    r     = rng.uniform(1.0, 1.5, N)
+    colat = np.arccos(rng.uniform(-1.0, 1.0, N))
+    elong = rng.uniform(0.0, 2*np.pi, N)
+    x = r*np.sin(colat)*np.cos(elong)
+    y = r*np.sin(colat)*np.sin(elong)
+    z = r*np.cos(colat)
+    return (x, y, z), (r, colat, elong)
+
+
+def _max_error(functions):
+    positions = _positions()
+    error = 0.0
+    for function, position in zip(functions, positions):
+        B64 = function(*position)
+        B32 = function(*[p.astype('float32') for p in position], dtype='float32')
+        assert (B32.dtype == np.float32) and (B32.shape == B64.shape)
+        error = max(error, np.max(np.linalg.norm(B32 - B64, axis=1)/np.linalg.norm(B64, axis=1)))
+    return error
+
+
+def test_every_model_has_a_bound():
+    for name in psh.available_models():
+        assert '%s_order%02d'%(name, psh.get_model(name).order) in ERROR_BOUNDS
+    for code in CODES:
+        assert code in ERROR_BOUNDS
+
+
+@pytest.mark.parametrize('name', psh.available_models())
+def test_float32_models(backend, name):
+    model = psh.get_model(name)
+    assert _max_error((model.internal_xyz, model.internal_rtp)) <= ERROR_BOUNDS['%s_order%02d'%(name, model.order)]
+
+
+@pytest.mark.parametrize('code', CODES)
+def test_float32_codes(backend, code):
+    functions = [getattr(importlib.import_module('jovian_%s_internal_%s'%(code, coord)),
+                         'jovian_%s_internal_%s'%(code, coord)) for coord in ('xyz', 'rtp')]
+    assert _max_error(functions) <= ERROR_BOUNDS[code]
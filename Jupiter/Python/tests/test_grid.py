@@ -0,0 +1,38 @@
+import numpy as np
+from jovian_jrm33_order18_internal_rtp import (jovian_jrm33_order18_internal_rtp, jovian_jrm33_order18_internal_rtp_grid,
+                                               jovian_jrm33_order18_internal_rtp_shell)
+from jovian_vip4_order04_internal_rtp import (jovian_vip4_order04_internal_rtp, jovian_vip4_order04_internal_rtp_grid,
+                                              jovian_vip4_order04_internal_rtp_shell)
+
+# (internal_rtp, internal_rtp_grid, internal_rtp_shell) of JRM33 order 18, and VIP4 (which has another 1 Rj)
+CODES = [(jovian_jrm33_order18_internal_rtp, jovian_jrm33_order18_internal_rtp_grid, jovian_jrm33_order18_internal_rtp_shell),
+         (jovian_vip4_order04_internal_rtp, jovian_vip4_order04_internal_rtp_grid, jovian_vip4_order04_internal_rtp_shell)]
+
+
+def _compare(B_grid, r, colat, elong, internal_rtp):
+    # B_grid (N_r x N_colat x N_elong x 3) against internal_rtp on the flattened grid, to within rounding
+    # errors relative to |B| (the sums are done in another order)
+    r_all, colat_all, elong_all = [np.ravel(values) for values in np.meshgrid(r, colat, elong, indexing='ij')]
+    B = internal_rtp(r_all, colat_all, elong_all)
+    assert (B_grid.shape == (np.size(r), np.size(colat), np.size(elong), 3))
+    error = np.linalg.norm(B_grid.reshape((-1,3)) - B, axis=1)
+    assert np.all(error <= 1e-13*np.linalg.norm(B, axis=1))
+
+
+def test_grid():
+    # r x colatitude x longitude grids, with scalar and size 1 axes
+    colat = np.radians(np.arange(0, 181, 15))  # including the poles
+    elong = np.radians(np.arange(0, 360, 20))
+    for internal_rtp, internal_rtp_grid, internal_rtp_shell in CODES:
+        for r, colat_grid, elong_grid in (([1.0, 2.5, 5.9], colat, elong), (1.5, colat, elong), ([1.5], colat, 0.3),
+                                          ([1.0, 3.0], [0.7], elong), (2.0, 0.4, 1.1)):
+            _compare(internal_rtp_grid(r, colat_grid, elong_grid), r, colat_grid, elong_grid, internal_rtp)
+
+
+def test_shell():
+    # Whole rings of 1, 7 and 360 longitudes
+    colat = np.radians(np.arange(0, 181, 5))  # including the poles
+    for internal_rtp, internal_rtp_grid, internal_rtp_shell in CODES:
+        for N_elong in (1, 7, 360):
+            elong = 2*np.pi*np.arange(N_elong)/N_elong
+            _compare(internal_rtp_shell([1.0, 5.9], colat, N_elong), [1.0, 5.9], colat, elong, internal_rtp)
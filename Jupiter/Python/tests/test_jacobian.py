@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from jovian_jrm33_order13_internal_rtp import jovian_jrm33_order13_internal_rtp
+from jovian_jrm33_order13_internal_xyz import jovian_jrm33_order13_internal_xyz
+from jovian_vip4_order04_internal_rtp import jovian_vip4_order04_internal_rtp
+from jovian_vip4_order04_internal_xyz import jovian_vip4_order04_internal_xyz
+from jovian_o6_order03_internal_rtp import jovian_o6_order03_internal_rtp
+from jovian_o6_order03_internal_xyz import jovian_o6_order03_internal_xyz
+
+MODELS = {'jrm33': (jovian_jrm33_order13_internal_xyz, jovian_jrm33_order13_internal_rtp),
+          'vip4':  (jovian_vip4_order04_internal_xyz,  jovian_vip4_order04_internal_rtp),
+          'o6':    (jovian_o6_order03_internal_xyz,    jovian_o6_order03_internal_rtp)}
+STEP = 1e-4  # Rj, for the central differences
+
+
+def _positions():
+    # Random positions from 1.2 to 6 Rj, not on the z axis
+    rng = np.random.default_rng(3)
+    x, y, z = rng.uniform(-6.0, 6.0, (3,400))
+    r = np.sqrt(x*x + y*y + z*z)
+    keep = (r > 1.2) & (r < 6.0) & (np.hypot(x, y) > 0.05)
+    return x[keep], y[keep], z[keep]
+
+
+def _central_differences(function_xyz, x, y, z):
+    # J[i,j,k] = dB_j/dx_k from central differences of B
+    J = np.empty((x.size,3,3))
+    for k, (dx, dy, dz) in enumerate(np.eye(3)*STEP):
+        J[:,:,k] = (function_xyz(x+dx, y+dy, z+dz) - function_xyz(x-dx, y-dy, z-dz))/(2*STEP)
+    return J
+
+
+@pytest.mark.parametrize('name', sorted(MODELS))
+def test_xyz_jacobian(backend, name):
+    function_xyz = MODELS[name][0]
+    x, y, z = _positions()
+    B, J = function_xyz(x, y, z, jacobian=True)
+    scale = np.max(np.abs(J))
+    np.testing.assert_allclose(B, function_xyz(x, y, z), rtol=0, atol=1e-12*np.max(np.abs(B)))
+    assert np.max(np.abs(J - _central_differences(function_xyz, x, y, z))) < 1e-6*scale
+    # B is the gradient of a potential, with no sources: J is symmetric and has no trace
+    assert np.max(np.abs(J - np.transpose(J, (0,2,1)))) < 1e-12*scale
+    assert np.max(np.abs(np.trace(J, axis1=1, axis2=2))) < 1e-12*scale
+
+
+@pytest.mark.parametrize('name', sorted(MODELS))
+def test_rtp_jacobian(backend, name):
+    # The rtp J is the Cartesian J in the local r, theta, phi unit vectors: R J_xyz R^T, with the unit
+    # vectors as the rows of R
+    function_xyz, function_rtp = MODELS[name]
+    x, y, z = _positions()
+    r = np.sqrt(x*x + y*y + z*z)
+    colat = np.arccos(z/r)
+    elong = np.mod(np.arctan2(y, x), 2*np.pi)
+    B, J = function_rtp(r, colat, elong, jacobian=True)
+    np.testing.assert_allclose(B, function_rtp(r, colat, elong), rtol=0, atol=1e-12*np.max(np.abs(B)))
+
+    st, ct, sp, cp = np.sin(colat), np.cos(colat), np.sin(elong), np.cos(elong)
+    R = np.empty((x.size,3,3))
+    R[:,0,:] = np.transpose([st*cp, st*sp,  ct])
+    R[:,1,:] = np.transpose([ct*cp, ct*sp, -st])
+    R[:,2,:] = np.transpose([  -sp,    cp, 0*st])
+    J_cd = R @ _central_differences(function_xyz, x, y, z) @ np.transpose(R, (0,2,1))
+    scale = np.max(np.abs(J))
+    assert np.max(np.abs(J - J_cd)) < 1e-6*scale
+    assert np.max(np.abs(J - np.transpose(J, (0,2,1)))) < 1e-12*scale
+    assert np.max(np.abs(np.trace(J, axis1=1, axis2=2))) < 1e-12*scale
@@ -0,0 +1,63 @@
+import numpy as np
+import psh
+from psh import engine
+from jovian_jrm33_order13_internal_rtp import jovian_jrm33_order13_internal_rtp
+from jovian_jrm33_order13_internal_xyz import jovian_jrm33_order13_internal_xyz
+
+
+def _positions(N):
+    rng = np.random.default_rng(25)
+    r = rng.uniform(1.0, 10.0, N)
+    colat = rng.uniform(0.0, np.pi, N)
+    elong = rng.uniform(0.0, 2*np.pi, N)
+    return (r, colat, elong), (r*np.sin(colat)*np.cos(elong), r*np.sin(colat)*np.sin(elong), r*np.cos(colat))
+
+
+def test_positions_array(backend):
+    # One n x 3 array of positions gives the same as its three columns, which are used in place
+    for N in (1, 2, 500):
+        for function, positions in zip((jovian_jrm33_order13_internal_rtp, jovian_jrm33_order13_internal_xyz),
+                                       _positions(N)):
+            positions_array = np.column_stack(positions)
+            B = function(*positions)
+            np.testing.assert_array_equal(function(positions_array), B)
+            np.testing.assert_array_equal(function(positions_array.tolist()), B)
+            B_J, J = function(*positions, jacobian=True)
+            B_J_array, J_array = function(positions_array, jacobian=True)
+            np.testing.assert_array_equal(B_J_array, B_J)
+            np.testing.assert_array_equal(J_array, J)
+            for column, position in zip(engine._position_columns(positions_array, np.float64), positions):
+                assert np.shares_memory(column, positions_array)
+                np.testing.assert_array_equal(column, position)
+
+
+def test_layouts(backend):
+    # 'columns' (the default) is n x 3 with each component contiguous, 'rows' n x 3 C-contiguous, and
+    # 'separate' 3 contiguous 1D arrays, all the same values, each written in to out (if given) directly
+    N = 500
+    for function, positions in zip((jovian_jrm33_order13_internal_rtp, jovian_jrm33_order13_internal_xyz),
+                                   _positions(N)):
+        B = function(*positions)
+        assert (B.shape == (N, 3)) and B.flags['F_CONTIGUOUS']
+        assert np.all([B[:,i].flags['C_CONTIGUOUS'] for i in range(3)])
+        np.testing.assert_array_equal(function(*positions, layout='columns'), B)
+
+        B_rows = function(*positions, layout='rows')
+        assert (B_rows.shape == (N, 3)) and B_rows.flags['C_CONTIGUOUS']
+        np.testing.assert_array_equal(B_rows, B)
+        out = np.empty((N, 3))
+        assert (function(*positions, out=out, layout='rows') is out)
+        np.testing.assert_array_equal(out, B)
+
+        B_separate = function(*positions, layout='separate')
+        assert isinstance(B_separate, tuple) and (len(B_separate) == 3)
+        for i in range(3):
+            assert (B_separate[i].shape == (N,)) and B_separate[i].flags['C_CONTIGUOUS']
+            np.testing.assert_array_equal(B_separate[i], B[:,i])
+        out = np.empty((3, N))
+        B_separate = function(*positions, out=out, layout='separate')
+        for i in range(3):
+            assert np.shares_memory(B_separate[i], out[i])
+            np.testing.assert_array_equal(out[i], B[:,i])
+        (Bx, By, Bz), J = function(np.column_stack(positions), layout='separate', jacobian=True)
+        np.testing.assert_array_equal(np.column_stack((Bx, By, Bz)), function(*positions, jacobian=True)[0])
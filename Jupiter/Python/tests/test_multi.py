@@ -0,0 +1,34 @@
+import importlib
+import numpy as np
+import psh
+
+CODES = ['jovian_isaac_order10', 'jovian_jrm09_order10', 'jovian_jrm33_order13', 'jovian_jrm33_order18',
+         'jovian_o6_order03', 'jovian_vip4_order04', 'jovian_vipal_order05', 'jovian_vit4_order04']
+R_REF_KM = {'jovian_o6_order03': 71372, 'jovian_vip4_order04': 71323, 'jovian_vit4_order04': 71323}
+
+
+def _positions(N):
+    rng = np.random.default_rng(12)
+    r = rng.uniform(1.0, 10.0, N)
+    colat = rng.uniform(0.0, np.pi, N)
+    elong = rng.uniform(0.0, 2*np.pi, N)
+    return r, colat, elong
+
+
+def test_multi_matches_each_code():
+    # Each model's slice of the multi output is its own code's B, including the models with another 1 Rj
+    for coord in ('xyz', 'rtp'):
+        codes = [importlib.import_module('%s_internal_%s'%(code,coord)) for code in CODES]
+        assert [code.r_ref_km for code in codes] == [R_REF_KM.get(code, 71492) for code in CODES]
+        r, colat, elong = _positions(500)
+        if (coord == 'xyz'):
+            positions = (r*np.sin(colat)*np.cos(elong), r*np.sin(colat)*np.sin(elong), r*np.cos(colat))
+            B = psh.internal_xyz_multi(*positions, codes)
+        else:
+            positions = (r, colat, elong)
+            B = psh.internal_rtp_multi(*positions, codes)
+        assert (B.shape == (len(CODES), 500, 3))
+        for B_model, code, name in zip(B, codes, CODES):
+            B_code = getattr(code, '%s_internal_%s'%(name,coord))(*positions)
+            error = np.linalg.norm(B_model - B_code, axis=1)/np.linalg.norm(B_code, axis=1)
+            assert (error.max() < 1e-13), name
@@ -0,0 +1,95 @@
+import math
+from decimal import Decimal, localcontext
+import numpy as np
+import psh
+
+# internal_rtp_normalised agrees with the other codes to within 1e-14 |B| at each position (see engine.py)
+TOLERANCE = 1e-14
+_REFERENCES = {}  # B from _reference_rtp for each position of test_high_degree, found once for both backends
+
+
+def test_matches_internal_rtp(backend):
+    # JRM33 order 18 from 1 to 3 Rj, away from the poles (where internal_rtp approximates Bphi)
+    model = psh.get_model('jrm33', order=18)
+    rng = np.random.default_rng(17)
+    N = 20000
+    r = rng.uniform(1.0, 3.0, N)
+    colat = np.arccos(rng.uniform(-1.0, 1.0, N))
+    elong = rng.uniform(0.0, 2*np.pi, N)
+    colat = np.where(np.sin(colat) < 1e-4, 0.5, colat)
+    B = model.internal_rtp(r, colat, elong)
+    B_normalised = psh.internal_rtp_normalised(r, colat, elong, model.g_original, model.h_original, model.r_ref_km)
+    error = np.linalg.norm(B_normalised - B, axis=1)
+    assert np.all(error <= TOLERANCE*np.linalg.norm(B, axis=1))
+
+
+def test_high_degree(backend):
+    # A made up degree 120 model (whose modified g and h would be ~1e35), against the sum of the Schmidt
+    # semi-normalised terms found with 150 digit decimals, including positions near the poles
+    degree = 120
+    n = np.concatenate([[k]*(k+1) for k in range(degree+1)])
+    m = np.concatenate([range(k+1) for k in range(degree+1)])
+    rng = np.random.default_rng(5)
+    g = rng.normal(0.0, 1.0, n.size)*1e5/(n + 1.0)**2
+    h = np.where(m > 0, rng.normal(0.0, 1.0, n.size)*1e5/(n + 1.0)**2, 0.0)
+    g[0] = 0.0
+    for r, colat, elong in ((1.05, 0.7, 2.0), (1.5, 1e-3, 4.0), (1.2, np.pi - 0.01, 0.3)):
+        B = psh.internal_rtp_normalised(r, colat, elong, g, h, 71492)[0]
+        if ((r, colat, elong) not in _REFERENCES):
+            _REFERENCES[(r, colat, elong)] = _reference_rtp(r, colat, elong, g, h, degree)
+        B_reference = _REFERENCES[(r, colat, elong)]
+        assert (np.linalg.norm(B - B_reference) <= TOLERANCE*np.linalg.norm(B_reference))
+
+
+def _reference_rtp(r, colat, elong, g, h, degree):
+    # Br, Btheta, Bphi (nT) of the original g and h values up to degree, as the sum of each term of -grad V,
+    # with the Schmidt semi-normalised functions from the derivatives of the Legendre polynomials,
+    #   P(n,m) = sqrt(2 (n-m)!/(n+m)!) sin(colat)^m d^m P(n)/dx^m    (sqrt(...) = 1 for m = 0)
+    # all with 150 digit decimals, for positions in Rj of 71492 km.
+    with localcontext() as context:
+        context.prec = 150
+        cos_t, sin_t = _cos_sin(Decimal(colat))
+        cos_p, sin_p = _cos_sin(Decimal(elong))
+        cos_mp, sin_mp = [Decimal(1)], [Decimal(0)]
+        for k in range(degree):
+            cos_mp.append(cos_mp[k]*cos_p - sin_mp[k]*sin_p)
+            sin_mp.append(sin_mp[k]*cos_p + cos_mp[k]*sin_p)
+        cos_t_k = [cos_t**k for k in range(degree+1)]
+        sin_t_k = [sin_t**k for k in range(degree+2)]
+        r = Decimal(r)
+        B = [Decimal(0)]*3
+        for n in range(1, degree+1):
+            # coefficients of x^k in P(n), then its derivatives d^m P(n)/dx^m at x = cos(colat)
+            coefficients = [(n - 2*k, Decimal((-1)**k*math.comb(n,k)*math.comb(2*n-2*k,n))/Decimal(2**n))
+                            for k in range(n//2+1)]
+            D = [sum((c*math.perm(k, m)*cos_t_k[k-m] for k, c in coefficients if (k >= m)), Decimal(0))
+                 for m in range(n+2)]
+            r_n = r**(-(n+2))
+            for m in range(n+1):
+                mn = n*(n+1)//2 + m
+                norm = (2*Decimal(math.factorial(n-m))/Decimal(math.factorial(n+m))).sqrt() if (m > 0) else Decimal(1)
+                P = norm*sin_t_k[m]*D[m]
+                dP = -norm*sin_t_k[m+1]*D[m+1]  # d/dcolat
+                if (m > 0):
+                    dP += norm*m*sin_t_k[m-1]*cos_t*D[m]
+                gh  = Decimal(g[mn])*cos_mp[m] + Decimal(h[mn])*sin_mp[m]
+                B[0] += (n + 1)*r_n*gh*P
+                B[1] -= r_n*gh*dP
+                if (m > 0):
+                    B[2] += r_n*m*(Decimal(g[mn])*sin_mp[m] - Decimal(h[mn])*cos_mp[m])*P/sin_t
+        return np.array([float(b) for b in B])
+
+
+def _cos_sin(x):
+    # cos and sin of the decimal x (|x| up to ~2 pi) from their series, to the precision of the context
+    k, term, cos_x, sin_x = 0, Decimal(1), Decimal(0), Decimal(0)
+    while True:
+        cos_new = cos_x + term
+        k += 1
+        term = term*x/k
+        sin_new = sin_x + term
+        k += 1
+        term = -term*x/k
+        if (cos_new == cos_x) and (sin_new == sin_x):
+            return cos_x, sin_x
+        cos_x, sin_x = cos_new, sin_new
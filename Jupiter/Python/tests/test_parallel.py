@@ -0,0 +1,71 @@
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+import psh
+from psh import engine, parallel
+
+
+def _positions(N):
+    rng = np.random.default_rng(4)
+    x, y, z = rng.uniform(-6.0, 6.0, (3,N))
+    x += 7.0
+    return x, y, z
+
+
+def test_threads(backend):
+    # Threads are only used with numpy (numba already runs in parallel), the same to the last bit
+    model = psh.get_model('jrm33', order=13)
+    x, y, z = _positions(50000)
+    np.testing.assert_array_equal(psh.parallel_evaluate(model, x, y, z, workers=3), model.internal_xyz(x, y, z))
+
+
+def test_processes(backend):
+    # processes=True runs the blocks in worker processes for both backends, the same to the last bit
+    model = psh.get_model('jrm33', order=13)
+    x, y, z = _positions(50000)
+    pools = len(parallel._PROCESS_POOLS)
+    B = psh.parallel_evaluate(model, x, y, z, workers=2, processes=True)
+    assert (2 in parallel._PROCESS_POOLS) and (len(parallel._PROCESS_POOLS) >= pools)
+    np.testing.assert_array_equal(B, model.internal_xyz(x, y, z))
+    B, J = psh.parallel_evaluate(model, np.column_stack((x, y, z)), workers=2, processes=True, jacobian=True)
+    B_serial, J_serial = model.internal_xyz(x, y, z, jacobian=True)
+    np.testing.assert_array_equal(B, B_serial)
+    np.testing.assert_array_equal(J, J_serial)
+
+
+@pytest.mark.parametrize('N', [20, 40, 100])
+def test_small_inputs(monkeypatch, N):
+    # Blocks smaller than the serial call use the serial call's 'auto' band (here the defaults without
+    # Numba, so blocks of 16 or fewer positions would otherwise use the scalar code), the same to the last bit
+    monkeypatch.setattr(engine, '_DISPATCH', {'bands': [(16, 'scalar'), (17, 'numpy')], 'workers': 8})
+    psh.set_backend('auto')
+    model = psh.get_model('jrm33', order=13)
+    x, y, z = _positions(N)
+    B_serial = model.internal_xyz(x, y, z)
+    np.testing.assert_array_equal(psh.parallel_evaluate(model, x, y, z, workers=8), B_serial)
+    if (N == 40):
+        np.testing.assert_array_equal(psh.parallel_evaluate(model, x, y, z, workers=8, processes=True), B_serial)
+
+
+def test_shared_out_and_pools():
+    # B written straight in to a shared memory block, and the pools kept are capped, and shut down
+    model = psh.get_model('jrm33', order=13)
+    x, y, z = _positions(50000)
+    block = shared_memory.SharedMemory(create=True, size=24*50000)
+    try:
+        B = psh.parallel_evaluate(model, x, y, z, workers=2, out=block, processes=True)
+        assert np.shares_memory(B, np.ndarray((50000,3), buffer=block.buf))
+        np.testing.assert_array_equal(B, model.internal_xyz(x, y, z))
+        del B
+    finally:
+        block.close()
+        block.unlink()
+    for workers in (2, 3, 4):
+        psh.parallel_evaluate(model, x[:100], y[:100], z[:100], workers=workers, processes=True)
+        assert (len(parallel._PROCESS_POOLS) <= parallel._MAX_POOLS) and (workers in parallel._PROCESS_POOLS)
+    pools = list(parallel._PROCESS_POOLS.values())
+    psh.shutdown_pools()
+    assert (parallel._PROCESS_POOLS == {})
+    for pool in pools:
+        with pytest.raises(RuntimeError):  # cannot schedule new futures after shutdown
+            pool.submit(int)
@@ -0,0 +1,38 @@
+import importlib
+import numpy as np
+import psh
+from psh import engine
+
+CODES = ['jovian_isaac_order10', 'jovian_jrm09_order10', 'jovian_jrm33_order13', 'jovian_jrm33_order18',
+         'jovian_o6_order03', 'jovian_vip4_order04', 'jovian_vipal_order05', 'jovian_vit4_order04']
+TOLERANCE = 1e-13  # relative to |B|
+
+
+def _positions(N):
+    rng = np.random.default_rng(3)
+    r = rng.uniform(1.0, 10.0, N)
+    colat = rng.uniform(0.0, np.pi, N)
+    elong = rng.uniform(0.0, 2*np.pi, N)
+    return {'rtp': (r, colat, elong),
+            'xyz': (r*np.sin(colat)*np.cos(elong), r*np.sin(colat)*np.sin(elong), r*np.cos(colat))}
+
+
+def test_scalar_matches_vector(backend):
+    # The scalar functions, called directly and through each model's generated wrapper, give the vector
+    # path's B at every position, for each model (so including those with another 1 Rj)
+    N = 50
+    positions = _positions(N)
+    for coord in ('rtp', 'xyz'):
+        internal_scalar = getattr(engine, 'internal_%s_scalar'%coord)
+        for name in CODES:
+            code = importlib.import_module('%s_internal_%s'%(name,coord))
+            B = getattr(code, '%s_internal_%s'%(name,coord))(*positions[coord])
+            wrapper = getattr(code, '%s_internal_%s_scalar'%(name,coord))
+            for i in range(N):
+                position = [float(value[i]) for value in positions[coord]]
+                B_scalar = wrapper(*position)
+                assert isinstance(B_scalar, tuple) and all(type(value) is float for value in B_scalar)
+                assert (internal_scalar(*position, code.g_list, code.h_list, code.rec_list, code.r_ref_km)
+                        == B_scalar)
+                error = np.linalg.norm(np.array(B_scalar) - B[i])/np.linalg.norm(B[i])
+                assert (error < TOLERANCE), (name, coord, i)
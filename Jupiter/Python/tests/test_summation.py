@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+import psh
+from jovian_jrm33_order18_internal_rtp import jovian_jrm33_order18_internal_rtp
+from jovian_jrm33_order18_internal_xyz import jovian_jrm33_order18_internal_xyz
+
+
+@pytest.fixture
+def matrix():
+    # Runs a test with the numpy code (which set_summation is for), then goes back to the defaults
+    psh.set_backend('numpy')
+    yield
+    psh.set_summation('recursion')
+    psh.set_backend('auto')
+
+
+def test_matrix_summation(matrix):
+    # 'matrix' agrees with 'recursion' to within 1e-14 |B| at each position for B of the rtp code (including
+    # positions at and near the poles); the xyz code and the Jacobian do not use it, so are the same
+    rng = np.random.default_rng(18)
+    N = 20000
+    r = rng.uniform(1.0, 10.0, N)
+    colat = np.arccos(rng.uniform(-1.0, 1.0, N))
+    elong = rng.uniform(0.0, 2*np.pi, N)
+    colat[:4] = [0.0, np.pi, 1e-7, np.pi - 1e-7]
+    x, y, z = r*np.sin(colat)*np.cos(elong), r*np.sin(colat)*np.sin(elong), r*np.cos(colat)
+    results = {}
+    for summation in ('recursion', 'matrix'):
+        psh.set_summation(summation)
+        results[summation] = (jovian_jrm33_order18_internal_rtp(r, colat, elong),
+                              jovian_jrm33_order18_internal_rtp(r, colat, elong, jacobian=True),
+                              jovian_jrm33_order18_internal_xyz(x, y, z),
+                              jovian_jrm33_order18_internal_xyz(x, y, z, jacobian=True))
+    B, (B_J, J), B_xyz, (B_xyz_J, J_xyz) = results['recursion']
+    B_matrix, (B_J_matrix, J_matrix), B_xyz_matrix, (B_xyz_J_matrix, J_xyz_matrix) = results['matrix']
+    error = np.linalg.norm(B_matrix - B, axis=1)
+    assert np.all(error <= 1e-14*np.linalg.norm(B, axis=1))
+    for same, same_matrix in ((B_J, B_J_matrix), (J, J_matrix), (B_xyz, B_xyz_matrix),
+                              (B_xyz_J, B_xyz_J_matrix), (J_xyz, J_xyz_matrix)):
+        np.testing.assert_array_equal(same_matrix, same)
@@ -0,0 +1,56 @@
+import numpy as np
+import psh
+from psh import cartesian, engine
+from jovian_jrm33_order18_internal_rtp import jovian_jrm33_order18_internal_rtp
+from jovian_jrm33_order18_internal_xyz import jovian_jrm33_order18_internal_xyz
+
+
+def _cache_sizes():
+    return (len(cartesian._TABLES), len(engine._SCALAR_LISTS), len(engine._MATRIX_TABLES),
+            len(engine._TRUNCATION_BOUNDS))
+
+
+def _calls(r, colat, elong):
+    jovian_jrm33_order18_internal_rtp(r, colat, elong, tol_nT=0.1)
+    jovian_jrm33_order18_internal_rtp(r[0], colat[0], elong[0], tol_nT=0.1)
+    jovian_jrm33_order18_internal_xyz(r, colat, elong, tol_nT=0.1)
+    jovian_jrm33_order18_internal_xyz(r, colat, elong, tol_nT=0.1, jacobian=True)
+
+
+def test_tol_nT_caches_do_not_grow(backend):
+    # Repeated calls with tol_nT reuse the same cut down g, h and rec for each degree, so the tables kept
+    # for each g array are made once, not once per call.
+    rng = np.random.default_rng(1)
+    r     = rng.uniform(1.0, 30.0, 1000)
+    colat = rng.uniform(0.1, 3.0, 1000)
+    elong = rng.uniform(0.0, 6.0, 1000)
+    _calls(r, colat, elong)
+    sizes = _cache_sizes()
+    for i in range(20):
+        _calls(r, colat, elong)
+    assert _cache_sizes() == sizes
+
+
+def test_tol_nT_scalar_caches_do_not_grow():
+    psh.set_backend('scalar')
+    try:
+        for r in np.linspace(1.0, 30.0, 1000):  # makes the tables for each degree used
+            jovian_jrm33_order18_internal_rtp(r, 1.0, 1.0, tol_nT=0.1)
+        sizes = _cache_sizes()
+        for r in np.linspace(1.0, 30.0, 1000):
+            jovian_jrm33_order18_internal_rtp(r, 1.0, 1.0, tol_nT=0.1)
+        assert _cache_sizes() == sizes
+    finally:
+        psh.set_backend('auto')
+
+
+def test_tol_nT_within_bound():
+    rng = np.random.default_rng(2)
+    r     = rng.uniform(1.0, 30.0, 1000)
+    colat = rng.uniform(0.1, 3.0, 1000)
+    elong = rng.uniform(0.0, 6.0, 1000)
+    B_full = jovian_jrm33_order18_internal_rtp(r, colat, elong)
+    B, degree, bound = jovian_jrm33_order18_internal_rtp(r, colat, elong, tol_nT=0.1, return_degree=True)
+    assert np.all(bound <= 0.1)
+    assert np.all(np.linalg.norm(B - B_full, axis=1) <= bound + 1e-9*np.linalg.norm(B_full, axis=1))
+    assert degree.min() < 18
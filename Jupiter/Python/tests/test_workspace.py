@@ -0,0 +1,39 @@
+import numpy as np
+import psh
+from psh import engine
+
+
+def _positions(N, seed):
+    # Positions with some on and near the poles, where the recursion is run separately
+    rng = np.random.default_rng(seed)
+    r = rng.uniform(1.0, 10.0, N)
+    colat = rng.uniform(0.0, np.pi, N)
+    elong = rng.uniform(0.0, 2*np.pi, N)
+    colat[:4] = [0.0, np.pi, 1e-7, np.pi - 1e-7]
+    return r, colat, elong
+
+
+def test_out_and_workspace_reused(backend, monkeypatch):
+    # B is written in to out, and later calls reuse the same Workspace arrays (none are made or replaced),
+    # with no other Workspace made for the polar positions
+    model = psh.get_model('jrm33', order=13)
+    ws = psh.Workspace(300, 13)
+    made = []
+
+    class CountedWorkspace(psh.Workspace):
+        def __init__(self, n, order):
+            made.append(n)
+            psh.Workspace.__init__(self, n, order)
+    monkeypatch.setattr(engine, 'Workspace', CountedWorkspace)
+    out = np.empty((300,3))
+    for seed, N in ((1, 300), (2, 300), (3, 120)):
+        r, colat, elong = _positions(N, seed)
+        B_new = model.internal_rtp(r, colat, elong)
+        made.clear()
+        B = model.internal_rtp(r, colat, elong, out=out[:N], workspace=ws)
+        assert (made == []) and np.shares_memory(B, out)
+        np.testing.assert_array_equal(B, B_new)
+        if (seed == 1):
+            buffers = {name: id(arr) for name, arr in ws._buffers.items()}
+        else:
+            assert {name: id(arr) for name, arr in ws._buffers.items()} == buffers
@@ -1,8 +1,6 @@
 # RJW's Python code to make IDL and Matlab codes... 
 # Use "" for strings in this Python code, but '' for strings in the code I'm writing out
 import numpy as np
-from datetime import datetime, timezone # for today's date
-import pathlib # for full path of this files
 import os
 from reordergh import expand_out_g_and_h # I need this as a separate file
 
@@ -157,6 +155,43 @@ def add_original_g_h(readme,start_txt,x,gh_dp,yIDL,yMatlab,yPython,lineend,stand
     
     return readme
 ##############################################################################
+def write_out_data_file(outfile,model_name,planet,ref,gh_notes,r_ref,gh_dp,g,h):
+    # Write the original g and h values of a model to a data file, for the Python model registry
+    # (Python/psh/models.py). g and h are the arrays above, index n*(n-1)/2 + m for degree n-1 and
+    # order m-1 (i.e. before expand_out_g_and_h).
+    degree = int( round( (np.sqrt(8*(len(g)-1) + 1) - 3)/2 ) )  # len(g) = (degree+1)*(degree+2)/2 + 1
+    lines = [
+"# %s internal field model of %s: original (Schmidt semi-normalised) g and h values, in nT."%(model_name.upper(),planet),
+"# Written by Mother_Source/MOP_spherical.py from the values in that file, read by psh/models.py.",
+"planet:    %s"%planet,
+"reference: %s"%ref,
+"notes:     %s"%gh_notes,
+"r_ref_km:  %d"%r_ref,
+"degree:    %d"%degree,
+"#   n    m  %16s %16s"%('g','h')]
+    for n in range(1, degree+1):
+        for m in range(0, n+1):
+            mn = int( (n+1)*n/2 + m + 1 )
+            lines.append("%5d %4d  %16.*f %16.*f"%(n,m,gh_dp,g[mn],gh_dp,h[mn]))
+    file = open(outfile, "w")
+    file.write("\n".join(lines)+"\n")
+    file.close()
+##############################################################################
+def write_out_reordergh(outfile):
+    # Write a copy of reordergh.py in to the Python psh package (Python/psh/reordergh.py), for
+    # psh/models.py to expand out the g and h values of the data files in the same way as here.
+    file = open("reordergh.py", "r")
+    content = file.read()
+    file.close()
+    lines = [
+"# Copy of Mother_Source/reordergh.py, written by Mother_Source/MOP_spherical.py (edit that file, not this",
+"# one), for psh/models.py to expand out the original g and h values of the data files in psh/data in the",
+"# same way as the model codes.",
+""]
+    file = open(outfile, "w")
+    file.write("\n".join(lines)+"\n"+content.rstrip("\n")+"\n")
+    file.close()
+##############################################################################
 def write_out_g_h_rec(degree, sh_order, g, h, IDLpro, MATLAB, PYTHON, standards, IDL_indent):
 
     g, h, rec = expand_out_g_and_h(degree, sh_order , g, h)
@@ -471,6 +506,16 @@ for model in (models_to_do): # loop for different models?
         #outfile_MATLAB = '%s/python_out/jovian_%s_internal_%s.m'%(  root_output_dir,model,coord)
         #outfile_PYTHON = '%s/python_out/jovian_%s_internal_%s.py'%( root_output_dir,model,coord)
 
+        # Data file of the original g and h values for the Python model registry, one for each model
+        # (e.g. jrm33 for jrm33_order13 and jrm33_order18, written before g and h are expanded out)
+        outfile_data = os.path.join(root_output_dir,planet,'Python','psh','data')
+        if not os.path.exists(outfile_data):
+            os.makedirs(outfile_data) # Create a new directory because it does not exist
+        if (coord == 'rtp'):
+            write_out_data_file(os.path.join(outfile_data,'%s.txt'%model.split('_order')[0]),
+                                model.split('_order')[0],planet,ref,gh_notes,r_ref,gh_dp,g,h)
+            write_out_reordergh(os.path.join(os.path.dirname(outfile_data),'reordergh.py'))
+
         # Make relative paths for system             planet
         outfile_IDLpro = os.path.join(root_output_dir,planet,'IDL'   )
         outfile_MATLAB = os.path.join(root_output_dir,planet,'MATLAB')
@@ -490,17 +535,16 @@ for model in (models_to_do): # loop for different models?
         IDLpro = ([])
         MATLAB = ([])
         PYTHON = ([])
-        PYTHON.extend(["import numpy as np",""])
-#        PYTHON.extend(["from numba import jit","import numpy as np","","@jit(nopython=True)",""])
+        PYTHON.extend(["import numpy as np","from psh import engine",""])
         
         if (coord == 'rtp'):
             IDLpro.extend(["FUNCTION "   +"jovian_%s_internal_%s, r_rj, colat_rads, elong_rads"%(        model,coord)])
             MATLAB.extend(["function B%s = jovian_%s_internal_%s( r_rj, colat_rads, elong_rads)"%( coord,model,coord)])
-            PYTHON.extend(["def "        +"jovian_%s_internal_%s( r_rj, colat_rads, elong_rads):"%(      model,coord)])
+            PYTHON.extend(["def "        +"jovian_%s_internal_%s( r_rj, colat_rads=None, elong_rads=None, out=None, workspace=None, jacobian=False, tol_nT=None, return_degree=False, dtype=None, layout=None):"%(      model,coord)])
         elif (coord == 'xyz'):
             IDLpro.extend(["FUNCTION "   +"jovian_%s_internal_%s, x_rj, y_rj, z_rj"%(        model,coord)])
             MATLAB.extend(["function B%s = jovian_%s_internal_%s( x_rj, y_rj, z_rj)"%( coord,model,coord)])
-            PYTHON.extend(["def "        +"jovian_%s_internal_%s( x_rj, y_rj, z_rj):"%(      model,coord)])
+            PYTHON.extend(["def "        +"jovian_%s_internal_%s( x_rj, y_rj=None, z_rj=None, out=None, workspace=None, jacobian=False, tol_nT=None, return_degree=False, dtype=None, layout=None):"%(      model,coord)])
         else:
             print("Error: Should not get to this part of code!")
             raise SystemExit
@@ -548,10 +592,6 @@ for model in (models_to_do): # loop for different models?
         if model=='jrm09_order10':
             readme.append("Thanks to Masafumi Imai for providing code for his version of the JRM09 model, which was used to test and validate this code.")
         
-        this_file_path = pathlib.Path(__file__).resolve()
-        this_file_time = datetime.fromtimestamp(os.path.getmtime(this_file_path), tz=timezone.utc)
-         
-         
         readme.extend([
 "",
 "Citation Info:",
@@ -561,21 +601,42 @@ for model in (models_to_do): # loop for different models?
 " See the DOI above for a list of DOIs for each specific Github released version.",
 "",
 "Version Info:",
-" Last update of this file: %s by user %s. "%(datetime.today(),os.getlogin()),
 " This code was re-written/re-formatted by the Mother_Source python code:",
-"  %s"%this_file_path,
-"  which itself was last updated at UTC %s."%this_file_time.strftime("%Y-%m-%dT%H:%M:%S"),
+"  Mother_Source/MOP_spherical.py",
+" (the Github history gives the date of each change, so regenerating the codes only changes them",
+" where their content changes).",
 ""])
 
         readme = write_out_original_g_h_by_index(readme,sh_order,g,h)
         
+        # Python has optional inputs too, listed after the usage line
+        i_usage = [line[0:24] for line in readme].index('For internal field only:')
+        readme_python = readme[:i_usage+1] + [
+"",
+"Optional inputs (Python only):",
+" out        - n x 3 numpy array of doubles to write B in to (and return), instead of making a new array.",
+" workspace  - psh.Workspace(n, %d), to reuse the arrays used for up to n positions between calls."%sh_order,
+" jacobian   - if True, return B, J where J (n x 3 x 3, nT/Rj) is the gradient of B, see psh/engine.py.",
+" tol_nT     - if given, only use the degrees needed at each position for B to within tol_nT nT, see psh/engine.py.",
+" return_degree - if True, also return the degree used and the bound on the error (nT) at each position.",
+" dtype      - 'float32' to take the inputs and give B in single precision (default 'float64'), see psh/engine.py.",
+" layout     - 'rows' for B as a C-contiguous n x 3 array, or 'separate' for a tuple of 3 1D arrays, see psh/engine.py.",
+" The positions can also be one n x 3 array, in place of the 3 required inputs."] + readme[i_usage+1:]
+
         # now add to output list
         IDL_indent = '  '
-        (IDLpro,MATLAB,PYTHON) = add_commented_line(IDLpro,MATLAB,PYTHON,readme,standards,IDL_indent)
+        (IDLpro,MATLAB,unused_PYTHON) = add_commented_line(IDLpro,MATLAB,[],readme,standards,IDL_indent)
+        (unused_IDLpro,unused_MATLAB,PYTHON) = add_commented_line([],[],PYTHON,readme_python,standards,IDL_indent) # Python only
 
         # Add Blank Line
         (IDLpro,MATLAB,PYTHON) = add_blank_line(IDLpro,MATLAB,PYTHON)
 
+        # The Python code only keeps the parts that are hard-coded for this model, and passes them to
+        # the shared input checks and recursion in Python/psh/engine.py. So until the hard-coded parts,
+        # the lines common to all three languages go to a Python list that is not written out.
+        PYTHON_wrapper = PYTHON
+        PYTHON = []
+
         # IDL only lines for errors
         IDLpro.extend(["  ON_ERROR, 2 %s Exit code if an error in main, don't stop in code - no MATLAB equivalent, just delete line in MATLAB"%standards['comment_IDLpro']])
         IDLpro.extend([""])
@@ -585,72 +646,48 @@ for model in (models_to_do): # loop for different models?
 
 
         if (coord == 'xyz'):
-            #For Python, need to convert all to numpy immediately
-            PYTHON.extend([
-"%s Check inputs x_rj, y_rj and z_rj are all numbers, and convert to numpy doubles here."%standards['comment_Python'],
-"try:",
-"    x_rj = np.float64(x_rj)",
-"    y_rj = np.float64(y_rj)",
-"    z_rj = np.float64(z_rj)",
-"except Exception as e:",
-"    print('ERROR: Inputs must be numeric.')",
-"    raise SystemExit",
-""])
-
             #Check Inputs
             IDLpro.extend(["  %s Check inputs are same size."%standards['comment_IDLpro']])
             MATLAB.extend([  "%s Check inputs are same size."%standards['comment_Matlab']])
-            PYTHON.extend([  "%s Check inputs are same size."%standards['comment_Python']])
 
             IDLpro.extend(["  N_input = N_ELEMENTS(x_rj)","  scalar_input = (N_input EQ 1)  %s scalar or not"%standards['comment_IDLpro']])
             MATLAB.extend([  "N_input = numel(x_rj);",      "scalar_input = (N_input == 1); %s scalar or not"%standards['comment_Matlab']])
-            PYTHON.extend([  "N_input = x_rj.size",         "scalar_input = (N_input == 1)  %s scalar or not"%standards['comment_Python']])
 
             # Add Blank Line
             (IDLpro,MATLAB,PYTHON) = add_blank_line(IDLpro,MATLAB,PYTHON)
 
             IDLpro.extend(["  %s Check inputs x_rj, y_rj and z_rj are all numbers,  and same size (scalar or 1D only)"%standards['comment_IDLpro']])
             MATLAB.extend([  "%s Check inputs x_rj, y_rj and z_rj are all numbers,  and same size (scalar or 1D only)"%standards['comment_Matlab']])
-            PYTHON.extend([  "%s Check inputs x_rj, y_rj and z_rj are all arrays of the same size (scalar or 1D only)"%standards['comment_Python']])
 
             IDLpro.extend(["  IF (N_input NE N_ELEMENTS(y_rj)) THEN MESSAGE,'ERROR: First argument x_rj must be the same size as 2nd argument y_rj'"])
             MATLAB.extend([  "if (N_input ~= "+ "length(y_rj)), "+   "error('ERROR: First argument x_rj must be the same size as 2nd argument y_rj'); end"])
-            PYTHON.extend([  "if (N_input != "+ "y_rj.size):",   "    print('ERROR: First argument x_rj must be the same size as 2nd argument y_rj')","    raise SystemExit"])
 
             IDLpro.extend(["  IF (N_input NE N_ELEMENTS(z_rj)) THEN MESSAGE,'ERROR: First argument x_rj must be the same size as 3rd argument z_rj'"])
             MATLAB.extend([  "if (N_input ~= "+ "length(z_rj)), "+   "error('ERROR: First argument x_rj must be the same size as 3rd argument z_rj'); end"])
-            PYTHON.extend([  "if (N_input != "+ "z_rj.size):",   "    print('ERROR: First argument x_rj must be the same size as 3rd argument z_rj')","    raise SystemExit"])
 
             IDLpro.extend(["  IF (ISA(x_rj, NUMBER=1) EQ 0) OR (SIZE(x_rj, N_DIMENSIONS=1) GT 1) THEN MESSAGE,'ERROR: First  argument x_rj must be a scalar number or 1D "+    "array of numbers'"])
             MATLAB.extend([  "if (~isnumeric(x_rj)) "+     "|| (size(x_rj,2) ~= 1), "+                 "error('ERROR: First  argument x_rj must be a scalar number or 1D column array of numbers'); end"])
-            PYTHON.extend([  "if "+                                "(x_rj.ndim "+          "> 1):","    print('ERROR: First  argument x_rj must be a scalar number or 1D "+    "array of numbers')","    raise SystemExit"])
 
             IDLpro.extend(["  IF (ISA(y_rj, NUMBER=1) EQ 0) OR (SIZE(y_rj, N_DIMENSIONS=1) GT 1) THEN MESSAGE,'ERROR: Second argument y_rj must be a scalar number or 1D "+    "array of numbers'"])
             MATLAB.extend([  "if (~isnumeric(y_rj)) "+     "|| (size(y_rj,2) ~= 1), "+                 "error('ERROR: Second argument y_rj must be a scalar number or 1D column array of numbers'); end"])
-            PYTHON.extend([  "if "+                                "(y_rj.ndim "+          "> 1):","    print('ERROR: Second argument y_rj must be a scalar number or 1D "+    "array of numbers')","    raise SystemExit"])
 
             IDLpro.extend(["  IF (ISA(z_rj, NUMBER=1) EQ 0) OR (SIZE(z_rj, N_DIMENSIONS=1) GT 1) THEN MESSAGE,'ERROR: Third  argument z_rj must be a scalar number or 1D "+    "array of numbers'"])
             MATLAB.extend([  "if (~isnumeric(z_rj)) "+     "|| (size(z_rj,2) ~= 1), "+                 "error('ERROR: Third  argument z_rj must be a scalar number or 1D column array of numbers'); end"])
-            PYTHON.extend([  "if "+                                "(z_rj.ndim "+          "> 1):","    print('ERROR: Third  argument z_rj must be a scalar number or 1D "+    "array of numbers')","    raise SystemExit"])
 
             # Add Blank Line
             (IDLpro,MATLAB,PYTHON) = add_blank_line(IDLpro,MATLAB,PYTHON)
 
             IDLpro.extend(["  %s Changing inputs to Doubles, and not using input names (so as not to alter inputs, an IDL issue)"%standards['comment_IDLpro']])
             MATLAB.extend([  "%s Changing inputs to Doubles, and not using input names (so as not to alter inputs, an IDL issue)"%standards['comment_Matlab']])
-            PYTHON.extend([  "%s Changing inputs to Doubles, and not using input names (so as not to alter inputs, an IDL issue)"%standards['comment_Python']])
 
             IDLpro.extend(["  x_in = double(x_rj)  %s X in SYSIII, units Rj"%standards['comment_IDLpro']])
             MATLAB.extend([  "x_in = double(x_rj); %s X in SYSIII, units Rj"%standards['comment_Matlab']])
-            PYTHON.extend([  "x_in =        x_rj   %s X in SYSIII, units Rj"%standards['comment_Python']]) # Already float64 from above
 
             IDLpro.extend(["  y_in = double(y_rj)  %s Y in SYSIII, units Rj"%standards['comment_IDLpro']])
             MATLAB.extend([  "y_in = double(y_rj); %s Y in SYSIII, units Rj"%standards['comment_Matlab']])
-            PYTHON.extend([  "y_in =        y_rj   %s Y in SYSIII, units Rj"%standards['comment_Python']]) # Already float64 from above
 
             IDLpro.extend(["  z_in = double(z_rj)  %s Z in SYSIII, units Rj"%standards['comment_IDLpro']])
             MATLAB.extend([  "z_in = double(z_rj); %s Z in SYSIII, units Rj"%standards['comment_Matlab']])
-            PYTHON.extend([  "z_in =        z_rj   %s Z in SYSIII, units Rj"%standards['comment_Python']]) # Already float64 from above
 
             # Adjust distances if needed
             if (OneRExpected != r_ref):
@@ -659,33 +696,27 @@ for model in (models_to_do): # loop for different models?
 
                 IDLpro.extend(["  %s Scaling distances since %s expects 1Rj to be %s km (not the %d km that the inputs expect)"%(standards['comment_IDLpro'],model,r_ref,OneRExpected)])
                 MATLAB.extend([  "%s Scaling distances since %s expects 1Rj to be %s km (not the %d km that the inputs expect)"%(standards['comment_Matlab'],model,r_ref,OneRExpected)])
-                PYTHON.extend([  "%s Scaling distances since %s expects 1Rj to be %s km (not the %d km that the inputs expect)"%(standards['comment_Python'],model,r_ref,OneRExpected)])
 
                 IDLpro.extend(["  r_scale = "+ "double(%f)  /  double(%f)"%( OneRExpected,r_ref),"  x_in = x_in * r_scale" ,"  y_in = y_in * r_scale" ,"  z_in = z_in * r_scale" ])
                 MATLAB.extend([  "r_scale = "+ "double(%f)  /  double(%f);"%(OneRExpected,r_ref),  "x_in = x_in * r_scale;",  "y_in = y_in * r_scale;",  "z_in = z_in * r_scale;"])
-                PYTHON.extend([  "r_scale = np.float64(%f)/np.float64(%f)"%( OneRExpected,r_ref),  "x_in = x_in * r_scale" ,  "y_in = y_in * r_scale" ,  "z_in = z_in * r_scale" ])
 
             # Add Blank Line
             (IDLpro,MATLAB,PYTHON) = add_blank_line(IDLpro,MATLAB,PYTHON)
 
             IDLpro.extend(["  rho_rj_sq = x_in *x_in + y_in *y_in" ])
             MATLAB.extend([  "rho_rj_sq = x_in.*x_in + y_in.*y_in;"])
-            PYTHON.extend([  "rho_rj_sq = x_in *x_in + y_in *y_in" ])
 
             IDLpro.extend(["  r_rj = "+"sqrt(rho_rj_sq + z_in *z_in)" ])
             MATLAB.extend([  "r_rj = "+"sqrt(rho_rj_sq + z_in.*z_in);"])
-            PYTHON.extend([  "r_rj = np.sqrt(rho_rj_sq + z_in *z_in)" ])
 
             # Add Blank Line
             (IDLpro,MATLAB,PYTHON) = add_blank_line(IDLpro,MATLAB,PYTHON)
 
             IDLpro.extend(["  colat_rads = "  +"acos(z_in /r_rj)" ])
             MATLAB.extend([  "colat_rads = "  +"acos(z_in./r_rj);"])
-            PYTHON.extend([  "colat_rads = np.arccos(z_in /r_rj)" ])
 
             IDLpro.extend(["  elong_rads = "  +"atan( y_in,x_in)" ])
             MATLAB.extend([  "elong_rads = "  +"atan2(y_in,x_in);"])
-            PYTHON.extend([  "elong_rads = np.arctan2(y_in,x_in)" ])
 
 
 #            IDLpro.extend(["  IF scalar_input THEN BEGIN"])
@@ -729,56 +760,36 @@ for model in (models_to_do): # loop for different models?
         MATLAB.extend(["%%"]) # New Cell
 
         if (coord == 'rtp'):
-            #For Python, need to convert all to numpy immediately
-            PYTHON.extend([
-"%s Check inputs r_rj, colat_rads and elong_rads are all numbers, and convert to numpy doubles here."%standards['comment_Python'],
-"try:",
-"    r_rj       = np.float64(    r_rj  )",
-"    colat_rads = np.float64(colat_rads)",
-"    elong_rads = np.float64(elong_rads)",
-"except Exception as e:",
-"    print('ERROR: Inputs must be numeric.')",
-"    raise SystemExit",
-""])
-
 
             #Check Inputs
             IDLpro.extend(["  %s Check inputs are same size."%standards['comment_IDLpro']])
             MATLAB.extend([  "%s Check inputs are same size."%standards['comment_Matlab']])
-            PYTHON.extend([  "%s Check inputs are same size."%standards['comment_Python']])
 
 
             IDLpro.extend(["  N_input = N_ELEMENTS(r_rj)","  scalar_input = (N_input EQ 1)  %s scalar or not"%standards['comment_IDLpro']])
             MATLAB.extend([  "N_input = numel(r_rj);",      "scalar_input = (N_input == 1); %s scalar or not"%standards['comment_Matlab']])
-            PYTHON.extend([  "N_input = r_rj.size",         "scalar_input = (N_input == 1)  %s scalar or not"%standards['comment_Python']])
 
             # Add Blank Line
             (IDLpro,MATLAB,PYTHON) = add_blank_line(IDLpro,MATLAB,PYTHON)
 
             IDLpro.extend(["  %s Check inputs r_rj, colat_rads and elong_rads are all numbers,  and same size (scalar or 1D only)"%standards['comment_IDLpro']])
             MATLAB.extend([  "%s Check inputs r_rj, colat_rads and elong_rads are all numbers,  and same size (scalar or 1D only)"%standards['comment_Matlab']])
-            PYTHON.extend([  "%s Check inputs r_rj, colat_rads and elong_rads are all arrays of the same size (scalar or 1D only)"%standards['comment_Python']])
 
 
             IDLpro.extend(["  IF (ISA(r_rj      , NUMBER=1) EQ 0) OR (SIZE(r_rj      , N_DIMENSIONS=1) GT 1) THEN MESSAGE,'ERROR: First  argument    r_rj    must be a scalar number or 1D "+    "array of numbers'"])
             MATLAB.extend(["if (~isnumeric(    r_rj  )) "+       "|| (size(    r_rj  ,2) ~= 1), "+                 "error('ERROR: First  argument    r_rj    must be a scalar number or 1D column array of numbers'); end"])
-            PYTHON.extend([  "if "+                                          "(r_rj.ndim "+            "> 1):","    print('ERROR: First  argument    r_rj    must be a scalar number or 1D "+    "array of numbers')","    raise SystemExit"])
 
             IDLpro.extend(["  IF (ISA(colat_rads, NUMBER=1) EQ 0) OR (SIZE(colat_rads, N_DIMENSIONS=1) GT 1) THEN MESSAGE,'ERROR: Second argument colat_rads must be a scalar number or 1D "+    "array of numbers'"])
             MATLAB.extend(["if (~isnumeric(colat_rads)) "+       "|| (size(colat_rads,2) ~= 1),"+                 " error('ERROR: Second argument colat_rads must be a scalar number or 1D column array of numbers'); end"])
-            PYTHON.extend([  "if "+                                      "(colat_rads.ndim "+          "> 1):","    print('ERROR: Second argument colat_rads must be a scalar number or 1D "+    "array of numbers')","    raise SystemExit"])
 
             IDLpro.extend(["  IF (ISA(elong_rads, NUMBER=1) EQ 0) OR (SIZE(elong_rads, N_DIMENSIONS=1) GT 1) THEN MESSAGE,'ERROR: Third  argument elong_rads must be a scalar number or 1D "+    "array of numbers'"])
             MATLAB.extend(["if (~isnumeric(elong_rads)) "+       "|| (size(elong_rads,2) ~= 1),"+                 " error('ERROR: Third  argument elong_rads must be a scalar number or 1D column array of numbers'); end"])
-            PYTHON.extend([  "if "+                                      "(elong_rads.ndim "+          "> 1):","    print('ERROR: Third  argument elong_rads must be a scalar number or 1D "+    "array of numbers')","    raise SystemExit"])
 
             IDLpro.extend(["  IF (N_input NE N_ELEMENTS(colat_rads)) THEN MESSAGE,'ERROR: First argument r_rj must be the same size as 2nd argument colat_rads'"])
             MATLAB.extend([  "if (N_input ~= length(colat_rads)),"+       " error('ERROR: First argument r_rj must be the same size as 2nd argument colat_rads'); end"])
-            PYTHON.extend([  "if (N_input != "+    "colat_rads.size):","    print('ERROR: First argument r_rj must be the same size as 2nd argument colat_rads')","    raise SystemExit"])
 
             IDLpro.extend(["  IF (N_input NE N_ELEMENTS(elong_rads)) THEN MESSAGE,'ERROR: First argument r_rj must be the same size as 3rd argument elong_rads'"])
             MATLAB.extend([  "if (N_input ~= length(elong_rads)),"+       " error('ERROR: First argument r_rj must be the same size as 3rd argument elong_rads'); end"])
-            PYTHON.extend([  "if (N_input != "+    "elong_rads.size):","    print('ERROR: First argument r_rj must be the same size as 3rd argument elong_rads')","    raise SystemExit"])
 
             # Add Blank Line
             (IDLpro,MATLAB,PYTHON) = add_blank_line(IDLpro,MATLAB,PYTHON)
@@ -829,11 +840,9 @@ for model in (models_to_do): # loop for different models?
         if (coord == 'rtp'):
             IDLpro.extend(["  %s Changing inputs to Doubles, and not using input names (so as not to alter inputs, an IDL issue)"%standards['comment_IDLpro']])
             MATLAB.extend([  "%s Changing inputs to Doubles, and not using input names (so as not to alter inputs, an IDL issue)"%standards['comment_Matlab']])
-            PYTHON.extend([  "%s Changing inputs to Doubles, and not using input names (so as not to alter inputs, an IDL issue)"%standards['comment_Python']])
 
             IDLpro.extend(["  r_rj_dbl       = DOUBLE(      r_rj  )" ,"  colat_rads_dbl = DOUBLE(  colat_rads)" ,"  elong_rads_dbl = DOUBLE(  elong_rads)" ])
             MATLAB.extend([  "r_rj_dbl       = double(      r_rj  );",  "colat_rads_dbl = double(  colat_rads);",  "elong_rads_dbl = double(  elong_rads);"])
-            PYTHON.extend([  "r_rj_dbl       =              r_rj"    ,  "colat_rads_dbl =          colat_rads"  ,  "elong_rads_dbl =          elong_rads"  ]) # Already float64 from above # Pointer, rather deep copy, is fine here.
 
             # Adjust distances if needed - PUT THIS RTP AND XYZ CASE NEXT TO EACH OTHER IN THIS CODE!!!!
             if (OneRExpected != r_ref):
@@ -842,26 +851,26 @@ for model in (models_to_do): # loop for different models?
 
                 IDLpro.extend(["  %s Scaling distances since %s expects 1Rj to be %s km (not the %d km that the inputs expect)"%(standards['comment_IDLpro'],model,r_ref,OneRExpected)])
                 MATLAB.extend([  "%s Scaling distances since %s expects 1Rj to be %s km (not the %d km that the inputs expect)"%(standards['comment_Matlab'],model,r_ref,OneRExpected)])
-                PYTHON.extend([  "%s Scaling distances since %s expects 1Rj to be %s km (not the %d km that the inputs expect)"%(standards['comment_Python'],model,r_ref,OneRExpected)])
 
                 IDLpro.extend(["  r_rj_dbl = r_rj_dbl * "+ "double(%f)  /  double(%f)"%( OneRExpected,r_ref)])
                 MATLAB.extend([  "r_rj_dbl = r_rj_dbl * "+ "double(%f)  /  double(%f);"%(OneRExpected,r_ref)])
-                PYTHON.extend([  "r_rj_dbl = r_rj_dbl * np.float64(%f)/np.float64(%f)"%( OneRExpected,r_ref)])
 
         elif (coord == 'xyz'):
             IDLpro.extend(["  %s Code is not using input names (so as not to alter inputs, an IDL issue)"%standards['comment_IDLpro']])
             MATLAB.extend([  "%s Code is not using input names (so as not to alter inputs, an IDL issue)"%standards['comment_Matlab']])
-            PYTHON.extend([  "%s Code is not using input names (so as not to alter inputs, an IDL issue)"%standards['comment_Python']])
 
             IDLpro.extend(["  r_rj_dbl       =  r_rj" ,"  colat_rads_dbl = colat_rads" ,"  elong_rads_dbl = elong_rads" ])
             MATLAB.extend([  "r_rj_dbl       =  r_rj;",  "colat_rads_dbl = colat_rads;",  "elong_rads_dbl = elong_rads;"])
-            PYTHON.extend([  "r_rj_dbl       =  r_rj",   "colat_rads_dbl = colat_rads",   "elong_rads_dbl = elong_rads" ]) # Already float64 from above # Pointer, rather deep copy, is fine here.
 
         # Add Blank Line
         (IDLpro,MATLAB,PYTHON) = add_blank_line(IDLpro,MATLAB,PYTHON)
         MATLAB.extend(["%%"]) # New Matlab Cell
 
 
+        # For Python, the hard-coded parts are written out at module level (before the function),
+        # so the arrays are made once when the file is imported, not on every call.
+        PYTHON = []
+
         readme = [
 "============",
 "Begin hard-coding for %s"%model.upper(),
@@ -889,7 +898,6 @@ for model in (models_to_do): # loop for different models?
         MATLAB.extend([   "k       = %d; %s order + 1 "%(k,standards['comment_Matlab'])])
         #PYTHON.extend([   "k       = %d  %s order + 1 "%(k,standards['comment_Python'])])
         PYTHON.extend([ "%s k     = %d  %s order + 1 "%(standards['comment_Python'],k,standards['comment_Python'])])
-        PYTHON.extend([   "k_plus1 = %d  %s k+1, used in for loops when I want to go up to k "%(k+1,standards['comment_Python'])])
 
         # Add Blank Line
         (IDLpro,MATLAB,PYTHON) = add_blank_line(IDLpro,MATLAB,PYTHON)
@@ -938,6 +946,21 @@ for model in (models_to_do): # loop for different models?
 
         (IDLpro,MATLAB,PYTHON) = write_out_g_h_rec(degree, sh_order, g, h, IDLpro, MATLAB, PYTHON, standards, IDL_indent)
 
+        PYTHON.extend([
+"%s These arrays are shared by every call, so make them read-only"%standards['comment_Python'],
+"rec.setflags(write=False)",
+"g.setflags(write=False)",
+"h.setflags(write=False)",
+"",
+"%s Python float copies of the same arrays, for the scalar only function below"%standards['comment_Python'],
+"rec_list = rec.tolist()",
+"g_list   =   g.tolist()",
+"h_list   =   h.tolist()",
+"",
+"%s 1 Rj in km that the g and h values assume (inputs are scaled from 71492 km to this), see psh.internal_xyz_multi"%standards['comment_Python'],
+"r_ref_km = %d"%r_ref,
+""])
+
         readme = [
 "============",
 "End parts that are hard-coded for %s"%model.upper(),
@@ -950,9 +973,59 @@ for model in (models_to_do): # loop for different models?
         (IDLpro,MATLAB,PYTHON) = add_blank_line(IDLpro,MATLAB,PYTHON)
         MATLAB.extend(["%%"])
 
+        # The Python code is now done, the rest is in Python/psh/engine.py
+        PYTHON_tables = PYTHON
+        PYTHON = PYTHON_wrapper
+        if (coord == 'rtp'):
+            python_args = "r_rj, colat_rads, elong_rads"
+        elif (coord == 'xyz'):
+            python_args = "x_rj, y_rj, z_rj"
+        PYTHON.extend([  "%s Input checks and the Legendre/longitude recursion are shared by all models, see psh/engine.py"%standards['comment_Python']])
+        PYTHON.extend([  "return engine.internal_%s(%s, g, h, rec, r_ref_km, out=out, workspace=workspace, jacobian=jacobian,"%(coord,python_args)])
+        PYTHON.extend([  "                           tol_nT=tol_nT, return_degree=return_degree, dtype=dtype, layout=layout)"])
+        PYTHON.extend([  ""])
+        PYTHON.extend([  "def "        +"jovian_%s_internal_%s_scalar( %s):"%(model,coord,python_args)])
+        readme = [
+"Scalar only version of jovian_%s_internal_%s, for one position at a time"%(model,coord),
+"(e.g. field line tracing), using Python floats instead of numpy arrays, which is much faster",
+"per call. Inputs are single numbers, with the same units as jovian_%s_internal_%s."%(model,coord),
+"",
+"Outputs:"]
+        if (coord == 'rtp'):
+            readme.extend([" (Br, Btheta, Bphi) - tuple of floats, units of nT."])
+        elif (coord == 'xyz'):
+            readme.extend([" (Bx, By, Bz) - tuple of floats, units of nT."])
+        (unused_IDLpro,unused_MATLAB,PYTHON) = add_commented_line([],[],PYTHON,readme,standards,IDL_indent) # Python only
+        PYTHON.extend([  "return engine.internal_%s_scalar(%s, g_list, h_list, rec_list, r_ref_km)"%(coord,python_args)])
+        if (coord == 'rtp'):
+            PYTHON.extend([  ""])
+            PYTHON.extend([  "def "        +"jovian_%s_internal_rtp_grid( %s):"%(model,python_args)])
+            readme = [
+"Grid version of jovian_%s_internal_rtp, for B at every combination of the inputs"%model,
+"(e.g. maps or 3D cubes), which is much faster than calling it on the flattened grid.",
+"Inputs are scalars or 1D arrays (sizes N_r, N_colat and N_elong), with the same units",
+"as jovian_%s_internal_rtp."%model,
+"",
+"Outputs:",
+" B - [Br, Btheta, Bphi], units of nT. Size N_r x N_colat x N_elong x 3."]
+            (unused_IDLpro,unused_MATLAB,PYTHON) = add_commented_line([],[],PYTHON,readme,standards,IDL_indent) # Python only
+            PYTHON.extend([  "return engine.internal_rtp_grid(%s, g, h, rec, r_ref_km)"%python_args])
+            PYTHON.extend([  ""])
+            PYTHON.extend([  "def "        +"jovian_%s_internal_rtp_shell( r_rj, colat_rads, N_elong):"%model])
+            readme = [
+"Shell version of jovian_%s_internal_rtp_grid, for N_elong longitudes evenly spaced"%model,
+"around the planet, elong_rads = 2pi * (0, 1, ... N_elong-1)/N_elong, at each colatitude",
+"and radial distance (scalars or 1D arrays, sizes N_r and N_colat).",
+"",
+"Outputs:",
+" B - [Br, Btheta, Bphi], units of nT. Size N_r x N_colat x N_elong x 3."]
+            (unused_IDLpro,unused_MATLAB,PYTHON) = add_commented_line([],[],PYTHON,readme,standards,IDL_indent) # Python only
+            PYTHON.extend([  "return engine.internal_rtp_shell(r_rj, colat_rads, N_elong, g, h, rec, r_ref_km)"])
+        PYTHON_wrapper = PYTHON
+        PYTHON = []
+
         IDLpro.extend(["  IF scalar_input THEN BEGIN"])
         MATLAB.extend([  "if scalar_input"])
-        PYTHON.extend([  "if scalar_input:"])
 
         # write out array of zeros and increments up to k
         part = "    a         = [ 0d"
@@ -965,11 +1038,6 @@ for model in (models_to_do): # loop for different models?
             part += ", 0"
         part += "]; %s = zeros(1, k)"%standards['comment_Matlab']
         MATLAB.append(part)
-        part = "    a         = np.array([ 0"
-        for i in range(k):
-            part += ", 0"
-        part += "],dtype='float64') %s = np.zeros(k_plus1,dtype='float64')"%standards['comment_Python']
-        PYTHON.append(part)
 
         part = "    DINDGEN_k = [ 0d"
         for i in range(k):
@@ -981,27 +1049,18 @@ for model in (models_to_do): # loop for different models?
             part += ",%2d"%(i+2)
         part += "]; %s = 1:k"%standards['comment_Matlab']+", done manually for speed"
         MATLAB.append(part)
-        part = "    DINDGEN_k = np.array([ 0"
-        for i in range(k):
-            part += ",%2d"%(i+1)
-        part += "],dtype='float64') %s = 0:k"%(standards['comment_Python'])+", done manually for speed"
-        PYTHON.append(part)
 
         IDLpro.extend(["  ENDIF ELSE BEGIN"])
         MATLAB.extend([  "else"])
-        PYTHON.extend([  "else:"])
 
         IDLpro.extend(["    a         = DBLARR(N_input,k+1)"])
         MATLAB.extend(["    a         = zeros( N_input,k  );"])
-        PYTHON.extend(["    a         = np.zeros((N_input,k_plus1),dtype='float64')"])
 
         IDLpro.extend(["    DINDGEN_k = a"])
         MATLAB.extend(["    DINDGEN_k = a;"])
-        PYTHON.extend(["    DINDGEN_k = a.copy()"])
 
         IDLpro.extend(["    FOR i = 0,k DO "+                 "DINDGEN_k[*,i] = i"])
         MATLAB.extend(["    for i = 1:k",             "        DINDGEN_k(:,i) = i;","    end"])
-        PYTHON.extend(["    for i in range(k_plus1):","        DINDGEN_k[:,i] = i"])
 
         IDLpro.extend(["  ENDELSE"])
         MATLAB.extend([  "end"])
@@ -1015,7 +1074,6 @@ for model in (models_to_do): # loop for different models?
 #        PYTHON.extend([  "%s Instead of: a = (1d/r_rj_dbl)^DINDGEN_kp1,  do the da to end of for loop"%standards['comment_Python']])
         IDLpro.extend(["  da = 1d"       + "/r_rj_dbl" ])
         MATLAB.extend([  "da = 1"        +"./r_rj_dbl;"])
-        PYTHON.extend([  "da = np.float64(1)/r_rj_dbl" ])
 
         IDLpro.extend([
 "  IF scalar_input THEN BEGIN",
@@ -1031,22 +1089,12 @@ for model in (models_to_do): # loop for different models?
 "for i=2:k",
 "    a(:,i) = a(:,i-1).*da;",
 "end"])
-        PYTHON.extend([
-"if scalar_input:",
-"    a[0] = da",
-"    for i in range(1,k_plus1):",
-"        a[i] = a[i-1]*da",
-"else:",
-"    a[:,0] = da",
-"    for i in range(1,k_plus1):",
-"        a[:,i] = a[:,i-1]*da"])
 
         # Add Blank Line
         (IDLpro,MATLAB,PYTHON) = add_blank_line(IDLpro,MATLAB,PYTHON)
 
         IDLpro.extend(["  b = a  * DINDGEN_k" ])
         MATLAB.extend([  "b = a .* DINDGEN_k;"])
-        PYTHON.extend([  "b = a  * DINDGEN_k" ])
 
 
         # Add Blank Line
@@ -1054,57 +1102,44 @@ for model in (models_to_do): # loop for different models?
 
         IDLpro.extend(["  cos_phi   = "+"cos(elong_rads_dbl)"])
         MATLAB.extend([  "cos_phi   = "+"cos(elong_rads_dbl);"])
-        PYTHON.extend([  "cos_phi   = np.cos(elong_rads_dbl,dtype='float64')"])
 
         IDLpro.extend(["  sin_phi   = "+"sin(elong_rads_dbl)"])
         MATLAB.extend([  "sin_phi   = "+"sin(elong_rads_dbl);"])
-        PYTHON.extend([  "sin_phi   = np.sin(elong_rads_dbl,dtype='float64')"])
 
         IDLpro.extend(["  cos_theta = "+"cos(colat_rads_dbl)"])
         MATLAB.extend([  "cos_theta = "+"cos(colat_rads_dbl);"])
-        PYTHON.extend([  "cos_theta = np.cos(colat_rads_dbl,dtype='float64')"])
 
         IDLpro.extend(["  sin_theta = "+"sin(colat_rads_dbl)"])
         MATLAB.extend([  "sin_theta = "+"sin(colat_rads_dbl);"])
-        PYTHON.extend([  "sin_theta = np.sin(colat_rads_dbl,dtype='float64')"])
 
         IDLpro.extend(["  not_bk = (sin_theta GE 0.00001d)  %s = 1d-5 - also see bk both times below"%standards['comment_IDLpro']])
         MATLAB.extend(  ["not_bk = (sin_theta >= 0.00001 ); %s = 1e-5 - also see bk both times below"%standards['comment_Matlab']])
-        PYTHON.extend(  ["not_bk = (sin_theta >= 0.00001 )  %s = 1d-5 - also see bk both times below"%standards['comment_Python']])
 
         IDLpro.extend(["  IF scalar_input THEN BEGIN"])
         MATLAB.extend([  "if scalar_input"])
-        PYTHON.extend([  "if scalar_input:"])
 
         IDLpro.extend(["    %s bk = (sin_theta LT 0.00001d)  %s bk not needed for scalar"%(standards['comment_IDLpro'],standards['comment_IDLpro'])])
         MATLAB.extend(["    %s bk = (sin_theta <  0.00001 ); %s bk not needed for scalar"%(standards['comment_Matlab'],standards['comment_Matlab'])])
-        PYTHON.extend(["    %s bk = (sin_theta <  0.00001 )  %s bk not needed for scalar"%(standards['comment_Python'],standards['comment_Python'])])
 
         IDLpro.extend(["    zero_array = "+        "0d","    p   = "+        "1d","    d   = 0d"               ,"    bbr = 0d"               ,"    bbt = 0d"               ,"    bbf = 0d"               ,"    x = 0d"               ,"    y = 1d"      ])
         MATLAB.extend(["    zero_array = "+        "0;","    p   = "+        "1;","    d   = 0;"               ,"    bbr = 0;"               ,"    bbt = 0;"               ,"    bbf = 0;"               ,"    x = 0;"               ,"    y = 1;"      ])
-        PYTHON.extend(["    zero_array = np.float64(0)","    p   = np.float64(1)","    d   = zero_array.copy()","    bbr = zero_array.copy()","    bbt = zero_array.copy()","    bbf = zero_array.copy()","    x = zero_array.copy()","    y = p.copy()"])
 
 
 
         IDLpro.extend(["  ENDIF ELSE BEGIN"])
         MATLAB.extend(["else"])
-        PYTHON.extend(["else:"])
 
         IDLpro.extend(["    bk = (sin_theta LT 0.00001d)" ])
         MATLAB.extend(["    bk = (sin_theta <  0.00001 );"])
-        PYTHON.extend(["    bk = (sin_theta <  0.00001 )" ]) 
 
         IDLpro.extend(["    zero_array = DBLARR(N_input)"                  ,"    p   = zero_array + 1d"])
         MATLAB.extend(["    zero_array = zeros( N_input,1);"               ,"    p   =         ones( N_input,1);"])
-        PYTHON.extend(["    zero_array = np.zeros(N_input,dtype='float64')","    p   = zero_array + np.float64(1)"])
         
         IDLpro.extend(["    d   = zero_array"       ,"    bbr = zero_array"       ,"    bbt = zero_array"       ,"    bbf = zero_array"       ])
         MATLAB.extend(["    d   = zero_array;"      ,"    bbr = zero_array;"      ,"    bbt = zero_array;"      ,"    bbf = zero_array;"      ])
-        PYTHON.extend(["    d   = zero_array.copy()","    bbr = zero_array.copy()","    bbt = zero_array.copy()","    bbf = zero_array.copy()"])
 
         IDLpro.extend(["    x = zero_array"       ,"    y = p  "   +"%s 1s"%standards['comment_IDLpro']])
         MATLAB.extend(["    x = zero_array;"      ,"    y = p; "   +"%s 1s"%standards['comment_Matlab']])
-        PYTHON.extend(["    x = zero_array.copy()","    y = p.copy() %s 1s"%standards['comment_Python']])
 
         IDLpro.extend(["  ENDELSE"])
         MATLAB.extend([  "end"])
@@ -1114,38 +1149,30 @@ for model in (models_to_do): # loop for different models?
 
         IDLpro.extend(["  FOR m = 1,k DO BEGIN"])
         MATLAB.extend([  "for m = 1:k"])
-        PYTHON.extend([  "for m in range(1, k_plus1):"])
 
         IDLpro.extend(["    bm  = (m NE 1)" ])
         MATLAB.extend(["    bm  = (m ~= 1);"])
-        PYTHON.extend(["    bm  = (m != 1)" ])
 
         IDLpro.extend(["    IF bm THEN BEGIN"])
         MATLAB.extend(["    if bm" ])
-        PYTHON.extend(["    if bm:"])
 
         IDLpro.extend([  "      m_minus_1 = DOUBLE(m - 1)"])
         MATLAB.extend(["        m_minus_1 =        m - 1;"])
-        PYTHON.extend(["        m_minus_1 = np.float64(m - 1)"])
 
         IDLpro.extend([  "      w = x"       ,  "      x = w *cos_phi + y *sin_phi" ,  "      y = y *cos_phi - w *sin_phi" ])
         MATLAB.extend(["        w = x;"      ,"        x = w.*cos_phi + y.*sin_phi;","        y = y.*cos_phi - w.*sin_phi;"])
-        PYTHON.extend(["        w = x.copy()","        x = w *cos_phi + y *sin_phi" ,"        y = y *cos_phi - w *sin_phi" ])
 
         IDLpro.extend(["    ENDIF"])
         MATLAB.extend(["    end"])
 
         IDLpro.extend(["    q = p"       ,"    z = d"       ,"    bi = zero_array"       ,"    p2 = zero_array"       ,"    d2 = zero_array"       ])
         MATLAB.extend(["    q = p;"      ,"    z = d;"      ,"    bi = zero_array;"      ,"    p2 = zero_array;"      ,"    d2 = zero_array;"      ])
-        PYTHON.extend(["    q = p.copy()","    z = d.copy()","    bi = zero_array.copy()","    p2 = zero_array.copy()","    d2 = zero_array.copy()"])
 
         IDLpro.extend(["    FOR n = m,k DO BEGIN"])
         MATLAB.extend(["    for n = m:k"])
-        PYTHON.extend(["    for n in range(m, k_plus1):"])
 
         IDLpro.extend([  "      mn = "+  "n*(n-1)/2 + m"  ,  "      w  = g[mn]*y + h[mn]*x" ])
         MATLAB.extend(["        mn = "+  "n*(n-1)/2 + m;" ,"        w  = g(mn)*y + h(mn)*x;"])
-        PYTHON.extend(["        mn = int( n*(n-1)/2 + m )","        w  = g[mn]*y + h[mn]*x" ])
 
 
 # Don't need these?
@@ -1197,47 +1224,24 @@ for model in (models_to_do): # loop for different models?
 "            end",
 "        end"])
 
-        PYTHON.extend([
-"        if scalar_input:",
-"            bbr += b[  n]*w*q",
-"            bbt -= a[  n]*w*z",
-"            if bm:",
-"                if not_bk:",
-"                    bi += a[n] * (g[mn]*x-h[mn]*y) * q",
-"                else:",
-"                    bi += a[n] * (g[mn]*x-h[mn]*y) * z",
-"        else:",
-"            bbr += b[:,n]*w*q",
-"            bbt -= a[:,n]*w*z",
-"            if bm:",
-"                qq = q.copy()",
-"                ind = np.where(bk)[0]",
-"                if (len(ind) != 0):",
-"                    qq[ind] = z[ind]",
-"                bi += a[:,n] * (g[mn]*x-h[mn]*y) * qq"])
 
 
         IDLpro.extend([  "      xk = rec[mn] %s in IDL 8.4 it's faster to write this to xk, to use below twice.  In Matlab quicker to just use rec(nm)"%standards['comment_IDLpro']])
-        PYTHON.extend(["        xk = rec[mn] # faster to write this to xk, to use below twice"])
         IDLpro.extend([  "      dp = cos_theta *z - sin_theta *q - d2*xk"      ])
         MATLAB.extend(["        dp = cos_theta.*z - sin_theta.*q - d2*rec(mn);"])
-        PYTHON.extend(["        dp = cos_theta *z - sin_theta *q - d2*xk"      ])
 
 
         IDLpro.extend([  "      pm = cos_theta *q                - p2*xk"      ])
         MATLAB.extend(["        pm = cos_theta.*q                - p2*rec(mn);"])
-        PYTHON.extend(["        pm = cos_theta *q                - p2*xk"])
 
         IDLpro.extend([  "      d2 = z"       ,  "      p2 = q"       ,  "      z = dp"       ,  "      q = pm"       ])
         MATLAB.extend(["        d2 = z;"      ,"        p2 = q;"      ,"        z = dp;"      ,"        q = pm;"      ])
-        PYTHON.extend(["        d2 = z.copy()","        p2 = q.copy()","        z = dp.copy()","        q = pm.copy()"])
 
         IDLpro.extend(["    ENDFOR"])
         MATLAB.extend(["    end"])
 
         IDLpro.extend(["    d = sin_theta *d + cos_theta *p" ,"    p = sin_theta *p" ])
         MATLAB.extend(["    d = sin_theta.*d + cos_theta.*p;","    p = sin_theta.*p;"])
-        PYTHON.extend(["    d = sin_theta *d + cos_theta *p" ,"    p = sin_theta *p" ])
 
         IDLpro.extend([
 "    IF bm THEN BEGIN",
@@ -1249,10 +1253,6 @@ for model in (models_to_do): # loop for different models?
 "        bi  = bi  * m_minus_1;",
 "        bbf = bbf + bi;",
 "    end"])
-        PYTHON.extend([
-"    if bm:",
-"        bi  *= m_minus_1",
-"        bbf += bi"])
 
         IDLpro.extend(["  ENDFOR"])
         MATLAB.extend([  "end"])
@@ -1262,24 +1262,19 @@ for model in (models_to_do): # loop for different models?
 
         IDLpro.extend(["  %s br = bbr  %s This doesn't change again"%(standards['comment_IDLpro'],standards['comment_IDLpro'])])
         MATLAB.extend([  "%s br = bbr; %s This doesn't change again"%(standards['comment_Matlab'],standards['comment_Matlab'])])
-        PYTHON.extend([  "%s br = bbr  %s This doesn't change again"%(standards['comment_Python'],standards['comment_Python'])])
         IDLpro.extend(["  %s bt = bbt  %s This doesn't change again"%(standards['comment_IDLpro'],standards['comment_IDLpro'])])
         MATLAB.extend([  "%s bt = bbt; %s This doesn't change again"%(standards['comment_Matlab'],standards['comment_Matlab'])])
-        PYTHON.extend([  "%s bt = bbt  %s This doesn't change again"%(standards['comment_Python'],standards['comment_Python'])])
 
 
 
         IDLpro.extend(["  IF scalar_input THEN BEGIN"])
         MATLAB.extend(["if scalar_input" ])
-        PYTHON.extend(["if scalar_input:"])
 
         IDLpro.extend(["    IF not_bk THEN"+   " bf = bbf/sin_theta $","    ELSE BEGIN"])
         MATLAB.extend(["    if not_bk" ,"        bf = bbf/sin_theta;" ,"    else"      ])
-        PYTHON.extend(["    if not_bk:","        bf = bbf/sin_theta"  ,"    else:"     ])
 
         IDLpro.extend([  "      IF (cos_theta GE 0d) THEN "+      "bf =  bbf "+              "ELSE "+            "bf = -bbf"])
         MATLAB.extend(["        if (cos_theta >= 0)" ,"            bf =  bbf;"      ,"        else" ,"            bf = -bbf;","        end"])
-        PYTHON.extend(["        if (cos_theta >= 0):","            bf =  bbf.copy()","        else:","            bf = np.float64(-1)*bbf"])
 
 
         IDLpro.extend(["    ENDELSE"])
@@ -1287,7 +1282,6 @@ for model in (models_to_do): # loop for different models?
 
         IDLpro.extend(["  ENDIF ELSE BEGIN"])
         MATLAB.extend([  "else" ])
-        PYTHON.extend([  "else:"])
 
         IDLpro.extend([
 "    bf = bbf %s set size of array and do the 3rd case"%standards['comment_IDLpro'],
@@ -1307,14 +1301,6 @@ for model in (models_to_do): # loop for different models?
 "        bf(ind) = bbf(ind)./sin_theta(ind);",
 "    end"])
 
-        PYTHON.extend([
-"    bf = bbf.copy() %s set size of array and do the 3rd case"%standards['comment_Python'],
-"    ind = np.where((bk == 1) & (cos_theta < 0))[0]",
-"    if (len(ind) != 0):",
-"        bf[ind] = -bbf[ind]",
-"    ind = np.where(bk == 0)[0]",
-"    if (len(ind) != 0):",
-"        bf[ind] =  bbf[ind]/sin_theta[ind]"])
 
         IDLpro.extend(["  ENDELSE"])
         MATLAB.extend([  "end"])
@@ -1332,10 +1318,6 @@ for model in (models_to_do): # loop for different models?
             MATLAB.extend([  "Brtp = [ bbr , bbt , bf ];"])
             #PYTHON.extend(["return np.transpose(np.array([bbr,bbt,bf]))"])
             # Above output returned a size 3 for scalar, not size 1 by 3, so fix
-            PYTHON.extend(["if scalar_input:"])
-            PYTHON.extend(["    return             np.array([[bbr,bbt,bf]])"])
-            PYTHON.extend(["else:"])
-            PYTHON.extend(["    return np.transpose(np.array([bbr,bbt,bf]))"])
 
         elif (coord == 'xyz'):
 
@@ -1353,10 +1335,6 @@ for model in (models_to_do): # loop for different models?
             IDLpro.extend(["  %s Brtp = [[bbr],[bbt],[bf]]"%(  standards['comment_IDLpro'])])
             MATLAB.extend([  "%s Brtp = [ bbr , bbt , bf ];"%( standards['comment_Matlab'])])
             #PYTHON.extend([  "%s Brtp = np.transpose(np.array([bbr , bbt , bf ]))"%(standards['comment_Python'])])
-            PYTHON.extend(["%s if scalar_input:"%(standards['comment_Python'])])
-            PYTHON.extend(["%s     return             np.array([[bbr,bbt,bf]])"%(standards['comment_Python'])])
-            PYTHON.extend(["%s else:"%(standards['comment_Python'])])
-            PYTHON.extend(["%s     return np.transpose(np.array([bbr,bbt,bf]))"%(standards['comment_Python'])])
 
 
             # Add Blank Line
@@ -1365,39 +1343,28 @@ for model in (models_to_do): # loop for different models?
 
             IDLpro.extend(["  %s Convert to cartesian coordinates"%standards['comment_IDLpro']])
             MATLAB.extend([  "%s Convert to cartesian coordinates"%standards['comment_Matlab']])
-            PYTHON.extend([  "%s Convert to cartesian coordinates"%standards['comment_Python']])
-            PYTHON.extend([  "%s Each line is one component, Bx, By then Bz"%standards['comment_Python']])
 
             IDLpro.extend(["  Bxyz = [ %s"%standards['IDLpro_contline']])
             MATLAB.extend([  "Bxyz = [ %s"%standards['Matlab_contline']])
             #PYTHON.extend([  "Bxyz = np.transpose(np.array([ %s"%standards['Python_contline']])
             # Above output returned a size 3 for scalar, not size 1 by 3, so fix
-            PYTHON.extend([  "Bxyz = np.array([ %s"%standards['Python_contline']])
 
             IDLpro.extend(["    [bbr*sin_theta *cos_phi + bbt *cos_theta *cos_phi - bf *sin_phi], %s %s Bx"%(standards['IDLpro_contline'],standards['comment_IDLpro'])])
             MATLAB.extend(["    bbr.*sin_theta.*cos_phi + bbt.*cos_theta.*cos_phi - bf.*sin_phi   %s %s Bx"%(standards['Matlab_contline'],standards['comment_Matlab'])])
-            PYTHON.extend(["    bbr *sin_theta *cos_phi + bbt *cos_theta *cos_phi - bf *sin_phi , %s"%(      standards['Python_contline'])])
 
             IDLpro.extend(["    [bbr*sin_theta *sin_phi + bbt *cos_theta *sin_phi + bf *cos_phi], %s %s By"%(standards['IDLpro_contline'],standards['comment_IDLpro'])])
             MATLAB.extend(["    bbr.*sin_theta.*sin_phi + bbt.*cos_theta.*sin_phi + bf.*cos_phi   %s %s By"%(standards['Matlab_contline'],standards['comment_Matlab'])])
-            PYTHON.extend(["    bbr *sin_theta *sin_phi + bbt *cos_theta *sin_phi + bf *cos_phi , %s"%(      standards['Python_contline'])])
 
             IDLpro.extend(["    [bbr*cos_theta          - bbt *sin_theta                       ]  %s %s Bz"%(standards['IDLpro_contline'],standards['comment_IDLpro'])])
             MATLAB.extend(["    bbr.*cos_theta          - bbt.*sin_theta                          %s %s Bz"%(standards['Matlab_contline'],standards['comment_Matlab'])])
-            PYTHON.extend(["    bbr *cos_theta          - bbt *sin_theta                          %s"%(      standards['Python_contline'])])
 
             IDLpro.extend(["    ]   %s size n x 3"%standards['comment_IDLpro']])
             MATLAB.extend(["    ];  %s size n x 3"%standards['comment_Matlab']])
             #PYTHON.extend(["    ])) %s size n x 3"%standards['comment_Python']])
-            PYTHON.extend(["    ]) %s size 3 x n, or just size 3 if scalar"%standards['comment_Python']]) # since no transpose now
 
             IDLpro.extend(["  RETURN, Bxyz"])
             #PYTHON.extend([  "return  Bxyz"])
             # Above output returned a size 3 for scalar, not size 1 by 3, so fix
-            PYTHON.extend([  "if scalar_input:"])
-            PYTHON.extend([  "    return    np.array([Bxyz]) %s size 1 x 3"%standards['comment_Python']])
-            PYTHON.extend([  "else:"])
-            PYTHON.extend([  "    return np.transpose(Bxyz)  %s size n x 3"%standards['comment_Python']])
 
             # Matlab doesn't need a return
 
@@ -1430,12 +1397,15 @@ for model in (models_to_do): # loop for different models?
             file.writelines(MATLAB)
             file.close()
 
+            # Module level arrays go just before the function
+            i_def = [line[0:3] for line in PYTHON_wrapper].index('def')
+            PYTHON = PYTHON_wrapper[:i_def] + PYTHON_tables + PYTHON_wrapper[i_def:]
             indent_yet = 0
             for i in range(len(PYTHON)):
-                if (indent_yet): # add the initial indent, except first 3 lines
-                    PYTHON[i] = '    %s'%PYTHON[i] 
-                if (PYTHON[i][0:3] == 'def') and (indent_yet == 0):
+                if (PYTHON[i][0:3] == 'def'): # no indent for each def line, indent all after the first
                     indent_yet = 1
+                elif (indent_yet):  # add the initial indent, except lines before the first def
+                    PYTHON[i] = '    %s'%PYTHON[i] 
                 PYTHON[i] = '%s%s'%(PYTHON[i],line_end) # add line breaks
             file = open(outfile_PYTHON,'w')
             file.writelines(PYTHON)